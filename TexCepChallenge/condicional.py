@@ -0,0 +1,111 @@
+"""GET condicional (ETag e Last-Modified) e Cache-Control das rotas de consulta.
+
+As rotas de detalhe calculam o ETag a partir do ``atualizado_em`` da linha que ja leram e, quando
+o cliente envia o mesmo ETag em ``If-None-Match`` (ou uma data em ``If-Modified-Since`` que nao e
+anterior a ``atualizado_em``), respondem ``304`` sem serializar os dados. As listagens recebem o
+ETag calculado sobre o corpo pelo ``ConditionalGetMiddleware``. O ``Cache-Control`` e definido por
+``CACHE_HTTP``, para que um proxy reverso possa guardar e revalidar as respostas.
+"""
+
+# Importacoes externas.
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from typing import Callable, Optional, Union
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework import status
+
+# Importacoes internas.
+from TexCepChallenge.instrumentacao import mede
+
+CONFIGURACAO_PADRAO = {
+    'MAX_AGE': 0,
+    'MAX_AGE_CEP': 60 * 60,
+}
+
+
+def obtem_configuracao() -> dict:
+    """Retorna a configuracao definida em ``settings.CACHE_HTTP``."""
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'CACHE_HTTP', {})}
+
+
+def como_data(valor: Union[datetime, str, None]) -> Optional[datetime]:
+    """Converte o ``atualizado_em`` de um objeto ou de dados ja serializados em datetime.
+
+    :param valor: Datetime, data no formato ISO 8601 ou None.
+
+    :return: Datetime ou None.
+    """
+    if isinstance(valor, str):
+        return parse_datetime(valor)
+    return valor
+
+
+def etag_de(*partes) -> str:
+    """Monta um ETag fraco a partir das partes informadas (pk e datas de atualizacao).
+
+    O ETag e fraco porque o corpo pode ser codificado de formas diferentes (ex.: pela
+    renderizacao rapida ou pelo serializer) com o mesmo conteudo.
+
+    :param partes: Valores que identificam a versao do recurso.
+
+    :return: ETag entre aspas, com o prefixo ``W/``.
+    """
+    versao = '|'.join(
+        parte.isoformat() if isinstance(parte, datetime) else str(parte) for parte in partes
+    )
+    return f'W/"{hashlib.md5(versao.encode()).hexdigest()}"'
+
+
+def aplica_cache_control(response: HttpResponse, max_age: int) -> HttpResponse:
+    """Define o Cache-Control publico de uma resposta de consulta.
+
+    :param response: Resposta a ser alterada.
+    :param max_age: Tempo, em segundos, em que a resposta pode ser usada sem revalidacao; com
+        ``0``, a resposta pode ser guardada, mas deve ser revalidada a cada uso (``no-cache``).
+
+    :return: A propria resposta.
+    """
+    if max_age:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def resposta_condicional(
+    request: HttpRequest,
+    etag: str,
+    ultima_modificacao: Optional[datetime],
+    gera_resposta: Callable[[], HttpResponse],
+    max_age: int,
+) -> HttpResponse:
+    """Responde ``304`` caso o cliente ja tenha a versao atual e, caso contrario, gera a resposta.
+
+    :param request: Objeto de request, de onde sao lidos ``If-None-Match`` e ``If-Modified-Since``.
+    :param etag: ETag da versao atual, de ``etag_de``.
+    :param ultima_modificacao: Data da ultima alteracao do recurso, usada no Last-Modified.
+    :param gera_resposta: Funcao que serializa o recurso, chamada apenas sem ``304``.
+    :param max_age: Tempo maximo de cache, ver ``aplica_cache_control``.
+
+    :return: Resposta ``304`` ou a resposta gerada, com ETag, Last-Modified e Cache-Control.
+    """
+    timestamp = timegm(ultima_modificacao.utctimetuple()) if ultima_modificacao else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        with mede('serializacao'):
+            response = gera_resposta()
+
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        aplica_cache_control(response, max_age)
+
+    return response
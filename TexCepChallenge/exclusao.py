@@ -0,0 +1,242 @@
+"""Exclusao em lotes das colecoes.
+
+O ``QuerySet.delete`` do Django carrega todos os objetos e percorre as relacoes ``CASCADE`` em
+Python antes de excluir, o que, em colecoes grandes, consome minutos e muita memoria. A
+``ExclusaoEmLotes`` le apenas os pks, em lotes de ``EXCLUSAO['TAMANHO_DO_LOTE']`` e pela ordem do
+pk, e exclui cada lote com ``pk__in``, removendo antes os dependentes do lote (o ``CASCADE``) com
+uma unica consulta por relacao. Exclusoes maiores que ``EXCLUSAO['LIMITE_SINCRONO']`` rodam em
+segundo plano e o seu progresso e consultado em ``/api/exclusoes/<id>``, por ate
+``EXCLUSAO['RETENCAO']`` segundos apos a sua conclusao.
+"""
+
+# Importacoes externas.
+import logging
+import threading
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import QuerySet
+from django.http.response import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+
+logger = logging.getLogger(__name__)
+
+PARAMETRO_ASSINCRONO = 'assincrono'
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_DO_LOTE': 1000,
+    'LIMITE_SINCRONO': 10000,
+    'RETENCAO': 60 * 60,
+}
+
+# Remove os dependentes dos pks de um lote e retorna a quantidade excluida.
+Dependente = Callable[[List], int]
+
+_exclusoes: Dict[str, 'ExclusaoEmLotes'] = {}
+_trava = threading.Lock()
+
+
+def obtem_configuracao() -> dict:
+    """Retorna a configuracao definida em ``settings.EXCLUSAO``."""
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'EXCLUSAO', {})}
+
+
+class ExclusaoEmLotes:
+    """Exclusao dos objetos de um queryset em lotes de pks, com o progresso em ``excluidos``.
+
+    Toda a exclusao, inclusive a leitura dos pks, e feita na base de escrita do modelo
+    (``alias``), resolvida uma unica vez na criacao, de modo que a requisicao que a cria e
+    registrada como escrita pelo roteador de replicas.
+    """
+
+    PENDENTE = 'pendente'
+    EXECUTANDO = 'executando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        dependentes: Optional[Dict[str, Dependente]] = None,
+        ao_concluir: Optional[Callable[[], None]] = None,
+        tamanho_do_lote: Optional[int] = None,
+        antes_do_lote: Optional[Callable[[List], None]] = None,
+    ):
+        """Inicializa a exclusao.
+
+        :param queryset: Objetos a serem excluidos, ja filtrados.
+        :param dependentes: Funcoes que removem os dependentes de cada lote, indexadas pelo nome
+            da colecao dependente.
+        :param ao_concluir: Funcao chamada ao fim da exclusao (ex.: invalidacao de cache).
+        :param tamanho_do_lote: Quantidade de pks por lote.
+        :param antes_do_lote: Funcao chamada com os pks de cada lote, na transacao do lote e antes
+            da exclusao (ex.: para agendar, com ``transaction.on_commit``, a invalidacao de cache
+            dos objetos excluidos).
+        """
+        self.id = uuid.uuid4().hex
+        self.alias = router.db_for_write(queryset.model)
+        self.queryset = queryset.using(self.alias).order_by()
+        self.dependentes = dependentes or {}
+        self.ao_concluir = ao_concluir
+        self.antes_do_lote = antes_do_lote
+        self.tamanho_do_lote = tamanho_do_lote or obtem_configuracao()['TAMANHO_DO_LOTE']
+        self.colecao = queryset.model._meta.label
+        self.situacao = self.PENDENTE
+        self.excluidos = {self.colecao: 0, **{nome: 0 for nome in self.dependentes}}
+        self.lotes = 0
+        self.erro = ''
+        self.iniciada_em = None
+        self.concluida_em = None
+        self.thread = None
+
+    def executa(self) -> Dict[str, int]:
+        """Exclui todos os objetos, um lote por transacao.
+
+        :return: Quantidade de objetos excluidos por colecao.
+        """
+        self.situacao = self.EXECUTANDO
+        self.iniciada_em = timezone.now()
+        try:
+            restantes = self.queryset.order_by('pk').values_list('pk', flat=True)
+            ultimo_pk = None
+            while True:
+                lote = restantes if ultimo_pk is None else restantes.filter(pk__gt=ultimo_pk)
+                pks = list(lote[:self.tamanho_do_lote])
+                if not pks:
+                    break
+                self.exclui_lote(pks)
+                ultimo_pk = pks[-1]
+        except Exception as erro:
+            self.situacao = self.FALHOU
+            self.erro = str(erro)
+            raise
+        finally:
+            self.concluida_em = timezone.now()
+            if self.ao_concluir is not None:
+                self.ao_concluir()
+
+        self.situacao = self.CONCLUIDA
+        return self.excluidos
+
+    def exclui_lote(self, pks: Sequence) -> None:
+        """Exclui os dependentes e os objetos de um lote, em uma transacao.
+
+        :param pks: Pks do lote.
+        """
+        model = self.queryset.model
+        with transaction.atomic(using=self.alias):
+            if self.antes_do_lote is not None:
+                self.antes_do_lote(pks)
+            for nome, dependente in self.dependentes.items():
+                self.excluidos[nome] += dependente(pks)
+            excluidos = model.objects.using(self.alias).filter(pk__in=pks)
+            self.excluidos[self.colecao] += excluidos._raw_delete(self.alias)
+        self.lotes += 1
+
+    def inicia_em_segundo_plano(self) -> 'ExclusaoEmLotes':
+        """Executa a exclusao em uma thread, registrando-a para a consulta do progresso."""
+        with _trava:
+            _remove_expiradas()
+            _exclusoes[self.id] = self
+
+        def executa():
+            try:
+                self.executa()
+            except Exception:
+                logger.exception('Falha na exclusao em lotes %s.', self.id)
+            finally:
+                close_old_connections()
+
+        self.thread = threading.Thread(target=executa, name=f'exclusao-{self.id}', daemon=True)
+        self.thread.start()
+        return self
+
+    def instantaneo(self) -> dict:
+        """Retorna o progresso atual da exclusao.
+
+        :return: Situacao, quantidade de lotes e de objetos excluidos por colecao e datas.
+        """
+        return {
+            'id': self.id,
+            'colecao': self.colecao,
+            'situacao': self.situacao,
+            'lotes': self.lotes,
+            'excluidos': dict(self.excluidos),
+            'erro': self.erro,
+            'iniciada_em': self.iniciada_em,
+            'concluida_em': self.concluida_em,
+        }
+
+
+def obtem_exclusao(id: str) -> Optional[ExclusaoEmLotes]:
+    """Retorna a exclusao em segundo plano com o id informado, se ela foi iniciada neste processo.
+
+    :param id: Id da exclusao.
+
+    :return: Exclusao ou None.
+    """
+    with _trava:
+        _remove_expiradas()
+        return _exclusoes.get(id)
+
+
+def _remove_expiradas() -> None:
+    """Descarta do registro as exclusoes concluidas ha mais de ``RETENCAO`` segundos."""
+    limite = timezone.now() - timedelta(seconds=obtem_configuracao()['RETENCAO'])
+    for id, exclusao in list(_exclusoes.items()):
+        if exclusao.situacao in (exclusao.CONCLUIDA, exclusao.FALHOU) and (
+            exclusao.concluida_em <= limite
+        ):
+            del _exclusoes[id]
+
+
+def excede_limite_sincrono(queryset: QuerySet) -> bool:
+    """Verifica, sem contar a colecao inteira, se o queryset passa de ``LIMITE_SINCRONO`` objetos.
+
+    :param queryset: Objetos a serem excluidos.
+
+    :return: Se a exclusao deve rodar em segundo plano.
+    """
+    limite = obtem_configuracao()['LIMITE_SINCRONO']
+    return queryset.order_by().values('pk')[limite:limite + 1].exists()
+
+
+def resposta_de_exclusao(
+    request: Request, exclusao: ExclusaoEmLotes, mensagem: str,
+) -> JsonResponse:
+    """Executa a exclusao e retorna a resposta do DELETE das listagens.
+
+    Com ``?assincrono=true``, ou quando o queryset passa de ``LIMITE_SINCRONO`` objetos, a
+    exclusao e iniciada em segundo plano e a resposta ``202`` traz o endereco do progresso.
+
+    :param request: Objeto de request.
+    :param exclusao: Exclusao a ser executada.
+    :param mensagem: Mensagem de sucesso, formatada com a quantidade de objetos excluidos.
+
+    :return: Resposta ``204`` com a quantidade excluida ou ``202`` com o progresso da exclusao.
+    """
+    if (
+        request.GET.get(PARAMETRO_ASSINCRONO) == 'true'
+        or excede_limite_sincrono(exclusao.queryset)
+    ):
+        exclusao.inicia_em_segundo_plano()
+        return JsonResponse(
+            {
+                'message': 'Exclusão iniciada em segundo plano.',
+                'progresso': reverse('exclusao_detail', args=[exclusao.id]),
+                **exclusao.instantaneo(),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    excluidos = exclusao.executa()
+    return JsonResponse(
+        {'message': mensagem.format(excluidos[exclusao.colecao]), 'excluidos': excluidos},
+        status=status.HTTP_204_NO_CONTENT,
+    )
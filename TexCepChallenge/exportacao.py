@@ -0,0 +1,107 @@
+"""Exportacao em streaming das colecoes."""
+
+# Importacoes externas.
+import json
+from typing import Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import HttpResponse, StreamingHttpResponse
+from django.http.response import JsonResponse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def resposta_de_exportacao(
+    request: Request,
+    queryset: QuerySet,
+    serializer_class: type,
+    nome: str,
+    campos: Optional[Tuple[str, ...]] = None,
+) -> HttpResponse:
+    """Retorna um StreamingHttpResponse com todos os objetos do queryset.
+
+    O queryset e percorrido com ``.iterator(chunk_size=...)`` e cada objeto e serializado e
+    enviado assim que lido, de modo que a memoria usada nao depende do tamanho da colecao. O
+    formato e escolhido com ``?formato=ndjson`` (padrao, um objeto JSON por linha) ou
+    ``?formato=json`` (um unico array JSON).
+
+    :param request: Objeto de request.
+    :param queryset: Queryset a ser exportado.
+    :param serializer_class: Serializer usado em cada objeto.
+    :param nome: Nome base do arquivo exportado.
+    :param campos: Campos a serem serializados, ou None para todos.
+
+    :return: Resposta em streaming com os objetos serializados ou um json em caso de falha.
+    """
+    formato = request.GET.get('formato', 'ndjson')
+    if formato not in FORMATOS:
+        return JsonResponse(
+            {'message': f'Formato inválido, use um entre: {", ".join(FORMATOS)}.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    linhas = serializa_em_linhas(queryset, serializer_class(campos=campos))
+    if formato == 'json':
+        linhas = em_array_json(linhas)
+
+    response = StreamingHttpResponse(
+        agrupa(linhas, formato == 'ndjson'),
+        content_type=FORMATOS[formato],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{nome}.{formato}"'
+
+    return response
+
+
+def serializa_em_linhas(queryset: QuerySet, serializer: Serializer) -> Iterator[str]:
+    """Serializa os objetos do queryset um a um, lendo-os da base em lotes.
+
+    :param queryset: Queryset a ser serializado.
+    :param serializer: Serializer usado em cada objeto.
+
+    :return: Iterador com o JSON de cada objeto.
+    """
+    tamanho_do_lote = settings.EXPORTACAO['TAMANHO_DO_LOTE']
+
+    for objeto in queryset.iterator(chunk_size=tamanho_do_lote):
+        yield json.dumps(serializer.to_representation(objeto), cls=DjangoJSONEncoder)
+
+
+def em_array_json(linhas: Iterator[str]) -> Iterator[str]:
+    """Envolve as linhas em um unico array JSON.
+
+    :param linhas: JSON de cada objeto.
+
+    :return: Iterador com os pedacos do array.
+    """
+    yield '['
+    for indice, linha in enumerate(linhas):
+        yield f',{linha}' if indice else linha
+    yield ']'
+
+
+def agrupa(linhas: Iterator[str], quebra_de_linha: bool) -> Iterator[bytes]:
+    """Agrupa as linhas em blocos maiores, reduzindo o numero de escritas no socket.
+
+    :param linhas: Pedacos a serem enviados.
+    :param quebra_de_linha: Se cada pedaco deve terminar com ``\\n``.
+
+    :return: Iterador com os blocos codificados em UTF-8.
+    """
+    separador = '\n' if quebra_de_linha else ''
+    bloco = []
+    for linha in linhas:
+        bloco.append(linha + separador)
+        if len(bloco) >= settings.EXPORTACAO['LINHAS_POR_BLOCO']:
+            yield ''.join(bloco).encode('utf-8')
+            bloco = []
+    if bloco:
+        yield ''.join(bloco).encode('utf-8')
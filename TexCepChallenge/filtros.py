@@ -0,0 +1,138 @@
+"""Filtros declarados das rotas de listagem."""
+
+# Importacoes externas.
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Model, QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+
+PARAMETRO_DE_ORDENACAO = 'ordering'
+PARAMETRO_DE_CAMPOS = 'fields'
+
+
+class ConsultaFiltrada(NamedTuple):
+    """Resultado da aplicacao de um EsquemaDeFiltros a uma requisicao."""
+
+    queryset: QuerySet
+    ordenacao: Tuple[str, ...]
+    campos: Optional[Tuple[str, ...]]
+
+
+class EsquemaDeFiltros:
+    """Define quais filtros, ordenacoes e projecoes uma rota de listagem aceita.
+
+    Apenas campos indexados e operadores baratos devem ser declarados, de modo que nenhum
+    parametro enviado pelo cliente gere uma varredura completa da colecao. Parametros nao
+    declarados resultam em 400.
+
+    Exemplo: ``?uf__in=PI,CE&ordering=-cidade&fields=cep,cidade``.
+    """
+
+    def __init__(
+        self,
+        model: type,
+        serializer_class: type,
+        filtros: Dict[str, Iterable[str]],
+        ordenaveis: Iterable[str],
+        ignorados: Iterable[str] = (),
+    ):
+        """Inicializa o esquema.
+
+        :param model: Model consultado.
+        :param serializer_class: Serializer da listagem; apenas os seus campos legiveis podem ser
+            pedidos em ``fields``.
+        :param filtros: Operadores aceitos por campo (``exact`` para igualdade).
+        :param ordenaveis: Campos aceitos em ``ordering``.
+        :param ignorados: Parametros tratados por outra parte da rota (ex.: paginacao).
+        """
+        self.model: Model = model
+        self.serializer_class = serializer_class
+        self.filtros = {campo: set(operadores) for campo, operadores in filtros.items()}
+        self.ordenaveis = set(ordenaveis)
+        self.ignorados = {PARAMETRO_DE_ORDENACAO, PARAMETRO_DE_CAMPOS, *ignorados}
+
+    @cached_property
+    def projetaveis(self) -> set:
+        """Campos legiveis do serializer que sao colunas do model, aceitos em ``fields``."""
+        colunas = {field.name for field in self.model._meta.concrete_fields}
+        return {
+            nome for nome, campo in self.serializer_class().fields.items()
+            if not campo.write_only and campo.source in colunas
+        }
+
+    def aplica(self, request: Request, queryset: QuerySet) -> ConsultaFiltrada:
+        """Aplica os filtros, a ordenacao e a projecao pedidos na requisicao.
+
+        :param request: Objeto de request.
+        :param queryset: Queryset a ser filtrado.
+
+        :return: Queryset filtrado, ordenacao e campos pedidos.
+
+        :raises ValidationError: Caso algum parametro nao seja aceito pelo esquema.
+        """
+        erros: List[str] = []
+        filtros = {}
+
+        for parametro in request.GET:
+            if parametro in self.ignorados:
+                continue
+            campo, _, operador = parametro.partition('__')
+            operador = operador or 'exact'
+            if operador not in self.filtros.get(campo, ()):
+                erros.append(f'Filtro "{parametro}" não permitido.')
+                continue
+            try:
+                filtros[parametro] = self._converte(campo, operador, request.GET.getlist(parametro))
+            except DjangoValidationError:
+                erros.append(f'Valor inválido para o filtro "{parametro}".')
+
+        ordenacao = self._ordenacao(request, erros)
+        campos = self._campos(request, erros)
+
+        if erros:
+            raise ValidationError({'filtros': erros})
+
+        queryset = queryset.filter(**filtros)
+        if campos:
+            colunas = {'pk', *campos, *(campo.lstrip('-') for campo in ordenacao)}
+            queryset = queryset.only(*colunas)
+
+        return ConsultaFiltrada(queryset, ordenacao, campos)
+
+    def _converte(self, campo: str, operador: str, valores: List[str]):
+        field = self.model._meta.get_field(campo)
+        if operador == 'isnull':
+            return valores[-1].lower() in ('1', 'true')
+        if operador == 'in':
+            return [
+                field.to_python(valor)
+                for lista in valores
+                for valor in lista.split(',')
+                if valor
+            ]
+        return field.to_python(valores[-1])
+
+    def _ordenacao(self, request: Request, erros: List[str]) -> Tuple[str, ...]:
+        parametro = request.GET.get(PARAMETRO_DE_ORDENACAO)
+        if not parametro:
+            return ('pk',)
+
+        ordenacao = tuple(campo.strip() for campo in parametro.split(',') if campo.strip())
+        for campo in ordenacao:
+            if campo.lstrip('-') not in self.ordenaveis:
+                erros.append(f'Ordenação por "{campo}" não permitida.')
+        return ordenacao
+
+    def _campos(self, request: Request, erros: List[str]) -> Optional[Tuple[str, ...]]:
+        parametro = request.GET.get(PARAMETRO_DE_CAMPOS)
+        if not parametro:
+            return None
+
+        campos = tuple(campo.strip() for campo in parametro.split(',') if campo.strip())
+        for campo in campos:
+            if campo not in self.projetaveis:
+                erros.append(f'Campo "{campo}" não existe.')
+        return campos
@@ -0,0 +1,243 @@
+"""Instrumentacao das requisicoes: latencia, consultas a base, provedor de CEP e serializacao.
+
+O ``MiddlewareDeInstrumentacao`` abre uma ``Medicao`` por requisicao, guardada em uma
+``ContextVar`` (propagada tambem as views assincronas e ao ``sync_to_async``). As consultas a base
+sao medidas por um ``execute_wrapper`` instalado em cada conexao, e as etapas da view (consulta
+ao provedor de CEP e serializacao) sao medidas com ``mede``. Ao fim da requisicao, os valores
+sao agregados nos histogramas de ``metricas_de_rotas``, por rota e metodo, expostos em
+``/metrics``, e as requisicoes mais lentas que ``INSTRUMENTACAO['LIMITE_DE_LENTIDAO']`` sao
+registradas em log como uma linha JSON.
+"""
+
+# Importacoes externas.
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpRequest, HttpResponse
+
+# Importacoes internas.
+from TexCepChallenge.metricas import Histograma
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACAO_PADRAO = {
+    'LIMITE_DE_LENTIDAO': 1.0,
+}
+
+# Limites dos baldes da quantidade de consultas por requisicao e do tamanho das respostas.
+LIMITES_DE_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_DE_TAMANHO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+ETAPAS = ('provedor', 'serializacao')
+
+_medicao_atual: ContextVar[Optional['Medicao']] = ContextVar('medicao_atual', default=None)
+
+
+def obtem_configuracao() -> dict:
+    """Retorna a configuracao definida em ``settings.INSTRUMENTACAO``."""
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'INSTRUMENTACAO', {})}
+
+
+class Medicao:
+    """Tempos e consultas acumulados durante uma requisicao."""
+
+    def __init__(self):
+        """Inicializa a medicao zerada."""
+        self.consultas = 0
+        self.tempo_de_consultas = 0.0
+        self.etapas = {etapa: 0.0 for etapa in ETAPAS}
+        self._trava = threading.Lock()
+
+    def registra_consulta(self, duracao: float) -> None:
+        """Registra uma consulta a base.
+
+        :param duracao: Duracao da consulta, em segundos.
+        """
+        with self._trava:
+            self.consultas += 1
+            self.tempo_de_consultas += duracao
+
+    def registra_etapa(self, etapa: str, duracao: float) -> None:
+        """Acumula o tempo gasto em uma etapa da view.
+
+        :param etapa: Uma das ``ETAPAS``.
+        :param duracao: Duracao, em segundos.
+        """
+        with self._trava:
+            self.etapas[etapa] += duracao
+
+
+class MetricasDeRota:
+    """Histogramas de uma rota e metodo."""
+
+    def __init__(self):
+        """Inicializa os histogramas vazios."""
+        self.duracao = Histograma()
+        self.consultas = Histograma(LIMITES_DE_CONSULTAS)
+        self.tempo_de_consultas = Histograma()
+        self.etapas = {etapa: Histograma() for etapa in ETAPAS}
+        self.tamanho = Histograma(LIMITES_DE_TAMANHO)
+
+    def observa(self, duracao: float, medicao: Medicao, tamanho: Optional[int]) -> None:
+        """Agrega a medicao de uma requisicao.
+
+        :param duracao: Duracao total da requisicao, em segundos.
+        :param medicao: Medicao da requisicao.
+        :param tamanho: Tamanho do corpo da resposta, em bytes, ou None em respostas em streaming.
+        """
+        self.duracao.observa(duracao)
+        self.consultas.observa(medicao.consultas)
+        self.tempo_de_consultas.observa(medicao.tempo_de_consultas)
+        for etapa, tempo in medicao.etapas.items():
+            self.etapas[etapa].observa(tempo)
+        if tamanho is not None:
+            self.tamanho.observa(tamanho)
+
+
+metricas_de_rotas: Dict[Tuple[str, str], MetricasDeRota] = defaultdict(MetricasDeRota)
+
+
+@contextmanager
+def mede(etapa: str):
+    """Mede o tempo do bloco como uma etapa da requisicao atual; fora de requisicoes, nao faz
+    nada.
+
+    :param etapa: Uma das ``ETAPAS``.
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicao.registra_etapa(etapa, time.perf_counter() - inicio)
+
+
+def registra_consulta(execute: Callable, sql: str, params, many: bool, context: dict):
+    """``execute_wrapper`` que mede as consultas feitas durante uma requisicao instrumentada."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.registra_consulta(time.perf_counter() - inicio)
+
+
+def instala_em(conexao) -> None:
+    """Instala ``registra_consulta`` na conexao, caso ainda nao esteja instalado.
+
+    :param conexao: DatabaseWrapper de uma base.
+    """
+    if registra_consulta not in conexao.execute_wrappers:
+        conexao.execute_wrappers.append(registra_consulta)
+
+
+def _ao_criar_conexao(sender, connection, **kwargs):
+    instala_em(connection)
+
+
+connection_created.connect(_ao_criar_conexao)
+
+
+class MiddlewareDeInstrumentacao:
+    """Mede cada requisicao e agrega o resultado em ``metricas_de_rotas``.
+
+    Atende tanto ao WSGI quanto ao ASGI: servido por ASGI, o restante da cadeia e aguardado sem
+    ser levado para uma thread, mantendo as views assincronas concorrentes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        """Inicializa o middleware.
+
+        :param get_response: Proximo passo do processamento da requisicao.
+        """
+        self.get_response = get_response
+        self.assincrono = asyncio.iscoroutinefunction(get_response)
+        if self.assincrono:
+            # Marca a instancia como corrotina, como faz o MiddlewareMixin do Django.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        for alias in connections:
+            instala_em(connections[alias])
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """Processa a requisicao dentro de uma ``Medicao``.
+
+        :param request: Objeto de request.
+
+        :return: Resposta da view.
+        """
+        if self.assincrono:
+            return self.__acall__(request)
+
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        self.registra(request, response, medicao, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Versao assincrona de ``__call__``."""
+        medicao = Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao_atual.reset(token)
+        self.registra(request, response, medicao, time.perf_counter() - inicio)
+        return response
+
+    def registra(
+        self, request: HttpRequest, response: HttpResponse, medicao: Medicao, duracao: float,
+    ) -> None:
+        """Agrega a medicao da requisicao e registra em log as requisicoes lentas.
+
+        :param request: Objeto de request.
+        :param response: Resposta da view.
+        :param medicao: Medicao da requisicao.
+        :param duracao: Duracao total da requisicao, em segundos.
+        """
+        resolver_match = getattr(request, 'resolver_match', None)
+        rota = resolver_match.url_name if resolver_match and resolver_match.url_name else ''
+        tamanho = None if response.streaming else len(response.content)
+        metricas_de_rotas[rota or 'desconhecida', request.method].observa(
+            duracao, medicao, tamanho,
+        )
+
+        limite_de_lentidao = obtem_configuracao()['LIMITE_DE_LENTIDAO']
+        if limite_de_lentidao is not None and duracao >= limite_de_lentidao:
+            logger.warning(json.dumps({
+                'evento': 'requisicao_lenta',
+                'rota': rota,
+                'metodo': request.method,
+                'caminho': request.path,
+                'status': response.status_code,
+                'duracao': round(duracao, 6),
+                'consultas': medicao.consultas,
+                'tempo_de_consultas': round(medicao.tempo_de_consultas, 6),
+                **{etapa: round(tempo, 6) for etapa, tempo in medicao.etapas.items()},
+                'bytes': tamanho,
+            }))
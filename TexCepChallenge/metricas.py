@@ -0,0 +1,125 @@
+"""Metricas mantidas em memoria pelo processo e a sua formatacao para o Prometheus."""
+
+# Importacoes externas.
+import bisect
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+# Limites superiores, em segundos, dos baldes de latencia (os mesmos do cliente Prometheus).
+LIMITES_DE_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histograma:
+    """Histograma de baldes fixos, seguro para uso entre threads."""
+
+    def __init__(self, limites: Iterable[float] = LIMITES_DE_LATENCIA):
+        """Inicializa o histograma vazio.
+
+        :param limites: Limites superiores dos baldes, em ordem crescente. Valores acima do
+            ultimo limite sao contados no balde ``+Inf``.
+        """
+        self.limites: Tuple[float, ...] = tuple(limites)
+        self._contagens = [0] * (len(self.limites) + 1)
+        self._soma = 0.0
+        self._trava = threading.Lock()
+
+    def observa(self, valor: float) -> None:
+        """Registra uma observacao.
+
+        :param valor: Valor observado.
+        """
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._trava:
+            self._contagens[indice] += 1
+            self._soma += valor
+
+    def instantaneo(self) -> dict:
+        """Retorna o estado atual do histograma.
+
+        Os percentis sao estimados pelo limite superior do balde em que caem.
+
+        :return: Total, soma, contagem acumulada por limite e percentis 50, 95 e 99.
+        """
+        with self._trava:
+            contagens = list(self._contagens)
+            soma = self._soma
+
+        total = sum(contagens)
+        acumuladas, acumulado = [], 0
+        for contagem in contagens:
+            acumulado += contagem
+            acumuladas.append(acumulado)
+
+        return {
+            'total': total,
+            'soma': soma,
+            'baldes': {
+                str(limite): acumulada
+                for limite, acumulada in zip((*self.limites, '+Inf'), acumuladas)
+            },
+            'p50': self._percentil(acumuladas, total, 0.50),
+            'p95': self._percentil(acumuladas, total, 0.95),
+            'p99': self._percentil(acumuladas, total, 0.99),
+        }
+
+    def _percentil(self, acumuladas: list, total: int, fracao: float):
+        if not total:
+            return None
+        indice = bisect.bisect_left(acumuladas, fracao * total)
+        return self.limites[indice] if indice < len(self.limites) else '+Inf'
+
+
+def formata_rotulos(rotulos: Dict[str, object]) -> str:
+    """Formata os rotulos de uma serie no formato texto do Prometheus.
+
+    :param rotulos: Nome e valor de cada rotulo.
+
+    :return: Rotulos entre chaves, ou texto vazio sem rotulos.
+    """
+    if not rotulos:
+        return ''
+    pares = ','.join(
+        '{}="{}"'.format(
+            nome, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'),
+        )
+        for nome, valor in rotulos.items()
+    )
+    return f'{{{pares}}}'
+
+
+def linhas_de_histograma(
+    nome: str, descricao: str, series: Iterable[Tuple[Dict[str, object], dict]],
+) -> List[str]:
+    """Formata histogramas no formato texto do Prometheus.
+
+    :param nome: Nome da metrica.
+    :param descricao: Texto do ``# HELP``.
+    :param series: Rotulos e ``Histograma.instantaneo`` de cada serie.
+
+    :return: Linhas da metrica.
+    """
+    linhas = [f'# HELP {nome} {descricao}', f'# TYPE {nome} histogram']
+    for rotulos, instantaneo in series:
+        for limite, acumulada in instantaneo['baldes'].items():
+            linhas.append(f'{nome}_bucket{formata_rotulos({**rotulos, "le": limite})} {acumulada}')
+        linhas.append(f'{nome}_sum{formata_rotulos(rotulos)} {instantaneo["soma"]}')
+        linhas.append(f'{nome}_count{formata_rotulos(rotulos)} {instantaneo["total"]}')
+    return linhas
+
+
+def linhas_de_valor(
+    nome: str, tipo: str, descricao: str, series: Iterable[Tuple[Dict[str, object], float]],
+) -> List[str]:
+    """Formata contadores ou medidores no formato texto do Prometheus.
+
+    :param nome: Nome da metrica.
+    :param tipo: ``counter`` ou ``gauge``.
+    :param descricao: Texto do ``# HELP``.
+    :param series: Rotulos e valor de cada serie.
+
+    :return: Linhas da metrica.
+    """
+    linhas = [f'# HELP {nome} {descricao}', f'# TYPE {nome} {tipo}']
+    for rotulos, valor in series:
+        linhas.append(f'{nome}{formata_rotulos(rotulos)} {valor}')
+    return linhas
@@ -0,0 +1,124 @@
+"""Paginacao das rotas de listagem."""
+
+# Importacoes externas.
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.http.response import JsonResponse
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.serializers import Serializer
+
+# Importacoes internas.
+from TexCepChallenge.condicional import aplica_cache_control, obtem_configuracao
+from TexCepChallenge.instrumentacao import mede
+from TexCepChallenge.renderizacao import RepresentacaoRapida, resposta_json
+
+PARAMETROS_DE_PAGINACAO = ('cursor', 'page_size')
+
+
+def com_desempate(ordenacao: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Acrescenta o pk a ordenacao, caso ela ainda nao o tenha, para que seja deterministica.
+
+    :param ordenacao: Campos da ordenacao, com ``-`` para os decrescentes.
+
+    :return: Ordenacao terminada pelo pk, no sentido do ultimo campo informado.
+    """
+    if {'pk', 'id'} & {campo.lstrip('-') for campo in ordenacao}:
+        return ordenacao
+    return ordenacao + (('-pk',) if ordenacao[-1].startswith('-') else ('pk',))
+
+
+class PaginacaoPorCursor(CursorPagination):
+    """Paginacao por cursor opaco, por padrao sobre o pk.
+
+    Cada pagina e obtida com um filtro ``campo > ultimo valor`` em vez de ``OFFSET``, de modo
+    que o custo de qualquer pagina e o mesmo, independente do tamanho da colecao. A ordenacao
+    sempre termina pelo pk, ver ``com_desempate``.
+    """
+
+    ordering = 'pk'
+    cursor_query_param = PARAMETROS_DE_PAGINACAO[0]
+    page_size_query_param = PARAMETROS_DE_PAGINACAO[1]
+
+    def get_page_size(self, request: Request) -> int:
+        """[Overrides CursorPagination.get_page_size]
+
+        Os tamanhos padrao e maximo sao lidos de ``settings.PAGINACAO`` a cada requisicao.
+        """
+        self.page_size = settings.PAGINACAO['TAMANHO_PADRAO']
+        self.max_page_size = settings.PAGINACAO['TAMANHO_MAXIMO']
+        return super().get_page_size(request)
+
+    def get_ordering(self, request: Request, queryset: QuerySet, view) -> Tuple[str, ...]:
+        """[Overrides CursorPagination.get_ordering]"""
+        return com_desempate(super().get_ordering(request, queryset, view))
+
+
+def resposta_paginada(
+    request: Request,
+    queryset: QuerySet,
+    serializer_class: type,
+    ordenacao: Tuple[str, ...] = ('pk',),
+    campos: Optional[Tuple[str, ...]] = None,
+) -> JsonResponse:
+    """Retorna o Json Response com uma pagina do queryset e os links das paginas vizinhas.
+
+    :param request: Objeto de request, de onde sao lidos ``cursor`` e ``page_size``.
+    :param queryset: Queryset a ser paginado.
+    :param serializer_class: Serializer usado nos objetos da pagina.
+    :param ordenacao: Ordenacao da paginacao; o cursor e montado sobre o primeiro campo.
+    :param campos: Campos a serem serializados, ou None para todos.
+
+    :return: Resposta com ``next``, ``previous`` e ``results``.
+    """
+    paginacao = PaginacaoPorCursor()
+    paginacao.ordering = ordenacao
+    pagina = paginacao.paginate_queryset(queryset, request)
+    serializer: Serializer = serializer_class(pagina, many=True, campos=campos)
+
+    with mede('serializacao'):
+        response = JsonResponse({
+            'next': paginacao.get_next_link(),
+            'previous': paginacao.get_previous_link(),
+            'results': serializer.data,
+        })
+
+    return aplica_cache_control(response, obtem_configuracao()['MAX_AGE'])
+
+
+def resposta_paginada_rapida(
+    request: Request,
+    queryset: QuerySet,
+    representacao: RepresentacaoRapida,
+    ordenacao: Tuple[str, ...] = ('pk',),
+    campos: Optional[Tuple[str, ...]] = None,
+) -> HttpResponse:
+    """Versao de ``resposta_paginada`` que le a pagina com ``.values()`` e a representa com a
+    RepresentacaoRapida, sem instanciar objetos do modelo nem o serializer.
+
+    :param request: Objeto de request, de onde sao lidos ``cursor`` e ``page_size``.
+    :param queryset: Queryset a ser paginado.
+    :param representacao: Representacao usada nas linhas da pagina.
+    :param ordenacao: Ordenacao da paginacao; o cursor e montado sobre o primeiro campo.
+    :param campos: Campos a serem representados, ou None para todos.
+
+    :return: Resposta com ``next``, ``previous`` e ``results``.
+    """
+    colunas = {
+        *representacao.colunas(campos), *(campo.lstrip('-') for campo in com_desempate(ordenacao)),
+    }
+    paginacao = PaginacaoPorCursor()
+    paginacao.ordering = ordenacao
+    pagina = paginacao.paginate_queryset(queryset.values(*colunas), request)
+
+    with mede('serializacao'):
+        response = resposta_json({
+            'next': paginacao.get_next_link(),
+            'previous': paginacao.get_previous_link(),
+            'results': representacao.representa(pagina, campos),
+        })
+
+    return aplica_cache_control(response, obtem_configuracao()['MAX_AGE'])
@@ -0,0 +1,212 @@
+"""Renderizacao rapida, somente leitura, das rotas de consulta mais acessadas.
+
+Em vez de instanciar o ModelSerializer (com a introspeccao dos campos a cada uso) sobre objetos
+do modelo, a ``RepresentacaoRapida`` monta uma unica vez, a partir do serializer, a lista de
+campos e conversores e a aplica diretamente as linhas de ``.values()``. O resultado e o mesmo do
+serializer e e codificado com o ``orjson``, quando instalado, ou com o ``json`` da biblioteca
+padrao. As rotas que usam esse caminho sao as de ``RENDERIZACAO_RAPIDA['ROTAS']``.
+"""
+
+# Importacoes externas.
+import json
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework import serializers
+from rest_framework.request import Request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Campos cujo valor lido da base ja e o valor serializado.
+CAMPOS_DIRETOS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.IntegerField,
+)
+
+
+class RepresentacaoRapida:
+    """Representacao somente leitura de um ModelSerializer sobre linhas de ``.values()``.
+
+    Campos aninhados (serializers de relacoes) sao lidos com uma unica consulta ``pk__in`` por
+    relacao, como o ``prefetch_related`` das listagens, ou na mesma consulta, como o
+    ``select_related``, quando as linhas trazem as colunas de ``colunas_com_relacoes``.
+    """
+
+    def __init__(self, serializer_class: type):
+        """Inicializa a representacao; os campos sao compilados no primeiro uso.
+
+        :param serializer_class: ModelSerializer representado.
+        """
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self._campos: Optional[List[Tuple[str, str, Optional[Callable]]]] = None
+        self._relacoes = {}
+        self._trava = threading.Lock()
+
+    @property
+    def campos(self) -> List[Tuple[str, str, Optional[Callable]]]:
+        """Nome, coluna e conversor de cada campo legivel, na ordem do serializer."""
+        if self._campos is None:
+            with self._trava:
+                if self._campos is None:
+                    self._campos = self._compila()
+        return self._campos
+
+    def _compila(self) -> List[Tuple[str, str, Optional[Callable]]]:
+        campos = []
+        for nome, campo in self.serializer_class().fields.items():
+            if campo.write_only:
+                continue
+            if isinstance(campo, serializers.BaseSerializer):
+                self._relacoes[nome] = RepresentacaoRapida(type(campo))
+                conversor = None
+            elif type(campo) in CAMPOS_DIRETOS:
+                conversor = None
+            else:
+                conversor = campo.to_representation
+            campos.append((nome, campo.source, conversor))
+        return campos
+
+    def colunas(self, campos: Optional[Iterable[str]] = None) -> List[str]:
+        """Retorna as colunas a serem lidas com ``.values()``.
+
+        :param campos: Campos a serem representados, ou None para todos.
+
+        :return: Colunas dos campos.
+        """
+        return [coluna for nome, coluna, _ in self.campos if campos is None or nome in campos]
+
+    def colunas_com_relacoes(self, campos: Optional[Iterable[str]] = None) -> List[str]:
+        """Retorna as colunas dos campos e, para os campos aninhados, as colunas da relacao.
+
+        :param campos: Campos a serem representados, ou None para todos.
+
+        :return: Colunas a serem lidas com ``.values()`` em uma unica consulta.
+        """
+        colunas = self.colunas(campos)
+        for nome, coluna, _ in self.campos:
+            representacao = self._relacoes.get(nome)
+            if representacao is not None and coluna in colunas:
+                colunas.extend(f'{coluna}__{outra}' for outra in representacao.colunas())
+        return colunas
+
+    def representa(self, linhas: Iterable[dict], campos: Optional[Iterable[str]] = None) -> list:
+        """Converte as linhas lidas da base nos dados que o serializer produziria.
+
+        :param linhas: Linhas de ``.values()`` com as ``colunas`` dos campos.
+        :param campos: Campos a serem representados, ou None para todos.
+
+        :return: Dados serializados de cada linha.
+        """
+        linhas = list(linhas)
+        selecionados = [campo for campo in self.campos if campos is None or campo[0] in campos]
+
+        relacionados = {}
+        for nome, coluna, _ in selecionados:
+            representacao = self._relacoes.get(nome)
+            if representacao is not None:
+                relacionados[nome] = self._representa_relacao(representacao, coluna, linhas)
+
+        resultado = []
+        for indice, linha in enumerate(linhas):
+            dados = {}
+            for nome, coluna, conversor in selecionados:
+                valor = linha[coluna]
+                if valor is None:
+                    dados[nome] = None
+                elif nome in relacionados:
+                    dados[nome] = relacionados[nome](indice, valor)
+                else:
+                    dados[nome] = conversor(valor) if conversor else valor
+            resultado.append(dados)
+
+        return resultado
+
+    @staticmethod
+    def _representa_relacao(
+        representacao: 'RepresentacaoRapida', coluna: str, linhas: List[dict],
+    ) -> Callable[[int, object], Optional[dict]]:
+        colunas = {outra: f'{coluna}__{outra}' for outra in representacao.colunas()}
+        if linhas and next(iter(colunas.values())) in linhas[0]:
+            juntas = representacao.representa(
+                {outra: linha[junta] for outra, junta in colunas.items()} for linha in linhas
+            )
+            return lambda indice, valor: juntas[indice]
+
+        por_pk = representacao.por_pk(
+            {linha[coluna] for linha in linhas if linha[coluna] is not None},
+        )
+        return lambda indice, valor: por_pk.get(valor)
+
+    def por_pk(self, pks: Iterable) -> dict:
+        """Le e representa os objetos com os pks informados, em uma unica consulta.
+
+        :param pks: Pks dos objetos.
+
+        :return: Dados serializados indexados pelo pk.
+        """
+        pks = list(pks)
+        if not pks:
+            return {}
+
+        coluna_pk = self.model._meta.pk.attname
+        linhas = list(
+            self.model.objects.filter(pk__in=pks).values(*{coluna_pk, *self.colunas()})
+        )
+        return {linha[coluna_pk]: dados for linha, dados in zip(linhas, self.representa(linhas))}
+
+    def obtem(self, **filtros) -> Optional[dict]:
+        """Le e representa o primeiro objeto que atende aos filtros, com as relacoes na mesma
+        consulta.
+
+        :param filtros: Filtros repassados ao ``filter``.
+
+        :return: Dados serializados do objeto ou None caso ele nao exista.
+        """
+        linha = self.model.objects.filter(**filtros).values(*self.colunas_com_relacoes()).first()
+        if linha is None:
+            return None
+        return self.representa([linha])[0]
+
+
+def codifica_json(dados) -> bytes:
+    """Codifica os dados em JSON, com o ``orjson`` quando instalado.
+
+    :param dados: Dados a serem codificados.
+
+    :return: JSON codificado em UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(dados)
+    return json.dumps(dados, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+def resposta_json(dados, status: int = 200) -> HttpResponse:
+    """Equivalente ao JsonResponse, usando ``codifica_json``.
+
+    :param dados: Dados da resposta.
+    :param status: Status HTTP.
+
+    :return: Resposta JSON.
+    """
+    return HttpResponse(codifica_json(dados), content_type='application/json', status=status)
+
+
+def usa_renderizacao_rapida(request: Request) -> bool:
+    """Verifica se a rota da requisicao esta em ``RENDERIZACAO_RAPIDA['ROTAS']``.
+
+    :param request: Objeto de request.
+
+    :return: Se a rota deve usar a renderizacao rapida.
+    """
+    resolver_match = getattr(request, 'resolver_match', None)
+    rotas = getattr(settings, 'RENDERIZACAO_RAPIDA', {}).get('ROTAS', ())
+    return resolver_match is not None and resolver_match.url_name in rotas
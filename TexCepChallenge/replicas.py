@@ -0,0 +1,249 @@
+"""Leitura em replicas da base para as rotas de consulta.
+
+O ``MiddlewareDeReplicas`` escolhe, para as requisicoes ``GET`` das rotas em
+``REPLICAS_DE_LEITURA['ROTAS']``, uma das replicas de ``REPLICAS_DE_LEITURA['ALIASES']`` (em
+rodizio), e o ``RoteadorDeReplicas`` envia para ela as leituras da requisicao. As escritas vao
+sempre para a base principal e, depois da primeira escrita (ou dentro de uma transacao), as
+leituras da mesma requisicao tambem. Para que o cliente leia o que acabou de gravar, as respostas
+de requisicoes que escreveram na base levam o cookie ``COOKIE_DE_ESCRITA``, e as requisicoes com
+esse cookie leem da principal durante ``REPLICAS_DE_LEITURA['JANELA_DE_CONSISTENCIA']`` segundos.
+
+Uma replica que nao aceita conexao e evitada durante ``REPLICAS_DE_LEITURA['TEMPO_FORA']``
+segundos, com o mesmo Disjuntor dos provedores de CEP; sem replicas disponiveis, a leitura e
+feita na principal.
+"""
+
+# Importacoes externas.
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.utils import ConnectionDoesNotExist
+from django.dispatch import receiver
+from django.http import HttpRequest, HttpResponse
+from django.urls import Resolver404, resolve
+
+# Importacoes internas.
+from cep.cliente import Disjuntor
+
+logger = logging.getLogger(__name__)
+
+COOKIE_DE_ESCRITA = 'tex_escrita'
+
+CONFIGURACAO_PADRAO = {
+    'ALIASES': [],
+    'ROTAS': [],
+    'JANELA_DE_CONSISTENCIA': 5,
+    'TEMPO_FORA': 30,
+}
+
+_disjuntores: Dict[str, Disjuntor] = {}
+_rodizio = itertools.count()
+_trava = threading.Lock()
+
+
+def obtem_configuracao() -> dict:
+    """Retorna a configuracao definida em ``settings.REPLICAS_DE_LEITURA``."""
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'REPLICAS_DE_LEITURA', {})}
+
+
+@receiver(setting_changed)
+def redefine_disjuntores(setting: str, **kwargs) -> None:
+    """Descarta os disjuntores das replicas quando ``REPLICAS_DE_LEITURA`` e alterado."""
+    if setting in ('REPLICAS_DE_LEITURA', 'DATABASES'):
+        with _trava:
+            _disjuntores.clear()
+
+
+class EstadoDaRequisicao:
+    """Replica escolhida para as leituras de uma requisicao e se ela ja escreveu na base."""
+
+    def __init__(self, replica: Optional[str] = None):
+        """Inicializa o estado.
+
+        :param replica: Alias da replica, ou None para ler da principal.
+        """
+        self.replica = replica
+        self.escreveu = False
+
+
+_estado_atual: ContextVar[Optional[EstadoDaRequisicao]] = ContextVar(
+    'estado_de_replicas', default=None,
+)
+
+
+@contextmanager
+def estado_da_requisicao(replica: Optional[str] = None):
+    """Define o estado usado pelo roteador durante o bloco.
+
+    :param replica: Alias da replica das leituras, ou None para ler da principal.
+    """
+    estado = EstadoDaRequisicao(replica)
+    token = _estado_atual.set(estado)
+    try:
+        yield estado
+    finally:
+        _estado_atual.reset(token)
+
+
+def alias_de_leitura() -> str:
+    """Retorna o alias da base de onde as leituras sao feitas no momento.
+
+    :return: Replica da requisicao atual ou a base principal.
+    """
+    estado = _estado_atual.get()
+    if (
+        estado is None
+        or estado.replica is None
+        or estado.escreveu
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+    ):
+        return DEFAULT_DB_ALIAS
+    return estado.replica
+
+
+def escolhe_replica() -> Optional[str]:
+    """Escolhe, em rodizio, uma replica disponivel, conectando-se a ela caso necessario.
+
+    :return: Alias da replica ou None caso nenhuma esteja disponivel.
+    """
+    configuracao = obtem_configuracao()
+    aliases = configuracao['ALIASES']
+    for _ in range(len(aliases)):
+        alias = aliases[next(_rodizio) % len(aliases)]
+        with _trava:
+            disjuntor = _disjuntores.setdefault(alias, Disjuntor(1, configuracao['TEMPO_FORA']))
+        if not disjuntor.permite():
+            continue
+        try:
+            connections[alias].ensure_connection()
+        except (ConnectionDoesNotExist, DatabaseError) as erro:
+            disjuntor.registra_falha()
+            logger.warning('Replica %s indisponivel, lendo da base principal: %s', alias, erro)
+            continue
+        disjuntor.registra_sucesso()
+        return alias
+    return None
+
+
+def le_da_replica(request: HttpRequest) -> bool:
+    """Verifica se as leituras da requisicao podem ser feitas em uma replica.
+
+    :param request: Objeto de request.
+
+    :return: Se a requisicao e um GET de uma das ``ROTAS``, sem escrita recente do cliente.
+    """
+    configuracao = obtem_configuracao()
+    if not configuracao['ALIASES'] or request.method not in ('GET', 'HEAD'):
+        return False
+
+    escrita = request.COOKIES.get(COOKIE_DE_ESCRITA)
+    if escrita:
+        try:
+            if time.time() - float(escrita) < configuracao['JANELA_DE_CONSISTENCIA']:
+                return False
+        except ValueError:
+            pass
+
+    try:
+        rota = resolve(request.path_info).url_name
+    except Resolver404:
+        return False
+    return rota in configuracao['ROTAS']
+
+
+class RoteadorDeReplicas:
+    """Roteador do Django que envia as leituras ao ``alias_de_leitura`` e as escritas a base
+    principal.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        """Base das leituras do modelo."""
+        return alias_de_leitura()
+
+    def db_for_write(self, model, **hints) -> str:
+        """Base das escritas do modelo, registrando a escrita na requisicao atual."""
+        estado = _estado_atual.get()
+        if estado is not None:
+            estado.escreveu = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """As replicas tem os mesmos dados da principal, entao as relacoes sao permitidas."""
+        return True
+
+    def allow_migrate(self, db: str, app_label: str, model_name=None, **hints) -> Optional[bool]:
+        """As migracoes sao aplicadas apenas na principal e replicadas pela propria base."""
+        if db in obtem_configuracao()['ALIASES']:
+            return False
+        return None
+
+
+class MiddlewareDeReplicas:
+    """Define a replica das leituras de cada requisicao e o cookie de leitura na principal.
+
+    Atende tanto ao WSGI quanto ao ASGI, sem levar as requisicoes ASGI para uma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        """Inicializa o middleware.
+
+        :param get_response: Proximo passo do processamento da requisicao.
+        """
+        self.get_response = get_response
+        self.assincrono = asyncio.iscoroutinefunction(get_response)
+        if self.assincrono:
+            # Marca a instancia como corrotina, como faz o MiddlewareMixin do Django.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        """Processa a requisicao com o estado de replicas definido.
+
+        :param request: Objeto de request.
+
+        :return: Resposta da view.
+        """
+        if self.assincrono:
+            return self.__acall__(request)
+
+        replica = escolhe_replica() if le_da_replica(request) else None
+        with estado_da_requisicao(replica) as estado:
+            response = self.get_response(request)
+        return self.marca_escrita(response, estado)
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Versao assincrona de ``__call__``."""
+        replica = None
+        if le_da_replica(request):
+            replica = await sync_to_async(escolhe_replica)()
+        with estado_da_requisicao(replica) as estado:
+            response = await self.get_response(request)
+        return self.marca_escrita(response, estado)
+
+    def marca_escrita(self, response: HttpResponse, estado: EstadoDaRequisicao) -> HttpResponse:
+        """Define o cookie de escrita caso a requisicao tenha escrito na base.
+
+        :param response: Resposta da view.
+        :param estado: Estado de replicas da requisicao.
+
+        :return: A propria resposta.
+        """
+        if estado.escreveu:
+            response.set_cookie(
+                COOKIE_DE_ESCRITA, str(time.time()),
+                max_age=obtem_configuracao()['JANELA_DE_CONSISTENCIA'], httponly=True,
+                samesite='Lax',
+            )
+        return response
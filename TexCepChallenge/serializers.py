@@ -0,0 +1,13 @@
+"""Serializers compartilhados."""
+
+
+class CamposDinamicosMixin:
+    """Permite restringir os campos serializados com o argumento ``campos``."""
+
+    def __init__(self, *args, campos=None, **kwargs):
+        """[Overrides Serializer.__init__]"""
+        super().__init__(*args, **kwargs)
+
+        if campos is not None:
+            for nome in set(self.fields) - set(campos):
+                self.fields.pop(nome)
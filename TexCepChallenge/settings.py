@@ -44,7 +44,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'TexCepChallenge.instrumentacao.MiddlewareDeInstrumentacao',
+    'TexCepChallenge.replicas.MiddlewareDeReplicas',
     'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,15 +87,226 @@ WSGI_APPLICATION = 'TexCepChallenge.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# A base e escolhida por TEX_BANCO: 'djongo' (MongoDB, padrao), 'postgresql' ou 'sqlite' (testes e
+# desenvolvimento). As conexoes sao mantidas abertas entre requisicoes por TEX_CONN_MAX_AGE
+# segundos, evitando reconectar (e, no djongo, recriar o MongoClient) a cada requisicao.
+BANCO = os.environ.get('TEX_BANCO', 'djongo')
+CONN_MAX_AGE = int(os.environ.get('TEX_CONN_MAX_AGE', 60))
+
+BANCOS = {
+    'djongo': {
+        'ENGINE': 'djongo',
+        'NAME': os.environ.get('TEX_BANCO_NOME', 'tex_cep_db'),
+        'CLIENT': {
+            'host': os.environ.get('TEX_MONGO_URL', 'mongodb://127.0.0.1:27017'),
+            'maxPoolSize': 50,
+        },
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+    },
+    'postgresql': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('TEX_BANCO_NOME', 'tex_cep_db'),
+        'USER': os.environ.get('TEX_BANCO_USUARIO', 'postgres'),
+        'PASSWORD': os.environ.get('TEX_BANCO_SENHA', ''),
+        'HOST': os.environ.get('TEX_BANCO_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('TEX_BANCO_PORTA', '5432'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+    },
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('TEX_BANCO_NOME', os.path.join(BASE_DIR, 'db.sqlite3')),
+    },
+}
+
 DATABASES = {
+    'default': BANCOS[BANCO],
+}
+
+# Replicas de leitura (TexCepChallenge.replicas): TEX_BANCO_REPLICAS lista, separados por virgula,
+# os hosts (ou, no djongo, as URLs do MongoDB) das replicas, configuradas como a base principal.
+# Nos testes, as replicas espelham a base principal.
+for indice, host in enumerate(filter(None, os.environ.get('TEX_BANCO_REPLICAS', '').split(','))):
+    replica = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if replica['ENGINE'] == 'djongo':
+        replica['CLIENT'] = {**replica['CLIENT'], 'host': host.strip()}
+    else:
+        replica['HOST'] = host.strip()
+    DATABASES['replica_%d' % indice] = replica
+
+DATABASE_ROUTERS = ['TexCepChallenge.replicas.RoteadorDeReplicas']
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'djongo',
-        'NAME': 'tex_cep_db',
-        'HOST': '127.0.0.1',
-        'PORT': 27017,
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Cache em dois niveis da busca de enderecos por CEP (cep.cache): LRU local ao processo com
+# TTL curto na frente do backend compartilhado indicado em ALIAS. CEPs que o ViaCEP informa nao
+# existirem ficam no cache negativo por TTL_NEGATIVO segundos. As marcas de CEPs alterados, que
+# impedem o indice de CEP de responder por eles, duram TTL_ALTERACAO segundos (no minimo
+# TTL_COMPARTILHADO), e indices mais antigos que isso nao sao consultados.
+CEP_CACHE = {
+    'ALIAS': 'default',
+    'TAMANHO_LOCAL': 1024,
+    'TTL_LOCAL': 60,
+    'TTL_COMPARTILHADO': 60 * 60,
+    'TTL_NEGATIVO': 10 * 60,
+    'TTL_ALTERACAO': 24 * 60 * 60,
+}
+
+# Cliente do ViaCEP (cep.cliente): pool de conexoes, timeouts (em segundos), novas tentativas com
+# espera exponencial e disjuntor que recusa chamadas por TEMPO_ABERTO segundos apos
+# LIMITE_DE_FALHAS falhas consecutivas. TAMANHO_POOL_ASSINCRONO limita as conexoes simultaneas
+# do cliente usado pela rota assincrona. FORMATO escolhe a resposta do ViaCEP consultada, `json`
+# ou `xml` (cep.provedores).
+CEP_PROVEDOR = {
+    'URL_BASE': 'https://viacep.com.br/ws',
+    'TAMANHO_POOL': 10,
+    'TAMANHO_POOL_ASSINCRONO': 100,
+    'TIMEOUT_CONEXAO': 2,
+    'TIMEOUT_LEITURA': 5,
+    'TENTATIVAS': 3,
+    'ESPERA_BASE': 0.1,
+    'ESPERA_MAXIMA': 1,
+    'LIMITE_DE_FALHAS': 5,
+    'TEMPO_ABERTO': 30,
+    'FORMATO': 'json',
+}
+
+# Provedores de CEP consultados (cep.cliente.GrupoDeProvedores), em ordem de preferencia. O
+# proximo provedor e consultado em paralelo quando o anterior nao responde em
+# ORCAMENTO_DE_LATENCIA segundos, ou imediatamente quando ele falha; vale a primeira resposta.
+# O `viacep` e configurado por CEP_PROVEDOR e os demais em PROVEDORES, com as mesmas chaves.
+CEP_PROVEDORES = {
+    'ORDEM': ['viacep'],
+    'ORCAMENTO_DE_LATENCIA': 0.3,
+    'PROVEDORES': {
+        # 'brasilapi': {'URL_BASE': 'https://brasilapi.com.br/api/cep/v1', 'FORMATO': 'brasilapi'},
+    },
+}
+
+# Indice de CEP em memoria (cep.indice), gerado por `manage.py importa_ceps --indice` e consultado
+# antes da base e do ViaCEP. Desativado enquanto ARQUIVO nao for definido; exige que o cache de
+# CEP_CACHE['ALIAS'] seja compartilhado entre os processos (nao o LocMemCache).
+CEP_INDICE = {
+    'ARQUIVO': os.environ.get('CEP_INDICE_ARQUIVO'),
+}
+
+# Consulta de enderecos por CEP na base (cep.repositorio): com o djongo, a busca por CEP le a
+# colecao diretamente com o PyMongo, sem a traducao de SQL, a menos que NATIVO_NO_MONGO seja False.
+CEP_REPOSITORIO = {
+    'NATIVO_NO_MONGO': True,
+}
+
+# Busca de varios CEPs em uma unica requisicao (cep.views.busca_enderecos_por_ceps): limite de
+# CEPs por requisicao e de buscas simultaneas ao ViaCEP.
+CEP_BUSCA_EM_LOTE = {
+    'MAXIMO_DE_CEPS': 1000,
+    'WORKERS': 8,
+}
+
+
+# Fila de enriquecimento de CEP (cep.fila): CEPs desconhecidos informados na criacao de pessoas
+# sao resolvidos em segundo plano, em lotes de TAMANHO_DO_LOTE, com no maximo
+# REQUISICOES_POR_SEGUNDO CEPs buscados por segundo. Falhas sao repetidas com espera exponencial
+# ate MAXIMO_DE_TENTATIVAS. Com TRABALHADOR_NO_PROCESSO, uma thread do proprio servidor processa a
+# fila; caso contrario, use `manage.py processa_ceps`.
+CEP_FILA = {
+    'TAMANHO_DO_LOTE': 50,
+    'REQUISICOES_POR_SEGUNDO': 10,
+    'INTERVALO': 1.0,
+    'MAXIMO_DE_TENTATIVAS': 5,
+    'ESPERA_BASE': 30,
+    'ESPERA_MAXIMA': 60 * 60,
+    'TEMPO_MAXIMO_PROCESSANDO': 5 * 60,
+    'TRABALHADOR_NO_PROCESSO': False,
+}
+
+# Revalidacao periodica dos enderecos (cep.revalidacao, `manage.py revalida_ceps`): quantidade
+# de enderecos mais antigos revalidados por execucao, buscas simultaneas, limite de buscas por
+# segundo ao ViaCEP e por quantos segundos um endereco cuja busca falhou sai da fila.
+CEP_REVALIDACAO = {
+    'QUANTIDADE': 1000,
+    'WORKERS': 4,
+    'REQUISICOES_POR_SEGUNDO': 5,
+    'ESPERA_APOS_FALHA': 60 * 60,
+}
+
+# Paginacao por cursor das rotas de listagem (TexCepChallenge.paginacao). O cliente pode pedir
+# outro tamanho de pagina com ?page_size=, limitado a TAMANHO_MAXIMO.
+PAGINACAO = {
+    'TAMANHO_PADRAO': 100,
+    'TAMANHO_MAXIMO': 1000,
+}
+
+# Exportacao em streaming (TexCepChallenge.exportacao): quantidade de linhas lidas da base por
+# vez e de linhas enviadas em cada bloco da resposta.
+EXPORTACAO = {
+    'TAMANHO_DO_LOTE': 2000,
+    'LINHAS_POR_BLOCO': 500,
+}
+
+# Instrumentacao das requisicoes (TexCepChallenge.instrumentacao), exposta em /metrics: requisicoes
+# que levam LIMITE_DE_LENTIDAO segundos ou mais sao registradas em log como uma linha JSON (None
+# desativa o log).
+INSTRUMENTACAO = {
+    'LIMITE_DE_LENTIDAO': 1.0,
+}
+
+# Exclusao em lotes do DELETE das listagens (TexCepChallenge.exclusao): quantidade de pks
+# excluidos por transacao, quantidade de objetos acima da qual a exclusao roda em segundo plano e
+# por quantos segundos o progresso de uma exclusao concluida continua disponivel.
+EXCLUSAO = {
+    'TAMANHO_DO_LOTE': 1000,
+    'LIMITE_SINCRONO': 10000,
+    'RETENCAO': 60 * 60,
+}
+
+# Leitura em replicas (TexCepChallenge.replicas): as requisicoes GET das ROTAS (pelo nome da url)
+# leem de uma das replicas em ALIASES. Depois de uma escrita, o cliente le da base principal por
+# JANELA_DE_CONSISTENCIA segundos, e uma replica sem conexao fica fora por TEMPO_FORA segundos.
+REPLICAS_DE_LEITURA = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'ROTAS': [
+        'enderecos', 'enderecos_faixa', 'endereco_detail', 'endereco_cep', 'endereco_cep_async',
+        'pessoas', 'pessoa_detail',
+    ],
+    'JANELA_DE_CONSISTENCIA': 5,
+    'TEMPO_FORA': 30,
+}
+
+# Cache HTTP das rotas de consulta (TexCepChallenge.condicional). Os detalhes e listagens sao
+# enviados com `Cache-Control: public` e revalidados pelo ETag a cada uso quando MAX_AGE e 0; as
+# buscas por CEP podem ser servidas por um proxy reverso por MAX_AGE_CEP segundos.
+CACHE_HTTP = {
+    'MAX_AGE': 0,
+    'MAX_AGE_CEP': 60 * 60,
+}
+
+# Rotas de consulta (pelo nome da url) servidas pela renderizacao rapida
+# (TexCepChallenge.renderizacao), que le as linhas com .values() e as representa sem o
+# ModelSerializer, codificando o JSON com o orjson quando instalado. As demais usam os serializers.
+# Por padrao, apenas o detalhe de endereco e as buscas por CEP; as listagens ('enderecos',
+# 'enderecos_faixa' e 'pessoas') e 'pessoa_detail' tambem suportam a renderizacao rapida.
+RENDERIZACAO_RAPIDA = {
+    'ROTAS': [
+        'endereco_detail',
+        'endereco_cep',
+        'endereco_cep_async',
+    ],
+}
+
+# Importacao de pessoas em lote (pessoa.views.importa_pessoas_em_lote): quantidade de pessoas
+# validadas e gravadas por vez.
+PESSOA_IMPORTACAO = {
+    'TAMANHO_DO_LOTE': 1000,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -5,8 +5,13 @@ from django.contrib import admin
 from django.urls import path
 from django.conf.urls import include
 
+# Importações internas
+from TexCepChallenge.views import exclusao_detail, metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/pessoas/', include('pessoa.urls')),
     path('api/enderecos/', include('cep.urls')),
+    path('api/exclusoes/<id>', exclusao_detail, name='exclusao_detail'),
+    path('metrics', metricas, name='metricas'),
 ]
@@ -0,0 +1,118 @@
+"""Views comuns as colecoes."""
+
+# Importacoes externas.
+from rest_framework import status
+from rest_framework.decorators import api_view
+from rest_framework.request import Request
+from django.http import HttpResponse
+from django.http.response import JsonResponse
+
+# Importacoes internas.
+from TexCepChallenge.exclusao import obtem_exclusao
+from TexCepChallenge.instrumentacao import metricas_de_rotas
+from TexCepChallenge.metricas import linhas_de_histograma, linhas_de_valor
+from cep.cache import cache_de_cep
+from cep.cliente import estatisticas_de_provedores, latencias_de_provedores
+
+CONTENT_TYPE_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@api_view(['GET'])
+def exclusao_detail(request: Request, id: str) -> JsonResponse:
+    """Consulta o progresso de uma exclusao em lotes iniciada em segundo plano.
+
+    :param request: Objeto de request.
+    :param id: Id da exclusao, informado na resposta do DELETE.
+
+    :return: Situacao e quantidade de objetos excluidos ou mensagem de erro.
+    """
+    exclusao = obtem_exclusao(id)
+    if exclusao is None:
+        return JsonResponse(
+            {'message': 'A exclusão procurada não existe neste servidor.'},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    return JsonResponse(exclusao.instantaneo())
+
+
+@api_view(['GET'])
+def metricas(request: Request) -> HttpResponse:
+    """Exporta, no formato texto do Prometheus, as metricas mantidas pelo processo.
+
+    Inclui os histogramas de cada rota e metodo (duracao, consultas a base, tempo no provedor de
+    CEP, serializacao e tamanho da resposta), a latencia e o disjuntor de cada provedor de CEP e
+    os contadores do cache de CEP.
+
+    :param request: Objeto de request.
+
+    :return: Metricas em texto.
+    """
+    rotas = sorted(metricas_de_rotas.items())
+    series = {
+        'duracao': [(rotulos_de(chave), m.duracao.instantaneo()) for chave, m in rotas],
+        'consultas': [(rotulos_de(chave), m.consultas.instantaneo()) for chave, m in rotas],
+        'tempo_de_consultas': [
+            (rotulos_de(chave), m.tempo_de_consultas.instantaneo()) for chave, m in rotas
+        ],
+        'tamanho': [(rotulos_de(chave), m.tamanho.instantaneo()) for chave, m in rotas],
+    }
+    provedores = estatisticas_de_provedores()
+
+    linhas = [
+        *linhas_de_histograma(
+            'texcep_requisicao_duracao_segundos', 'Duracao das requisicoes.', series['duracao'],
+        ),
+        *linhas_de_histograma(
+            'texcep_requisicao_consultas', 'Consultas a base por requisicao.', series['consultas'],
+        ),
+        *linhas_de_histograma(
+            'texcep_requisicao_consultas_segundos', 'Tempo em consultas a base por requisicao.',
+            series['tempo_de_consultas'],
+        ),
+        *linhas_de_histograma(
+            'texcep_requisicao_provedor_segundos', 'Tempo no provedor de CEP por requisicao.',
+            [(rotulos_de(chave), m.etapas['provedor'].instantaneo()) for chave, m in rotas],
+        ),
+        *linhas_de_histograma(
+            'texcep_requisicao_serializacao_segundos', 'Tempo de serializacao por requisicao.',
+            [(rotulos_de(chave), m.etapas['serializacao'].instantaneo()) for chave, m in rotas],
+        ),
+        *linhas_de_histograma(
+            'texcep_resposta_bytes', 'Tamanho do corpo das respostas.', series['tamanho'],
+        ),
+        *linhas_de_histograma(
+            'texcep_provedor_latencia_segundos', 'Latencia das consultas a cada provedor de CEP.',
+            [
+                ({'provedor': nome}, histograma.instantaneo())
+                for nome, histograma in sorted(latencias_de_provedores.items())
+            ],
+        ),
+        *linhas_de_valor(
+            'texcep_provedor_disjuntor_aberto', 'gauge', 'Disjuntor do provedor de CEP aberto.',
+            [({'provedor': p['nome']}, int(p['disjuntor_aberto'])) for p in provedores],
+        ),
+    ]
+    for contador, valor in cache_de_cep.estatisticas().items():
+        if contador == 'itens_locais':
+            linhas += linhas_de_valor(
+                'texcep_cache_de_cep_itens_locais', 'gauge', 'Itens no cache local de CEP.',
+                [({}, valor)],
+            )
+        else:
+            linhas += linhas_de_valor(
+                f'texcep_cache_de_cep_{contador}_total', 'counter',
+                f'Contador de {contador} do cache de CEP.', [({}, valor)],
+            )
+
+    return HttpResponse('\n'.join(linhas) + '\n', content_type=CONTENT_TYPE_PROMETHEUS)
+
+
+def rotulos_de(chave) -> dict:
+    """Converte a chave de ``metricas_de_rotas`` nos rotulos da serie.
+
+    :param chave: Rota e metodo.
+
+    :return: Rotulos ``rota`` e ``metodo``.
+    """
+    rota, metodo = chave
+    return {'rota': rota, 'metodo': metodo}
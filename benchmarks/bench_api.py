@@ -0,0 +1,282 @@
+"""Teste de carga das rotas da API, sem acesso a rede.
+
+Gera uma base (SQLite em arquivo, um MongoDB local via djongo ou um PostgreSQL) com enderecos e
+pessoas sinteticos, sobe um ServidorViaCepFalso com latencia e taxa de erro configuraveis e serve o
+projeto por um servidor WSGI com threads. Para cada rota, dispara ``--requisicoes`` requisicoes
+com ``--concorrencia`` clientes simultaneos e mede a vazao e os percentis 50, 95 e 99 da latencia.
+
+O resultado e impresso em JSON (e gravado em ``--saida``), com o commit atual, para comparacao
+entre versoes; com ``--compara anterior.json``, cada rota traz a variacao percentual da vazao e do
+p95 em relacao ao resultado anterior.
+
+Uso: python -m benchmarks.bench_api --enderecos 10000 --pessoas 10000 --requisicoes 2000
+     --concorrencia 16 --latencia 0.05 --taxa-de-erro 0.01 --saida resultado.json
+"""
+
+# Importacoes externas.
+import argparse
+import json
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+
+# Importacoes internas.
+from benchmarks.base_sqlite import configura_django, configuracao_de_base
+from benchmarks.dados_sinteticos import popula
+from cep.servidor_falso import ServidorViaCepFalso
+
+# Metodo, caminho e corpo JSON (ou None) da requisicao de indice ``i``.
+Requisicao = Tuple[str, str, Optional[dict]]
+
+
+class Rota(NamedTuple):
+    """Rota exercitada pelo teste de carga."""
+
+    nome: str
+    gera: Callable[[int], Requisicao]
+
+
+class _ServidorWsgi(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class _HandlerSilencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def monta_rotas(ceps: List[str], enderecos: List[int], pessoas: List[int]) -> List[Rota]:
+    """Monta as rotas medidas, distribuindo as requisicoes entre os objetos da base.
+
+    A base e esvaziada a cada execucao, entao os CEPs de ``endereco_cep_novo`` (fora da faixa
+    gerada) e os emails de ``pessoas_criacao`` nao se repetem.
+
+    :param ceps: CEPs dos enderecos da base.
+    :param enderecos: Pks dos enderecos.
+    :param pessoas: Pks das pessoas.
+
+    :return: Rotas, na ordem de execucao.
+    """
+    return [
+        Rota('enderecos', lambda i: ('GET', '/api/enderecos/?page_size=100', None)),
+        Rota('enderecos_faixa', lambda i: ('GET', '/api/enderecos/faixa?prefixo=6400', None)),
+        Rota('endereco_detail', lambda i: (
+            'GET', f'/api/enderecos/{enderecos[i % len(enderecos)]}', None,
+        )),
+        Rota('endereco_cep', lambda i: (
+            'GET', f'/api/enderecos/busca_cep/{ceps[i % len(ceps)]}', None,
+        )),
+        Rota('endereco_cep_novo', lambda i: (
+            'GET', f'/api/enderecos/busca_cep/{69000000 + i:08d}', None,
+        )),
+        Rota('endereco_ceps', lambda i: (
+            'POST', '/api/enderecos/busca_ceps',
+            {'ceps': [ceps[(i * 10 + j) % len(ceps)] for j in range(10)]},
+        )),
+        Rota('pessoas', lambda i: ('GET', '/api/pessoas/?page_size=100', None)),
+        Rota('pessoa_detail', lambda i: ('GET', f'/api/pessoas/{pessoas[i % len(pessoas)]}', None)),
+        Rota('pessoas_criacao', lambda i: (
+            'POST', '/api/pessoas/',
+            {'nome': f'Carga {i}', 'idade': 30, 'email': f'carga{i}@example.com'},
+        )),
+    ]
+
+
+def percentil(ordenadas: List[float], fracao: float) -> Optional[float]:
+    """Percentil pelo metodo do posto mais proximo.
+
+    :param ordenadas: Amostras em ordem crescente.
+    :param fracao: Fracao do percentil (ex.: 0.95).
+
+    :return: Amostra do percentil ou None sem amostras.
+    """
+    if not ordenadas:
+        return None
+    return ordenadas[max(0, math.ceil(fracao * len(ordenadas)) - 1)]
+
+
+def executa_rota(url_base: str, rota: Rota, requisicoes: int, concorrencia: int) -> dict:
+    """Dispara as requisicoes de uma rota com ``concorrencia`` clientes simultaneos.
+
+    Respostas com status ``4xx`` ou ``5xx`` e falhas de conexao sao contadas como erros e
+    tambem entram nos percentis.
+
+    :param url_base: Endereco do servidor da API.
+    :param rota: Rota exercitada.
+    :param requisicoes: Quantidade de requisicoes.
+    :param concorrencia: Clientes simultaneos.
+
+    :return: Vazao, erros e percentis da latencia, em milissegundos.
+    """
+    local = threading.local()
+
+    def requisita(indice: int) -> Tuple[float, bool]:
+        if not hasattr(local, 'sessao'):
+            local.sessao = requests.Session()
+        metodo, caminho, corpo = rota.gera(indice)
+        inicio = time.perf_counter()
+        try:
+            response = local.sessao.request(metodo, url_base + caminho, json=corpo, timeout=30)
+            sucesso = response.status_code < 400
+        except requests.RequestException:
+            sucesso = False
+        return time.perf_counter() - inicio, sucesso
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(requisita, range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(latencia * 1000 for latencia, _ in resultados)
+    return {
+        'requisicoes': requisicoes,
+        'erros': sum(1 for _, sucesso in resultados if not sucesso),
+        'segundos': round(duracao, 3),
+        'requisicoes_por_segundo': round(requisicoes / duracao, 1),
+        **{
+            f'p{int(fracao * 100)}_ms': round(percentil(latencias, fracao), 2)
+            for fracao in (0.50, 0.95, 0.99)
+        },
+    }
+
+
+def compara(anterior: dict, atual: dict) -> Dict[str, dict]:
+    """Calcula a variacao percentual da vazao e do p95 de cada rota em relacao a outra execucao.
+
+    :param anterior: Resultado de uma execucao anterior.
+    :param atual: Resultado desta execucao.
+
+    :return: Variacoes por rota presente nas duas execucoes.
+    """
+    variacoes = {}
+    for nome, medicao in atual['rotas'].items():
+        referencia = anterior.get('rotas', {}).get(nome)
+        if not referencia:
+            continue
+        variacoes[nome] = {
+            campo: round((medicao[campo] - referencia[campo]) * 100 / referencia[campo], 1)
+            for campo in ('requisicoes_por_segundo', 'p95_ms')
+            if referencia.get(campo)
+        }
+    return variacoes
+
+
+def commit_atual() -> Optional[str]:
+    """Retorna o commit do repositorio, quando executado dentro dele."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--enderecos', type=int, default=10000)
+    parser.add_argument('--pessoas', type=int, default=10000)
+    parser.add_argument('--requisicoes', type=int, default=1000)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--taxa-de-erro', type=float, default=0)
+    parser.add_argument('--rotas', nargs='+', help='Rotas medidas (padrao: todas).')
+    parser.add_argument(
+        '--base',
+        help='Arquivo SQLite, mongodb://host/nome ou postgresql://usuario@host/nome; a base e '
+             'esvaziada antes do teste (padrao: SQLite temporario).',
+    )
+    parser.add_argument(
+        '--sem-consulta-nativa', action='store_true',
+        help='Busca por CEP pelo ORM tambem no MongoDB (CEP_REPOSITORIO).',
+    )
+    parser.add_argument('--saida', help='Arquivo onde o resultado JSON e gravado.')
+    parser.add_argument('--compara', help='Resultado JSON anterior para comparacao.')
+    args = parser.parse_args()
+
+    viacep = ServidorViaCepFalso(
+        latencia=args.latencia, taxa_de_erro=args.taxa_de_erro, gera_enderecos=True,
+    ).inicia()
+    diretorio = tempfile.TemporaryDirectory()
+
+    base = configuracao_de_base(args.base) if args.base else None
+
+    from TexCepChallenge import settings as settings_do_projeto
+    configura_django(
+        args.base or os.path.join(diretorio.name, 'bench.sqlite3'),
+        base=base,
+        DEBUG=False,
+        ALLOWED_HOSTS=['127.0.0.1'],
+        CEP_PROVEDOR={
+            **settings_do_projeto.CEP_PROVEDOR, 'URL_BASE': viacep.url_base, 'TENTATIVAS': 1,
+        },
+        INSTRUMENTACAO={'LIMITE_DE_LENTIDAO': None},
+        CEP_REPOSITORIO={'NATIVO_NO_MONGO': not args.sem_consulta_nativa},
+    )
+    from django.core.management import call_command
+    from django.core.wsgi import get_wsgi_application
+
+    from cep.models import Endereco
+    from pessoa.models import Pessoa
+
+    call_command('flush', interactive=False, verbosity=0)
+    ceps = popula(args.enderecos, args.pessoas)
+    rotas = monta_rotas(
+        ceps,
+        list(Endereco.objects.values_list('pk', flat=True)),
+        list(Pessoa.objects.values_list('pk', flat=True)),
+    )
+    if args.rotas:
+        rotas = [rota for rota in rotas if rota.nome in args.rotas]
+
+    servidor = make_server(
+        '127.0.0.1', 0, get_wsgi_application(),
+        server_class=_ServidorWsgi, handler_class=_HandlerSilencioso,
+    )
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_base = f'http://127.0.0.1:{servidor.server_port}'
+
+    resultados = {
+        'commit': commit_atual(),
+        'base': base['ENGINE'] if base else 'sqlite3',
+        'consulta_nativa': not args.sem_consulta_nativa,
+        'parametros': {
+            campo: getattr(args, campo)
+            for campo in ('enderecos', 'pessoas', 'requisicoes', 'concorrencia', 'latencia',
+                          'taxa_de_erro')
+        },
+        'rotas': {},
+    }
+    try:
+        for rota in rotas:
+            resultados['rotas'][rota.nome] = executa_rota(
+                url_base, rota, args.requisicoes, args.concorrencia,
+            )
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+        viacep.para()
+        diretorio.cleanup()
+
+    if args.compara:
+        with open(args.compara) as arquivo:
+            resultados['comparacao'] = compara(json.load(arquivo), resultados)
+
+    texto = json.dumps(resultados, indent=2)
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            arquivo.write(texto + '\n')
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
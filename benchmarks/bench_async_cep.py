@@ -0,0 +1,85 @@
+"""Compara a vazao das buscas sincrona e assincrona no ViaCEP.
+
+Sobe um ServidorViaCepFalso com latencia injetada e resolve a mesma lista de CEPs com o
+ClienteViaCep em um pool de threads (como um worker WSGI com N threads) e com o
+ClienteViaCepAssincrono em um unico event loop.
+
+Uso: python -m benchmarks.bench_async_cep --requisicoes 1000 --latencia 0.05
+"""
+
+# Importacoes externas.
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Importacoes internas.
+from cep.cliente import CONFIGURACAO_PADRAO, ClienteViaCep, ClienteViaCepAssincrono
+from cep.servidor_falso import ServidorViaCepFalso
+
+
+def bench_sincrono(configuracao: dict, ceps: list, threads: int) -> float:
+    """Resolve os CEPs com o cliente sincrono em um pool de threads.
+
+    :return: Tempo total em segundos.
+    """
+    cliente = ClienteViaCep({**configuracao, 'TAMANHO_POOL': threads})
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(cliente.busca, ceps))
+    return time.perf_counter() - inicio
+
+
+async def bench_assincrono(configuracao: dict, ceps: list, concorrencia: int) -> float:
+    """Resolve os CEPs com o cliente assincrono, limitando as buscas em andamento.
+
+    :return: Tempo total em segundos.
+    """
+    cliente = ClienteViaCepAssincrono({**configuracao, 'TAMANHO_POOL_ASSINCRONO': concorrencia})
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def busca(cep):
+        async with semaforo:
+            return await cliente.busca(cep)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(busca(cep) for cep in ceps))
+    duracao = time.perf_counter() - inicio
+    await cliente.sessao.aclose()
+    return duracao
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requisicoes', type=int, default=1000)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concorrencia', type=int, default=200)
+    args = parser.parse_args()
+
+    ceps = [f'{64000000 + i:08d}' for i in range(args.requisicoes)]
+    resultados = {'requisicoes': args.requisicoes, 'latencia': args.latencia}
+
+    with ServidorViaCepFalso(latencia=args.latencia, gera_enderecos=True) as servidor:
+        configuracao = {**CONFIGURACAO_PADRAO, 'URL_BASE': servidor.url_base}
+
+        duracao = bench_sincrono(configuracao, ceps, args.threads)
+        resultados['sincrono'] = {
+            'threads': args.threads,
+            'segundos': round(duracao, 3),
+            'requisicoes_por_segundo': round(args.requisicoes / duracao, 1),
+        }
+
+        duracao = asyncio.run(bench_assincrono(configuracao, ceps, args.concorrencia))
+        resultados['assincrono'] = {
+            'concorrencia': args.concorrencia,
+            'segundos': round(duracao, 3),
+            'requisicoes_por_segundo': round(args.requisicoes / duracao, 1),
+        }
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Compara as rotas de CEP e de Pessoa sobre cada base suportada.
+
+Executa o ``bench_api`` (cada execucao em um processo, ja que o Django e configurado uma unica
+vez por processo) com os mesmos parametros sobre cada base informada e junta os resultados por
+base. Sobre o MongoDB, a busca por CEP e medida com a consulta nativa do PyMongo e pelo ORM do
+djongo (``mongodb_orm``).
+
+Uso: python -m benchmarks.bench_bancos --bases sqlite mongodb://127.0.0.1/tex_cep_bench
+     postgresql://postgres@127.0.0.1/tex_cep_bench --requisicoes 1000
+"""
+
+# Importacoes externas.
+import argparse
+import json
+import subprocess
+import sys
+from typing import List, Tuple
+from urllib.parse import urlsplit
+
+ROTAS = (
+    'endereco_cep', 'endereco_cep_novo', 'endereco_ceps', 'pessoas', 'pessoa_detail',
+    'pessoas_criacao',
+)
+
+
+def execucoes(bases: List[str]) -> List[Tuple[str, List[str]]]:
+    """Monta o nome e os argumentos do ``bench_api`` de cada execucao.
+
+    :param bases: ``sqlite`` ou URLs aceitas por ``bench_api --base``.
+
+    :return: Nome e argumentos de cada execucao.
+    """
+    resultado = []
+    for base in bases:
+        if base == 'sqlite':
+            resultado.append(('sqlite', []))
+            continue
+        nome = urlsplit(base).scheme
+        resultado.append((nome, ['--base', base]))
+        if nome == 'mongodb':
+            resultado.append(('mongodb_orm', ['--base', base, '--sem-consulta-nativa']))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--bases', nargs='+', default=['sqlite'])
+    parser.add_argument('--enderecos', type=int, default=10000)
+    parser.add_argument('--pessoas', type=int, default=10000)
+    parser.add_argument('--requisicoes', type=int, default=1000)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    args = parser.parse_args()
+
+    comuns = [
+        '--enderecos', str(args.enderecos), '--pessoas', str(args.pessoas),
+        '--requisicoes', str(args.requisicoes), '--concorrencia', str(args.concorrencia),
+        '--latencia', str(args.latencia), '--rotas', *ROTAS,
+    ]
+    resultados = {'parametros': vars(args), 'bases': {}}
+    for nome, argumentos in execucoes(args.bases):
+        processo = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_api', *comuns, *argumentos],
+            capture_output=True, text=True,
+        )
+        if processo.returncode:
+            resultados['bases'][nome] = {'erro': processo.stderr.strip().splitlines()[-1:]}
+            continue
+        execucao = json.loads(processo.stdout)
+        resultados['commit'] = execucao['commit']
+        resultados['bases'][nome] = execucao['rotas']
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compara a busca de enderecos por faixa e prefixo de CEP com e sem o cep_numerico.
+
+Gera uma base SQLite com enderecos sinteticos e executa as mesmas faixas de CEP de tres
+formas: pelo ``cep_numerico`` indexado (usado por ``/api/enderecos/faixa``), por comparacao
+lexica do CEP como texto (``cep__gte``/``cep__lte``) e por ``cep__startswith``.
+
+Uso: python -m benchmarks.bench_faixa_cep --enderecos 1000000 --consultas 200
+"""
+
+# Importacoes externas.
+import argparse
+import json
+import random
+import time
+
+# Importacoes internas.
+from benchmarks.base_sqlite import configura_django
+from benchmarks.dados_sinteticos import popula
+
+
+def mede(consultas: list, pagina: int) -> dict:
+    """Executa cada consulta pedindo a primeira pagina ordenada pelo CEP.
+
+    :param consultas: Querysets a serem avaliados.
+    :param pagina: Tamanho da pagina.
+
+    :return: Tempo total e medio, em milissegundos, e total de enderecos encontrados.
+    """
+    encontrados = 0
+    inicio = time.perf_counter()
+    for queryset in consultas:
+        encontrados += len(queryset[:pagina])
+    duracao = time.perf_counter() - inicio
+    return {
+        'total_ms': round(duracao * 1000, 1),
+        'media_ms': round(duracao * 1000 / len(consultas), 3),
+        'encontrados': encontrados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--enderecos', type=int, default=1000000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--pagina', type=int, default=100)
+    parser.add_argument('--lote', type=int, default=10000)
+    parser.add_argument('--base', default=':memory:')
+    parser.add_argument('--semente', type=int, default=42)
+    args = parser.parse_args()
+
+    configura_django(args.base)
+    from cep.models import Endereco
+
+    inicio = time.perf_counter()
+    popula(args.enderecos, lote=args.lote, semente=args.semente)
+    resultados = {
+        'enderecos': args.enderecos,
+        'consultas': args.consultas,
+        'carga_segundos': round(time.perf_counter() - inicio, 1),
+    }
+
+    sorteio = random.Random(args.semente + 1)
+    prefixos = [f'{sorteio.randrange(10, 100000):05d}' for _ in range(args.consultas)]
+    faixas = [(int(prefixo) * 1000, int(prefixo) * 1000 + 999) for prefixo in prefixos]
+    enderecos = Endereco.objects.all()
+
+    resultados['cep_numerico'] = mede([
+        enderecos.filter(cep_numerico__range=faixa).order_by('cep_numerico')
+        for faixa in faixas
+    ], args.pagina)
+    resultados['cep_texto_lexico'] = mede([
+        enderecos.filter(cep__gte=f'{faixa[0]:08d}', cep__lte=f'{faixa[1]:08d}').order_by('cep')
+        for faixa in faixas
+    ], args.pagina)
+    resultados['cep_startswith'] = mede([
+        enderecos.filter(cep__startswith=prefixo).order_by('cep') for prefixo in prefixos
+    ], args.pagina)
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
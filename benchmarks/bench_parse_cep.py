@@ -0,0 +1,84 @@
+"""Compara o custo de interpretar uma resposta do ViaCEP em cada formato.
+
+Mede, por resposta, a leitura antiga (decodificacao do corpo, ElementTree.fromstring e um
+``find`` por campo), a leitura do XML usada por ``FormatoXml``, uma leitura do XML em streaming
+com o XMLPullParser e a leitura do JSON direto dos bytes (``FormatoJson``), sobre corpos
+gerados como os do ViaCEP.
+
+Uso: python -m benchmarks.bench_parse_cep --respostas 10000
+"""
+
+# Importacoes externas.
+import argparse
+import json
+import timeit
+from xml.etree import ElementTree
+
+# Importacoes internas.
+from cep.provedores import FormatoJson, FormatoXml, monta_dados
+from cep.servidor_falso import gera_dados, monta_corpo
+from cep.utils import limpa_cep
+
+
+def leitura_antiga(cep: str, conteudo: bytes) -> dict:
+    """Leitura do XML usada antes de ``cep.provedores``, mantida como referencia."""
+    root = ElementTree.fromstring(conteudo.decode('utf-8'))
+    return {
+        'bairro': root.find('bairro').text or '',
+        'cidade': root.find('localidade').text or '',
+        'uf': root.find('uf').text or '',
+        'cep': limpa_cep(root.find('cep').text),
+        'logradouro': root.find('logradouro').text or '',
+        'complemento': root.find('complemento').text or '',
+    }
+
+
+def leitura_em_streaming(cep: str, conteudo: bytes) -> dict:
+    """Leitura do XML em streaming, elemento a elemento, mantida como referencia."""
+    parser = ElementTree.XMLPullParser(('end',))
+    parser.feed(conteudo)
+    valores = {elemento.tag: elemento.text for _, elemento in parser.read_events()}
+    parser.close()
+    return monta_dados(cep, valores)
+
+
+def mede(funcao, corpos: list, repeticoes: int) -> dict:
+    """Mede o tempo de interpretar todos os corpos, ficando com a melhor repeticao.
+
+    :return: Microssegundos por resposta.
+    """
+    melhor = min(timeit.repeat(
+        lambda: [funcao(cep, corpo) for cep, corpo in corpos], number=1, repeat=repeticoes,
+    ))
+    return {'us_por_resposta': round(melhor * 1e6 / len(corpos), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--respostas', type=int, default=10000)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args()
+
+    ceps = [f'{64000000 + i:08d}' for i in range(args.respostas)]
+    corpos = {
+        formato: [(cep, monta_corpo(gera_dados(cep), formato)) for cep in ceps]
+        for formato in ('xml', 'json')
+    }
+
+    resultados = {
+        'respostas': args.respostas,
+        'xml_antigo': mede(leitura_antiga, corpos['xml'], args.repeticoes),
+        'xml': mede(FormatoXml().interpreta, corpos['xml'], args.repeticoes),
+        'xml_streaming': mede(leitura_em_streaming, corpos['xml'], args.repeticoes),
+        'json': mede(FormatoJson().interpreta, corpos['json'], args.repeticoes),
+        'bytes_por_resposta': {
+            formato: round(sum(len(corpo) for _, corpo in lista) / len(lista), 1)
+            for formato, lista in corpos.items()
+        },
+    }
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Compara o custo de CPU da renderizacao pelos serializers e da renderizacao rapida.
+
+Gera uma base SQLite com enderecos e pessoas sinteticos e, para 1, 100 e 10 mil objetos, mede
+o tempo de CPU (``time.process_time``) para ler os objetos e montar o corpo da resposta de tres
+formas: ModelSerializer sobre objetos do modelo com o encoder do JsonResponse (caminho atual),
+RepresentacaoRapida sobre ``.values()`` com o ``json`` da biblioteca padrao e a mesma
+representacao com o ``orjson`` (quando instalado).
+
+Uso: python -m benchmarks.bench_renderizacao --quantidades 1 100 10000 --repeticoes 20
+"""
+
+# Importacoes externas.
+import argparse
+import json
+import time
+
+# Importacoes internas.
+from benchmarks.base_sqlite import configura_django
+from benchmarks.dados_sinteticos import popula
+
+
+def mede(renderiza, repeticoes: int) -> dict:
+    """Executa a renderizacao ``repeticoes`` vezes.
+
+    :param renderiza: Funcao que le os objetos e retorna o corpo da resposta.
+    :param repeticoes: Quantidade de execucoes.
+
+    :return: Tempo de CPU medio por requisicao, em milissegundos, e tamanho do corpo.
+    """
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        corpo = renderiza()
+    duracao = time.process_time() - inicio
+    return {
+        'cpu_ms_por_requisicao': round(duracao * 1000 / repeticoes, 3),
+        'bytes': len(corpo),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quantidades', type=int, nargs='+', default=[1, 100, 10000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--base', default=':memory:')
+    args = parser.parse_args()
+
+    configura_django(args.base)
+    from django.http.response import JsonResponse
+
+    from TexCepChallenge import renderizacao
+    from cep.models import Endereco
+    from cep.serializers import EnderecoSerializer, representacao_de_endereco
+    from pessoa.models import Pessoa
+    from pessoa.serializers import PessoaSerializer, representacao_de_pessoa
+
+    popula(max(args.quantidades), max(args.quantidades))
+    orjson = renderizacao.orjson
+
+    def com_json_padrao(dados):
+        renderizacao.orjson = None
+        try:
+            return renderizacao.codifica_json(dados)
+        finally:
+            renderizacao.orjson = orjson
+
+    rotas = {
+        'enderecos': (
+            lambda n: Endereco.objects.order_by('pk')[:n], EnderecoSerializer,
+            lambda n: Endereco.objects.order_by('pk')[:n], representacao_de_endereco,
+        ),
+        'pessoas': (
+            lambda n: Pessoa.objects.order_by('pk').prefetch_related('endereco')[:n],
+            PessoaSerializer,
+            lambda n: Pessoa.objects.order_by('pk')[:n], representacao_de_pessoa,
+        ),
+    }
+
+    resultados = {'repeticoes': args.repeticoes, 'orjson': orjson is not None}
+    for rota, (objetos, serializer_class, linhas, representacao) in rotas.items():
+        for quantidade in args.quantidades:
+            colunas = representacao.colunas()
+            caminhos = {
+                'serializer': lambda: JsonResponse(
+                    {'results': serializer_class(objetos(quantidade), many=True).data},
+                ).content,
+                'rapida_json': lambda: com_json_padrao({
+                    'results': representacao.representa(linhas(quantidade).values(*colunas)),
+                }),
+            }
+            if orjson is not None:
+                caminhos['rapida_orjson'] = lambda: renderizacao.codifica_json({
+                    'results': representacao.representa(linhas(quantidade).values(*colunas)),
+                })
+
+            resultados[f'{rota}_{quantidade}'] = {
+                nome: mede(renderiza, args.repeticoes) for nome, renderiza in caminhos.items()
+            }
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
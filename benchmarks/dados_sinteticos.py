@@ -0,0 +1,67 @@
+"""Gerador de enderecos e pessoas sinteticos para os benchmarks."""
+
+# Importacoes externas.
+import random
+from typing import List, Optional
+
+
+def gera_ceps(quantidade: int, semente: Optional[int] = None) -> List[str]:
+    """Gera CEPs distintos.
+
+    :param quantidade: Quantidade de CEPs.
+    :param semente: Semente para sortear os CEPs em toda a faixa valida; sem semente, os CEPs
+        sao sequenciais a partir de ``64000000``.
+
+    :return: CEPs limpos, com 8 digitos.
+    """
+    if semente is None:
+        return [f'{64000000 + indice:08d}' for indice in range(quantidade)]
+    return [
+        f'{cep:08d}' for cep in random.Random(semente).sample(range(1000000, 100000000), quantidade)
+    ]
+
+
+def popula(
+    enderecos: int, pessoas: int = 0, lote: int = 5000, semente: Optional[int] = None,
+) -> List[str]:
+    """Cria, em uma base vazia, ``enderecos`` enderecos e ``pessoas`` pessoas, distribuidas
+    entre os enderecos.
+
+    :param enderecos: Quantidade de enderecos.
+    :param pessoas: Quantidade de pessoas; a pessoa ``i`` mora no endereco ``i % enderecos``.
+    :param lote: Tamanho de cada ``bulk_create``.
+    :param semente: Semente dos CEPs, ver ``gera_ceps``.
+
+    :return: CEPs dos enderecos criados.
+    """
+    from django.utils import timezone
+
+    from cep.models import Endereco
+    from pessoa.models import Pessoa
+
+    agora = timezone.now()
+    ceps = gera_ceps(enderecos, semente)
+    for inicio in range(0, enderecos, lote):
+        Endereco.objects.bulk_create(
+            Endereco(
+                cep=cep, uf='PI', bairro=f'Bairro {indice}', cidade='Teresina',
+                logradouro=f'Rua {indice}', complemento='', buscado_em=agora,
+                origem=Endereco.ORIGEM_VIACEP,
+            )
+            for indice, cep in enumerate(ceps[inicio:inicio + lote], start=inicio)
+        )
+
+    if not pessoas or not enderecos:
+        return ceps
+
+    pks = list(Endereco.objects.order_by('pk').values_list('pk', flat=True)[:enderecos])
+    for inicio in range(0, pessoas, lote):
+        Pessoa.objects.bulk_create(
+            Pessoa(
+                nome=f'Pessoa {indice}', idade=18 + indice % 60, email=f'p{indice}@example.com',
+                endereco_id=pks[indice % len(pks)],
+            )
+            for indice in range(inicio, min(inicio + lote, pessoas))
+        )
+
+    return ceps
@@ -0,0 +1,255 @@
+"""Cache de CEP."""
+
+# Importacoes externas.
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+CONFIGURACAO_PADRAO = {
+    'ALIAS': 'default',
+    'TAMANHO_LOCAL': 1024,
+    'TTL_LOCAL': 60,
+    'TTL_COMPARTILHADO': 60 * 60,
+    'TTL_NEGATIVO': 10 * 60,
+    'TTL_ALTERACAO': 24 * 60 * 60,
+}
+
+CHAVE_GERACAO = 'cep:geracao'
+
+
+class CacheLocal:
+    """LRU com TTL mantido em memoria no processo atual."""
+
+    def __init__(
+        self,
+        tamanho_maximo: int,
+        ttl: float,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        """Inicializa o cache local.
+
+        :param tamanho_maximo: Quantidade maxima de itens mantidos antes de despejar o menos usado.
+        :param ttl: Tempo de vida, em segundos, de cada item.
+        :param relogio: Funcao que retorna o instante atual em segundos.
+        """
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._relogio = relogio
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.despejos = 0
+        self.expiracoes = 0
+
+    def obtem(self, chave: str) -> Optional[dict]:
+        """Retorna o valor guardado para a chave ou None caso nao exista ou tenha expirado.
+
+        :param chave: Chave procurada.
+
+        :return: Valor guardado ou None.
+        """
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+
+            expira_em, valor = item
+            if expira_em <= self._relogio():
+                del self._itens[chave]
+                self.expiracoes += 1
+                return None
+
+            self._itens.move_to_end(chave)
+            return valor
+
+    def define(self, chave: str, valor: dict) -> None:
+        """Guarda um valor, despejando o item menos usado caso o limite seja atingido.
+
+        :param chave: Chave do valor.
+        :param valor: Valor a ser guardado.
+        """
+        with self._trava:
+            self._itens[chave] = (self._relogio() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+                self.despejos += 1
+
+    def remove(self, chave: str) -> None:
+        """Remove a chave do cache, caso exista.
+
+        :param chave: Chave a ser removida.
+        """
+        with self._trava:
+            self._itens.pop(chave, None)
+
+    def limpa(self) -> None:
+        """Remove todos os itens do cache."""
+        with self._trava:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+
+class CacheDeCep:
+    """Cache em dois niveis para os dados serializados de Endereco, indexado pelo CEP limpo.
+
+    O primeiro nivel e um LRU com TTL local ao processo e o segundo e o backend de cache do
+    Django configurado em ``CEP_CACHE['ALIAS']``, compartilhado entre processos. A invalidacao
+    total incrementa uma geracao guardada no backend compartilhado, usada como ``version`` das
+    chaves; os demais processos deixam de ver os itens antigos quando o seu LRU local expira.
+    """
+
+    def __init__(self, configuracao: Optional[dict] = None):
+        """Inicializa o cache a partir de ``settings.CEP_CACHE``.
+
+        :param configuracao: Configuracao a ser usada no lugar da definida nos settings.
+        """
+        configuracao = {
+            **CONFIGURACAO_PADRAO,
+            **(configuracao or getattr(settings, 'CEP_CACHE', {})),
+        }
+        self.alias = configuracao['ALIAS']
+        self.ttl_compartilhado = configuracao['TTL_COMPARTILHADO']
+        self.ttl_negativo = configuracao['TTL_NEGATIVO']
+        self.ttl_alteracao = max(configuracao['TTL_ALTERACAO'], self.ttl_compartilhado)
+        self.local = CacheLocal(configuracao['TAMANHO_LOCAL'], configuracao['TTL_LOCAL'])
+        self._trava = threading.Lock()
+        self._acertos_locais = 0
+        self._acertos_compartilhados = 0
+        self._faltas = 0
+        self._acertos_negativos = 0
+
+    @property
+    def compartilhado(self):
+        """Backend de cache do Django usado como segundo nivel."""
+        return caches[self.alias]
+
+    def geracao(self) -> int:
+        """Retorna a geracao atual das chaves no backend compartilhado.
+
+        Caso o backend tenha perdido a geracao (reinicio ou limpeza), uma nova e criada a partir
+        do relogio, e nao de 1, para que nao coincida com a de um indice de CEP anterior.
+        """
+        geracao = self.compartilhado.get(CHAVE_GERACAO)
+        if geracao is None:
+            inicial = time.time_ns() // 1000
+            self.compartilhado.add(CHAVE_GERACAO, inicial, timeout=None)
+            geracao = self.compartilhado.get(CHAVE_GERACAO, inicial)
+        return geracao
+
+    def obtem(self, cep: str) -> Optional[dict]:
+        """Busca os dados de endereco do CEP no LRU local e, em seguida, no backend compartilhado.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Dados serializados do endereco ou None em caso de falta.
+        """
+        dados = self.local.obtem(cep)
+        if dados is not None:
+            self._conta('_acertos_locais')
+            return dados
+
+        dados = self.compartilhado.get(f'cep:{cep}', version=self.geracao())
+        if dados is not None:
+            self._conta('_acertos_compartilhados')
+            self.local.define(cep, dados)
+            return dados
+
+        self._conta('_faltas')
+        return None
+
+    def define(self, cep: str, dados: dict) -> None:
+        """Guarda os dados de endereco do CEP nos dois niveis.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+        :param dados: Dados serializados do endereco.
+        """
+        dados = dict(dados)
+        self.local.define(cep, dados)
+        self.compartilhado.set(
+            f'cep:{cep}', dados, timeout=self.ttl_compartilhado, version=self.geracao(),
+        )
+
+    def marca_invalido(self, cep: str) -> None:
+        """Guarda no cache negativo um CEP que o provedor informou nao existir.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+        """
+        self.compartilhado.set(
+            f'cep_invalido:{cep}', True, timeout=self.ttl_negativo, version=self.geracao(),
+        )
+
+    def eh_invalido(self, cep: str) -> bool:
+        """Verifica se o CEP esta no cache negativo.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Se o CEP foi marcado como invalido recentemente.
+        """
+        invalido = self.compartilhado.get(f'cep_invalido:{cep}', False, version=self.geracao())
+        if invalido:
+            self._conta('_acertos_negativos')
+        return invalido
+
+    def invalida(self, *ceps: str) -> None:
+        """Remove os CEPs informados dos dois niveis e do cache negativo e os marca como alterados.
+
+        :param ceps: CEPs ja limpos por ``limpa_cep``.
+        """
+        geracao = self.geracao()
+        for cep in ceps:
+            self.local.remove(cep)
+            self.compartilhado.delete_many([f'cep:{cep}', f'cep_invalido:{cep}'], version=geracao)
+            self.compartilhado.set(
+                f'cep_alterado:{cep}', True, timeout=self.ttl_alteracao, version=geracao,
+            )
+
+    def foi_alterado(self, cep: str) -> bool:
+        """Verifica se o CEP foi invalidado individualmente na geracao atual.
+
+        Usado para nao responder pelo indice de CEP dados que foram alterados ou excluidos
+        depois da construcao do indice. As marcas expiram apos ``ttl_alteracao`` segundos, idade
+        a partir da qual o indice tambem deixa de ser consultado.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Se o CEP foi invalidado.
+        """
+        return self.compartilhado.get(f'cep_alterado:{cep}', False, version=self.geracao())
+
+    def invalida_tudo(self) -> None:
+        """Invalida todos os CEPs, avancando a geracao das chaves compartilhadas."""
+        self.local.limpa()
+        self.geracao()
+        try:
+            self.compartilhado.incr(CHAVE_GERACAO)
+        except ValueError:
+            self.compartilhado.set(CHAVE_GERACAO, time.time_ns() // 1000, timeout=None)
+
+    def estatisticas(self) -> dict:
+        """Retorna os contadores de acertos, faltas e despejos do cache.
+
+        :return: Dicionario com os contadores atuais.
+        """
+        with self._trava:
+            return {
+                'acertos_locais': self._acertos_locais,
+                'acertos_compartilhados': self._acertos_compartilhados,
+                'faltas': self._faltas,
+                'acertos_negativos': self._acertos_negativos,
+                'despejos': self.local.despejos,
+                'expiracoes': self.local.expiracoes,
+                'itens_locais': len(self.local),
+            }
+
+    def _conta(self, contador: str) -> None:
+        with self._trava:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+
+cache_de_cep = CacheDeCep()
@@ -0,0 +1,559 @@
+"""Clientes HTTP dos provedores de CEP."""
+
+# Importacoes externas.
+import asyncio
+import random
+import threading
+import time
+import weakref
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Importacoes internas.
+from TexCepChallenge.metricas import Histograma
+from cep.excecoes import CepInvalido, ErroDeCep, FalhaNaBuscaDeCep, ProvedorIndisponivel
+from cep.provedores import obtem_formato
+
+PROVEDOR_PRINCIPAL = 'viacep'
+
+CONFIGURACAO_PADRAO = {
+    'URL_BASE': 'https://viacep.com.br/ws',
+    'TAMANHO_POOL': 10,
+    'TAMANHO_POOL_ASSINCRONO': 100,
+    'TIMEOUT_CONEXAO': 2,
+    'TIMEOUT_LEITURA': 5,
+    'TENTATIVAS': 3,
+    'ESPERA_BASE': 0.1,
+    'ESPERA_MAXIMA': 1,
+    'LIMITE_DE_FALHAS': 5,
+    'TEMPO_ABERTO': 30,
+    'FORMATO': 'json',
+}
+
+
+class Disjuntor:
+    """Disjuntor (circuit breaker) que interrompe chamadas a um provedor degradado.
+
+    Apos ``limite_de_falhas`` falhas consecutivas o disjuntor abre e recusa chamadas durante
+    ``tempo_aberto`` segundos. Passado esse tempo uma unica chamada de teste e liberada: se ela
+    tiver sucesso o disjuntor fecha, caso contrario volta a abrir.
+    """
+
+    def __init__(
+        self,
+        limite_de_falhas: int,
+        tempo_aberto: float,
+        relogio: Callable[[], float] = time.monotonic,
+    ):
+        """Inicializa o disjuntor fechado.
+
+        :param limite_de_falhas: Falhas consecutivas necessarias para abrir o disjuntor.
+        :param tempo_aberto: Tempo, em segundos, que o disjuntor permanece aberto.
+        :param relogio: Funcao que retorna o instante atual em segundos.
+        """
+        self.limite_de_falhas = limite_de_falhas
+        self.tempo_aberto = tempo_aberto
+        self._relogio = relogio
+        self._trava = threading.Lock()
+        self._falhas = 0
+        self._aberto_ate: Optional[float] = None
+        self._em_teste = False
+
+    @property
+    def aberto(self) -> bool:
+        """Se o disjuntor esta recusando chamadas no momento."""
+        with self._trava:
+            return self._aberto_ate is not None and self._relogio() < self._aberto_ate
+
+    def permite(self) -> bool:
+        """Informa se uma chamada pode ser feita, reservando a chamada de teste quando meio-aberto.
+
+        :return: Se a chamada pode prosseguir.
+        """
+        with self._trava:
+            if self._aberto_ate is None:
+                return True
+            if self._relogio() < self._aberto_ate or self._em_teste:
+                return False
+            self._em_teste = True
+            return True
+
+    def registra_sucesso(self) -> None:
+        """Fecha o disjuntor e zera as falhas."""
+        with self._trava:
+            self._falhas = 0
+            self._aberto_ate = None
+            self._em_teste = False
+
+    def registra_falha(self) -> None:
+        """Conta uma falha, abrindo o disjuntor caso o limite seja atingido."""
+        with self._trava:
+            self._falhas += 1
+            if self._em_teste or self._falhas >= self.limite_de_falhas:
+                self._aberto_ate = self._relogio() + self.tempo_aberto
+            self._em_teste = False
+
+    def libera_teste(self) -> None:
+        """Libera a chamada de teste reservada por ``permite`` sem registrar sucesso nem falha,
+        usado quando a chamada e interrompida (ex.: cancelada pela consulta hedged vencedora).
+        """
+        with self._trava:
+            self._em_teste = False
+
+
+class ClienteViaCep:
+    """Cliente de um provedor de CEP (por padrao o ViaCEP) com pool de conexoes, timeouts,
+    novas tentativas e disjuntor.
+    """
+
+    def __init__(
+        self,
+        configuracao: Optional[dict] = None,
+        disjuntor: Optional[Disjuntor] = None,
+        nome: str = PROVEDOR_PRINCIPAL,
+    ):
+        """Inicializa o cliente a partir de ``settings.CEP_PROVEDOR``.
+
+        :param configuracao: Configuracao a ser usada no lugar da definida nos settings.
+        :param disjuntor: Disjuntor compartilhado com outro cliente do mesmo provedor.
+        :param nome: Nome do provedor, usado nas metricas e na origem dos enderecos.
+        """
+        self.nome = nome
+        configuracao = {
+            **CONFIGURACAO_PADRAO,
+            **(configuracao or getattr(settings, 'CEP_PROVEDOR', {})),
+        }
+        self.configuracao = configuracao
+        self.url_base = configuracao['URL_BASE'].rstrip('/')
+        self.formato = obtem_formato(configuracao['FORMATO'])
+        self.timeout = (configuracao['TIMEOUT_CONEXAO'], configuracao['TIMEOUT_LEITURA'])
+        self.tentativas = configuracao['TENTATIVAS']
+        self.espera_base = configuracao['ESPERA_BASE']
+        self.espera_maxima = configuracao['ESPERA_MAXIMA']
+        self.disjuntor = disjuntor or Disjuntor(
+            configuracao['LIMITE_DE_FALHAS'], configuracao['TEMPO_ABERTO'],
+        )
+        self.sessao = self.cria_sessao()
+
+    def cria_sessao(self) -> requests.Session:
+        """Cria a sessao HTTP com o pool de conexoes configurado.
+
+        :return: Sessao do requests.
+        """
+        sessao = requests.Session()
+        adaptador = HTTPAdapter(
+            pool_connections=self.configuracao['TAMANHO_POOL'],
+            pool_maxsize=self.configuracao['TAMANHO_POOL'],
+        )
+        sessao.mount('http://', adaptador)
+        sessao.mount('https://', adaptador)
+        return sessao
+
+    def espera(self, tentativa: int) -> float:
+        """Calcula a espera antes da tentativa, com crescimento exponencial e jitter completo.
+
+        :param tentativa: Numero da tentativa, comecando em 0.
+
+        :return: Tempo de espera em segundos.
+        """
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** tentativa))
+
+    def url(self, cep: str) -> str:
+        """Monta a URL de consulta do CEP.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: URL do ViaCEP para o CEP, no formato configurado.
+        """
+        return self.formato.url(self.url_base, cep)
+
+    def busca(self, cep: str) -> requests.Response:
+        """Consulta o CEP no ViaCEP.
+
+        Falhas de conexao, timeouts e respostas 5xx sao repetidas ate ``TENTATIVAS`` vezes com
+        espera exponencial e jitter. Respostas 4xx sao devolvidas sem novas tentativas. Erros
+        inesperados contam como falha no disjuntor; interrupcoes (excecoes fora de ``Exception``)
+        apenas liberam a chamada de teste do disjuntor meio-aberto.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Resposta do ViaCEP.
+
+        :raises ProvedorIndisponivel: Caso o disjuntor esteja aberto ou o ViaCEP nao responda.
+        :raises FalhaNaBuscaDeCep: Caso o ViaCEP continue respondendo 5xx apos as tentativas.
+        """
+        if not self.disjuntor.permite():
+            raise ProvedorIndisponivel(cep)
+
+        response = None
+        try:
+            for tentativa in range(self.tentativas):
+                if tentativa:
+                    time.sleep(self.espera(tentativa))
+                try:
+                    response = self.sessao.get(self.url(cep), timeout=self.timeout)
+                except (requests.ConnectionError, requests.Timeout):
+                    response = None
+                    continue
+                if response.status_code < 500:
+                    self.disjuntor.registra_sucesso()
+                    return response
+        except Exception:
+            self.disjuntor.registra_falha()
+            raise
+        except BaseException:
+            self.disjuntor.libera_teste()
+            raise
+
+        self.disjuntor.registra_falha()
+        if response is None:
+            raise ProvedorIndisponivel(cep)
+        raise FalhaNaBuscaDeCep(cep, response.status_code)
+
+
+class ClienteViaCepAssincrono(ClienteViaCep):
+    """Cliente assincrono do ViaCEP, com as mesmas politicas de timeout, tentativas e disjuntor.
+
+    Usa um ``httpx.AsyncClient`` com ate ``TAMANHO_POOL_ASSINCRONO`` conexoes, permitindo manter
+    centenas de consultas em andamento em um unico event loop.
+    """
+
+    def cria_sessao(self) -> httpx.AsyncClient:
+        """Cria o cliente httpx com o pool de conexoes assincrono configurado.
+
+        :return: Cliente assincrono do httpx.
+        """
+        tamanho_pool = self.configuracao['TAMANHO_POOL_ASSINCRONO']
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+            limits=httpx.Limits(
+                max_connections=tamanho_pool, max_keepalive_connections=tamanho_pool,
+            ),
+        )
+
+    async def busca(self, cep: str) -> httpx.Response:
+        """Consulta o CEP no ViaCEP sem bloquear o event loop.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Resposta do ViaCEP.
+
+        :raises ProvedorIndisponivel: Caso o disjuntor esteja aberto ou o ViaCEP nao responda.
+        :raises FalhaNaBuscaDeCep: Caso o ViaCEP continue respondendo 5xx apos as tentativas.
+        """
+        if not self.disjuntor.permite():
+            raise ProvedorIndisponivel(cep)
+
+        response = None
+        try:
+            for tentativa in range(self.tentativas):
+                if tentativa:
+                    await asyncio.sleep(self.espera(tentativa))
+                try:
+                    response = await self.sessao.get(self.url(cep))
+                except httpx.TransportError:
+                    response = None
+                    continue
+                if response.status_code < 500:
+                    self.disjuntor.registra_sucesso()
+                    return response
+        except Exception:
+            self.disjuntor.registra_falha()
+            raise
+        except BaseException:
+            # Consulta cancelada: nao diz nada sobre o provedor, apenas libera a chamada de teste.
+            self.disjuntor.libera_teste()
+            raise
+
+        self.disjuntor.registra_falha()
+        if response is None:
+            raise ProvedorIndisponivel(cep)
+        raise FalhaNaBuscaDeCep(cep, response.status_code)
+
+
+class GrupoDeProvedores:
+    """Consulta um CEP em varios provedores, em ordem de preferencia, com requisicoes hedged.
+
+    O primeiro provedor e consultado imediatamente. Se ele nao responder dentro do orcamento
+    de latencia, o proximo e consultado em paralelo, e assim por diante; a primeira resposta
+    valida e usada e as demais sao descartadas. Falhas de um provedor disparam o proximo na hora
+    (failover). A informacao de que o CEP nao existe e tratada como resposta valida. A latencia de
+    cada consulta e registrada em ``latencias_de_provedores``.
+    """
+
+    def __init__(self, clientes: List[ClienteViaCep], orcamento_de_latencia: float):
+        """Inicializa o grupo.
+
+        :param clientes: Clientes dos provedores, em ordem de preferencia.
+        :param orcamento_de_latencia: Tempo, em segundos, aguardado antes de consultar o proximo
+            provedor.
+        """
+        self.clientes = clientes
+        self.orcamento_de_latencia = orcamento_de_latencia
+        self._executor = None
+        if len(clientes) > 1:
+            self._executor = ThreadPoolExecutor(
+                max_workers=sum(cliente.configuracao['TAMANHO_POOL'] for cliente in clientes),
+                thread_name_prefix='provedor-de-cep',
+            )
+
+    def busca_dados(self, cep: str) -> dict:
+        """Busca os dados do endereco do CEP nos provedores.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Dados do endereco, com o nome do provedor que respondeu em ``origem``.
+
+        :raises CepInvalido: Caso o provedor que responder informe que o CEP nao existe.
+        :raises ErroDeCep: O erro do ultimo provedor, caso nenhum responda.
+        """
+        if self._executor is None:
+            return self.busca_em(self.clientes[0], cep)
+
+        pendentes = {}
+        proximos = iter(self.clientes)
+        erro = None
+
+        def dispara_proximo():
+            cliente = next(proximos, None)
+            if cliente is not None:
+                pendentes[self._executor.submit(self.busca_em, cliente, cep)] = cliente
+
+        dispara_proximo()
+        while pendentes:
+            concluidas, _ = wait(
+                pendentes, timeout=self.orcamento_de_latencia, return_when=FIRST_COMPLETED,
+            )
+            if not concluidas:
+                dispara_proximo()
+                continue
+            for futuro in concluidas:
+                del pendentes[futuro]
+                try:
+                    return futuro.result()
+                except CepInvalido:
+                    raise
+                except ErroDeCep as erro_do_provedor:
+                    erro = erro_do_provedor
+                    dispara_proximo()
+
+        raise erro
+
+    def busca_em(self, cliente: ClienteViaCep, cep: str) -> dict:
+        """Consulta um provedor, registrando a latencia da consulta.
+
+        :param cliente: Cliente do provedor.
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Dados do endereco, com o nome do provedor em ``origem``.
+        """
+        inicio = time.perf_counter()
+        try:
+            response = cliente.busca(cep)
+            dados = cliente.formato.interpreta_resposta(cep, response.status_code, response.content)
+        finally:
+            latencias_de_provedores[cliente.nome].observa(time.perf_counter() - inicio)
+
+        return {**dados, 'origem': cliente.nome}
+
+
+class GrupoDeProvedoresAssincrono(GrupoDeProvedores):
+    """Versao assincrona do GrupoDeProvedores, em que as consultas perdedoras sao canceladas."""
+
+    def __init__(self, clientes: List[ClienteViaCepAssincrono], orcamento_de_latencia: float):
+        """[Overrides GrupoDeProvedores.__init__]"""
+        self.clientes = clientes
+        self.orcamento_de_latencia = orcamento_de_latencia
+
+    async def busca_dados(self, cep: str) -> dict:
+        """[Overrides GrupoDeProvedores.busca_dados]"""
+        pendentes = set()
+        proximos = iter(self.clientes)
+        erro = None
+
+        def dispara_proximo():
+            cliente = next(proximos, None)
+            if cliente is not None:
+                pendentes.add(asyncio.ensure_future(self.busca_em(cliente, cep)))
+
+        dispara_proximo()
+        try:
+            while pendentes:
+                concluidas, _ = await asyncio.wait(
+                    pendentes, timeout=self.orcamento_de_latencia, return_when=FIRST_COMPLETED,
+                )
+                if not concluidas:
+                    dispara_proximo()
+                    continue
+                for tarefa in concluidas:
+                    pendentes.discard(tarefa)
+                    try:
+                        return tarefa.result()
+                    except CepInvalido:
+                        raise
+                    except ErroDeCep as erro_do_provedor:
+                        erro = erro_do_provedor
+                        dispara_proximo()
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+
+        raise erro
+
+    async def busca_em(self, cliente: ClienteViaCepAssincrono, cep: str) -> dict:
+        """[Overrides GrupoDeProvedores.busca_em]"""
+        inicio = time.perf_counter()
+        try:
+            response = await cliente.busca(cep)
+            dados = cliente.formato.interpreta_resposta(cep, response.status_code, response.content)
+        finally:
+            latencias_de_provedores[cliente.nome].observa(time.perf_counter() - inicio)
+
+        return {**dados, 'origem': cliente.nome}
+
+
+latencias_de_provedores: Dict[str, Histograma] = defaultdict(Histograma)
+
+_cliente: Optional[ClienteViaCep] = None
+_clientes_assincronos = weakref.WeakKeyDictionary()
+_trava_cliente = threading.Lock()
+_grupo: Optional[GrupoDeProvedores] = None
+_grupos_assincronos = weakref.WeakKeyDictionary()
+_trava_grupo = threading.Lock()
+
+
+def obtem_cliente_viacep() -> ClienteViaCep:
+    """Retorna o cliente do ViaCEP compartilhado pelo processo, criando-o se necessario.
+
+    :return: Cliente do ViaCEP.
+    """
+    global _cliente
+    with _trava_cliente:
+        if _cliente is None:
+            _cliente = ClienteViaCep()
+        return _cliente
+
+
+def obtem_cliente_viacep_assincrono() -> ClienteViaCepAssincrono:
+    """Retorna o cliente assincrono do ViaCEP do event loop atual, criando-o se necessario.
+
+    Como as conexoes do ``httpx.AsyncClient`` pertencem ao event loop em que foram abertas, cada
+    loop tem o seu cliente; todos compartilham o disjuntor do cliente sincrono.
+
+    :return: Cliente assincrono do ViaCEP.
+    """
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_assincronos.get(loop)
+    if cliente is None:
+        cliente = ClienteViaCepAssincrono(disjuntor=obtem_cliente_viacep().disjuntor)
+        _clientes_assincronos[loop] = cliente
+    return cliente
+
+
+def configuracoes_de_provedores() -> Dict[str, dict]:
+    """Retorna a configuracao de cada provedor, na ordem de ``CEP_PROVEDORES['ORDEM']``.
+
+    O ViaCEP e configurado por ``CEP_PROVEDOR`` e os demais por ``CEP_PROVEDORES['PROVEDORES']``.
+
+    :return: Configuracao indexada pelo nome do provedor.
+
+    :raises ImproperlyConfigured: Caso a ordem cite um provedor nao configurado.
+    """
+    configuracao = getattr(settings, 'CEP_PROVEDORES', {})
+    provedores = {
+        PROVEDOR_PRINCIPAL: getattr(settings, 'CEP_PROVEDOR', {}),
+        **configuracao.get('PROVEDORES', {}),
+    }
+    ordem = configuracao.get('ORDEM', [PROVEDOR_PRINCIPAL])
+
+    desconhecidos = [nome for nome in ordem if nome not in provedores]
+    if desconhecidos or not ordem:
+        raise ImproperlyConfigured(
+            f'CEP_PROVEDORES["ORDEM"] deve citar provedores configurados: {desconhecidos}.'
+        )
+
+    return {nome: provedores[nome] for nome in ordem}
+
+
+def obtem_grupo_de_provedores() -> GrupoDeProvedores:
+    """Retorna o grupo de provedores compartilhado pelo processo, criando-o se necessario.
+
+    :return: Grupo com os provedores de ``CEP_PROVEDORES['ORDEM']``.
+    """
+    global _grupo
+    with _trava_grupo:
+        if _grupo is None:
+            clientes = [
+                obtem_cliente_viacep() if nome == PROVEDOR_PRINCIPAL
+                else ClienteViaCep(configuracao, nome=nome)
+                for nome, configuracao in configuracoes_de_provedores().items()
+            ]
+            _grupo = GrupoDeProvedores(clientes, _orcamento_de_latencia())
+        return _grupo
+
+
+def obtem_grupo_de_provedores_assincrono() -> GrupoDeProvedoresAssincrono:
+    """Retorna o grupo de provedores assincrono do event loop atual, criando-o se necessario.
+
+    Os clientes assincronos compartilham o disjuntor dos clientes do grupo sincrono.
+
+    :return: Grupo com os provedores de ``CEP_PROVEDORES['ORDEM']``.
+    """
+    loop = asyncio.get_running_loop()
+    grupo = _grupos_assincronos.get(loop)
+    if grupo is None:
+        clientes = [
+            obtem_cliente_viacep_assincrono() if cliente.nome == PROVEDOR_PRINCIPAL
+            else ClienteViaCepAssincrono(
+                cliente.configuracao, disjuntor=cliente.disjuntor, nome=cliente.nome,
+            )
+            for cliente in obtem_grupo_de_provedores().clientes
+        ]
+        grupo = GrupoDeProvedoresAssincrono(clientes, _orcamento_de_latencia())
+        _grupos_assincronos[loop] = grupo
+    return grupo
+
+
+def estatisticas_de_provedores() -> List[dict]:
+    """Retorna o estado do disjuntor e o histograma de latencia de cada provedor.
+
+    :return: Estatisticas dos provedores, na ordem de preferencia.
+    """
+    return [
+        {
+            'nome': cliente.nome,
+            'disjuntor_aberto': cliente.disjuntor.aberto,
+            'latencia': latencias_de_provedores[cliente.nome].instantaneo(),
+        }
+        for cliente in obtem_grupo_de_provedores().clientes
+    ]
+
+
+def _orcamento_de_latencia() -> float:
+    return getattr(settings, 'CEP_PROVEDORES', {}).get('ORCAMENTO_DE_LATENCIA', 0.3)
+
+
+@receiver(setting_changed)
+def redefine_cliente_viacep(setting: str, **kwargs) -> None:
+    """Descarta os clientes compartilhados quando ``CEP_PROVEDOR`` ou ``CEP_PROVEDORES`` sao
+    alterados (ex.: nos testes).
+    """
+    global _cliente, _grupo
+    if setting in ('CEP_PROVEDOR', 'CEP_PROVEDORES'):
+        with _trava_grupo:
+            if _grupo is not None and _grupo._executor is not None:
+                _grupo._executor.shutdown(wait=False)
+            _grupo = None
+            _grupos_assincronos.clear()
+        with _trava_cliente:
+            _cliente = None
+            _clientes_assincronos.clear()
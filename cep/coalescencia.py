@@ -0,0 +1,103 @@
+"""Coalescencia de chamadas concorrentes."""
+
+# Importacoes externas.
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class Coalescedor:
+    """Garante que chamadas concorrentes com a mesma chave executem a funcao uma unica vez.
+
+    A primeira thread a pedir uma chave executa a funcao; as demais que chegarem enquanto ela
+    estiver em andamento aguardam e recebem o mesmo resultado (ou a mesma excecao).
+    """
+
+    def __init__(self):
+        """Inicializa o coalescedor sem chamadas em andamento."""
+        self._trava = threading.Lock()
+        self._em_andamento: Dict[str, Future] = {}
+
+    def executa(self, chave: str, funcao: Callable[[], Any]) -> Any:
+        """Executa a funcao para a chave ou aguarda a execucao ja em andamento.
+
+        :param chave: Chave que identifica a chamada.
+        :param funcao: Funcao sem argumentos a ser executada.
+
+        :return: Resultado da funcao.
+        """
+        with self._trava:
+            futuro = self._em_andamento.get(chave)
+            lider = futuro is None
+            if lider:
+                futuro = Future()
+                self._em_andamento[chave] = futuro
+
+        if not lider:
+            return futuro.result()
+
+        try:
+            resultado = funcao()
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+
+
+class LiderCancelado(Exception):
+    """A corrotina que executava a chamada coalescida foi cancelada antes de terminar."""
+
+
+class CoalescedorAssincrono:
+    """Equivalente ao Coalescedor para corrotinas executadas em um mesmo event loop.
+
+    Quando a corrotina lider e cancelada (ex.: o cliente dela desconectou), as que a aguardavam
+    nao sao canceladas: a primeira a retomar passa a executar a funcao e as demais a aguardam.
+    """
+
+    def __init__(self):
+        """Inicializa o coalescedor sem chamadas em andamento."""
+        self._em_andamento: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+
+    async def executa(self, chave: str, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """Aguarda a corrotina criada pela funcao ou a execucao ja em andamento para a chave.
+
+        :param chave: Chave que identifica a chamada.
+        :param funcao: Funcao sem argumentos que retorna a corrotina a ser executada.
+
+        :return: Resultado da corrotina.
+        """
+        loop = asyncio.get_running_loop()
+        chave = (loop, chave)
+
+        futuro = self._em_andamento.get(chave)
+        while futuro is not None:
+            try:
+                return await asyncio.shield(futuro)
+            except LiderCancelado:
+                futuro = self._em_andamento.get(chave)
+
+        futuro = loop.create_future()
+        self._em_andamento[chave] = futuro
+        try:
+            resultado = await funcao()
+        except asyncio.CancelledError:
+            # Nao cancela o futuro compartilhado: as demais corrotinas assumem a chamada.
+            futuro.set_exception(LiderCancelado())
+            futuro.exception()
+            raise
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            futuro.exception()
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            del self._em_andamento[chave]
@@ -0,0 +1,44 @@
+"""CEP Excecoes."""
+
+
+class ErroDeCep(Exception):
+    """Erro base para falhas na resolucao de um CEP."""
+
+    def __init__(self, cep: str, mensagem: str):
+        """Inicializa o erro.
+
+        :param cep: CEP que originou o erro.
+        :param mensagem: Mensagem a ser devolvida ao cliente.
+        """
+        super().__init__(mensagem)
+        self.cep = cep
+        self.mensagem = mensagem
+
+
+class CepInvalido(ErroDeCep):
+    """O CEP esta mal formatado ou o provedor informou que ele nao existe."""
+
+    def __init__(self, cep: str):
+        super().__init__(cep, f'O CEP {cep} é inválido ou não existe.')
+
+
+class CepMalFormatado(CepInvalido):
+    """O CEP nao tem 8 digitos; respondido com 400, como o ViaCEP responde nesse caso."""
+
+    def __init__(self, cep: str):
+        ErroDeCep.__init__(self, cep, f'Falha na busca pelo cep {cep}!')
+
+
+class FalhaNaBuscaDeCep(ErroDeCep):
+    """O provedor de CEP respondeu com um status de falha."""
+
+    def __init__(self, cep: str, status_code: int):
+        super().__init__(cep, f'Falha na busca pelo cep {cep}!')
+        self.status_code = status_code
+
+
+class ProvedorIndisponivel(ErroDeCep):
+    """O provedor de CEP nao respondeu a tempo ou o disjuntor esta aberto."""
+
+    def __init__(self, cep: str):
+        super().__init__(cep, f'O serviço de busca pelo cep {cep} está indisponível no momento.')
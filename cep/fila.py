@@ -0,0 +1,311 @@
+"""Fila de enriquecimento de CEP.
+
+CEPs ainda desconhecidos sao gravados como TarefaDeCep e resolvidos em segundo plano por um
+TrabalhadorDeCep, que busca os enderecos em lotes com ``obtem_dados_de_enderecos`` (o mesmo
+caminho da busca por CEP), limitado a ``CEP_FILA['REQUISICOES_POR_SEGUNDO']``, e associa cada
+Endereco encontrado as Pessoas que aguardavam o CEP em ``Pessoa.cep_pendente``. Como as tarefas
+ficam na base, as pendentes sobrevivem a reinicios do processo.
+"""
+
+# Importacoes externas.
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import close_old_connections, transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+# Importacoes internas.
+from cep.excecoes import CepInvalido, ErroDeCep
+from cep.models import TarefaDeCep
+from cep.servicos import obtem_dados_de_enderecos
+from pessoa.models import Pessoa
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_DO_LOTE': 50,
+    'REQUISICOES_POR_SEGUNDO': 10,
+    'INTERVALO': 1.0,
+    'MAXIMO_DE_TENTATIVAS': 5,
+    'ESPERA_BASE': 30,
+    'ESPERA_MAXIMA': 60 * 60,
+    'TEMPO_MAXIMO_PROCESSANDO': 5 * 60,
+    'TRABALHADOR_NO_PROCESSO': False,
+}
+
+_trabalhador: Optional['TrabalhadorDeCep'] = None
+_trava = threading.Lock()
+
+
+def obtem_configuracao() -> dict:
+    """Retorna a configuracao da fila definida em ``settings.CEP_FILA``."""
+    return {**CONFIGURACAO_PADRAO, **getattr(settings, 'CEP_FILA', {})}
+
+
+class LimitadorDeTaxa:
+    """Balde de fichas que limita a quantidade de operacoes por segundo."""
+
+    def __init__(
+        self,
+        por_segundo: float,
+        relogio: Callable[[], float] = time.monotonic,
+        dorme: Callable[[float], None] = time.sleep,
+    ):
+        """Inicializa o limitador com o balde cheio.
+
+        :param por_segundo: Operacoes permitidas por segundo, que e tambem a capacidade do balde.
+        :param relogio: Funcao que retorna o instante atual em segundos.
+        :param dorme: Funcao usada para aguardar.
+        """
+        self.por_segundo = por_segundo
+        self._relogio = relogio
+        self._dorme = dorme
+        self._fichas = float(por_segundo)
+        self._ultima_reposicao = relogio()
+        self._trava = threading.Lock()
+
+    def aguarda(self, quantidade: int = 1) -> None:
+        """Bloqueia ate que ``quantidade`` operacoes sejam permitidas.
+
+        :param quantidade: Quantidade de operacoes a serem feitas.
+        """
+        with self._trava:
+            agora = self._relogio()
+            self._fichas = min(
+                float(self.por_segundo),
+                self._fichas + (agora - self._ultima_reposicao) * self.por_segundo,
+            )
+            self._ultima_reposicao = agora
+            self._fichas -= quantidade
+            espera = -self._fichas / self.por_segundo if self._fichas < 0 else 0
+
+        if espera:
+            self._dorme(espera)
+
+
+def enfileira_ceps(ceps: Iterable[str]) -> None:
+    """Cria as tarefas dos CEPs informados, reabrindo as que ja tinham terminado.
+
+    As tarefas em processamento tambem voltam a ficar pendentes, ja que o trabalhador pode ter
+    associado as pessoas pendentes antes desta chamada; ele nao as conclui (ver
+    ``conclui_tarefas``) e elas sao processadas de novo. O trabalhador do processo e acordado
+    quando a transacao atual for confirmada.
+
+    :param ceps: CEPs ja limpos por ``limpa_cep``.
+    """
+    ceps = set(ceps)
+    if not ceps:
+        return
+
+    TarefaDeCep.objects.bulk_create(
+        [TarefaDeCep(cep=cep) for cep in ceps], ignore_conflicts=True,
+    )
+    TarefaDeCep.objects.filter(cep__in=ceps).exclude(situacao=TarefaDeCep.PENDENTE).update(
+        situacao=TarefaDeCep.PENDENTE, tentativas=0, erro='', trabalhador='',
+        disponivel_em=timezone.now(),
+    )
+    transaction.on_commit(acorda_trabalhador)
+
+
+def reserva_tarefas(limite: int) -> List[TarefaDeCep]:
+    """Reserva para este trabalhador ate ``limite`` tarefas pendentes e disponiveis.
+
+    Tarefas que estao em processamento ha mais de ``TEMPO_MAXIMO_PROCESSANDO`` segundos, de
+    trabalhadores interrompidos, voltam a ficar pendentes.
+
+    :param limite: Quantidade maxima de tarefas reservadas.
+
+    :return: Tarefas reservadas.
+    """
+    configuracao = obtem_configuracao()
+    agora = timezone.now()
+    TarefaDeCep.objects.filter(
+        situacao=TarefaDeCep.PROCESSANDO,
+        atualizada_em__lt=agora - timedelta(seconds=configuracao['TEMPO_MAXIMO_PROCESSANDO']),
+    ).update(situacao=TarefaDeCep.PENDENTE, trabalhador='', atualizada_em=agora)
+
+    candidatas = list(
+        TarefaDeCep.objects.filter(situacao=TarefaDeCep.PENDENTE, disponivel_em__lte=agora)
+        .order_by('disponivel_em', 'pk')
+        .values_list('pk', flat=True)[:limite]
+    )
+    if not candidatas:
+        return []
+
+    trabalhador = uuid.uuid4().hex
+    TarefaDeCep.objects.filter(pk__in=candidatas, situacao=TarefaDeCep.PENDENTE).update(
+        situacao=TarefaDeCep.PROCESSANDO, trabalhador=trabalhador, atualizada_em=agora,
+    )
+
+    return list(TarefaDeCep.objects.filter(trabalhador=trabalhador))
+
+
+def processa_tarefas(limitador: Optional[LimitadorDeTaxa] = None) -> int:
+    """Resolve um lote de tarefas e associa os enderecos encontrados as pessoas pendentes.
+
+    :param limitador: Limitador aplicado a cada busca no provedor, uma ficha por requisicao; os
+        CEPs resolvidos pelo cache ou pela base nao consomem fichas.
+
+    :return: Quantidade de tarefas processadas.
+    """
+    configuracao = obtem_configuracao()
+    tarefas = reserva_tarefas(configuracao['TAMANHO_DO_LOTE'])
+    if not tarefas:
+        return 0
+
+    resultados = obtem_dados_de_enderecos(
+        [tarefa.cep for tarefa in tarefas],
+        antes_da_busca=limitador.aguarda if limitador is not None else None,
+    )
+
+    concluidas = []
+    for tarefa in tarefas:
+        resultado = resultados[tarefa.cep]
+        if isinstance(resultado, ErroDeCep):
+            registra_falha(tarefa, resultado, configuracao)
+            continue
+
+        Pessoa.objects.filter(cep_pendente=tarefa.cep).update(
+            endereco_id=resultado['id'], cep_pendente='', atualizado_em=timezone.now(),
+        )
+        concluidas.append(tarefa)
+
+    conclui_tarefas(concluidas)
+
+    return len(tarefas)
+
+
+def conclui_tarefas(tarefas: List[TarefaDeCep]) -> None:
+    """Marca como concluidas as tarefas que continuam reservadas para o trabalhador.
+
+    Tarefas reabertas por ``enfileira_ceps`` durante o processamento nao estao mais reservadas e
+    continuam pendentes, para que as pessoas enfileiradas nesse meio tempo sejam associadas.
+
+    :param tarefas: Tarefas processadas com sucesso.
+    """
+    if not tarefas:
+        return
+
+    TarefaDeCep.objects.filter(
+        pk__in=[tarefa.pk for tarefa in tarefas],
+        situacao=TarefaDeCep.PROCESSANDO,
+        trabalhador__in={tarefa.trabalhador for tarefa in tarefas},
+    ).update(situacao=TarefaDeCep.CONCLUIDA, erro='', trabalhador='')
+
+
+def registra_falha(tarefa: TarefaDeCep, erro: ErroDeCep, configuracao: dict) -> None:
+    """Agenda uma nova tentativa da tarefa, com espera exponencial, ou a encerra como falha.
+
+    CEPs inexistentes falham sem novas tentativas; as pessoas continuam com o ``cep_pendente``.
+
+    :param tarefa: Tarefa que falhou.
+    :param erro: Erro da resolucao do CEP.
+    :param configuracao: Configuracao da fila.
+    """
+    reservada_por = tarefa.trabalhador
+    tarefa.tentativas += 1
+    tarefa.erro = erro.mensagem[:200]
+    tarefa.trabalhador = ''
+    if isinstance(erro, CepInvalido) or tarefa.tentativas >= configuracao['MAXIMO_DE_TENTATIVAS']:
+        tarefa.situacao = TarefaDeCep.FALHOU
+    else:
+        tarefa.situacao = TarefaDeCep.PENDENTE
+        espera = min(
+            configuracao['ESPERA_BASE'] * 2 ** (tarefa.tentativas - 1),
+            configuracao['ESPERA_MAXIMA'],
+        )
+        tarefa.disponivel_em = timezone.now() + timedelta(seconds=espera)
+
+    # Uma tarefa reaberta por enfileira_ceps durante o processamento continua pendente.
+    TarefaDeCep.objects.filter(
+        pk=tarefa.pk, situacao=TarefaDeCep.PROCESSANDO, trabalhador=reservada_por,
+    ).update(
+        tentativas=tarefa.tentativas, erro=tarefa.erro, trabalhador='', situacao=tarefa.situacao,
+        disponivel_em=tarefa.disponivel_em,
+    )
+
+
+class TrabalhadorDeCep:
+    """Processa as tarefas da fila em uma thread, consultando a base a cada ``INTERVALO``."""
+
+    def __init__(self, configuracao: Optional[dict] = None):
+        """Inicializa o trabalhador.
+
+        :param configuracao: Configuracao a ser usada no lugar da definida nos settings.
+        """
+        configuracao = configuracao or obtem_configuracao()
+        self.intervalo = configuracao['INTERVALO']
+        self.limitador = LimitadorDeTaxa(configuracao['REQUISICOES_POR_SEGUNDO'])
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def inicia(self) -> None:
+        """Inicia a thread do trabalhador."""
+        self._thread = threading.Thread(
+            target=self.executa, name='trabalhador-de-cep', daemon=True,
+        )
+        self._thread.start()
+
+    def para(self, timeout: Optional[float] = None) -> None:
+        """Pede a parada do trabalhador e aguarda o fim do lote atual.
+
+        :param timeout: Tempo maximo de espera, em segundos.
+        """
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def acorda(self) -> None:
+        """Faz o trabalhador consultar a fila sem aguardar o fim do intervalo."""
+        self._acordar.set()
+
+    def executa(self) -> None:
+        """Processa lotes enquanto houver tarefas e aguarda o intervalo quando a fila esvazia."""
+        while not self._parar.is_set():
+            try:
+                processadas = processa_tarefas(self.limitador)
+            except Exception:
+                logger.exception('Falha ao processar a fila de CEP.')
+                processadas = 0
+            finally:
+                close_old_connections()
+
+            if not processadas:
+                self._acordar.wait(self.intervalo)
+                self._acordar.clear()
+
+
+def acorda_trabalhador() -> None:
+    """Acorda o trabalhador do processo, iniciando-o caso ``TRABALHADOR_NO_PROCESSO`` esteja ativo.
+
+    Sem o trabalhador no processo, as tarefas sao processadas por ``manage.py processa_ceps``.
+    """
+    global _trabalhador
+
+    if not obtem_configuracao()['TRABALHADOR_NO_PROCESSO']:
+        return
+
+    with _trava:
+        if _trabalhador is None:
+            _trabalhador = TrabalhadorDeCep()
+            _trabalhador.inicia()
+    _trabalhador.acorda()
+
+
+@receiver(setting_changed)
+def _reinicia_trabalhador(setting, **kwargs):
+    global _trabalhador
+
+    if setting == 'CEP_FILA' and _trabalhador is not None:
+        with _trava:
+            _trabalhador.para()
+            _trabalhador = None
@@ -0,0 +1,22 @@
+"""Filtros para Endereco."""
+
+# Importacoes internas.
+from TexCepChallenge.exclusao import PARAMETRO_ASSINCRONO
+from TexCepChallenge.filtros import EsquemaDeFiltros
+from TexCepChallenge.paginacao import PARAMETROS_DE_PAGINACAO
+from cep.models import Endereco
+from cep.serializers import EnderecoSerializer
+
+filtros_de_endereco = EsquemaDeFiltros(
+    Endereco,
+    EnderecoSerializer,
+    filtros={
+        'id': ('exact', 'in'),
+        'cep': ('exact', 'in', 'gte', 'lte', 'startswith'),
+        'cep_numerico': ('exact', 'in', 'gte', 'lte'),
+        'uf': ('exact', 'in'),
+        'cidade': ('exact', 'in'),
+    },
+    ordenaveis=('id', 'cep', 'cep_numerico', 'uf', 'cidade'),
+    ignorados=(*PARAMETROS_DE_PAGINACAO, 'formato', PARAMETRO_ASSINCRONO),
+)
@@ -0,0 +1,191 @@
+"""Indice compacto de CEPs em memoria."""
+
+# Importacoes externas.
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Importacoes internas.
+from cep.cache import cache_de_cep
+
+ASSINATURA = b'CEPIDX2\0'
+CABECALHO = struct.Struct('=8sBxxxIQd')
+
+# Backends de cache locais a cada processo, em que as invalidacoes nao chegam aos demais.
+BACKENDS_LOCAIS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def verifica_cache_compartilhado() -> None:
+    """Recusa o indice de CEP quando o cache de CEP nao e compartilhado entre os processos.
+
+    :raises ImproperlyConfigured: Caso o backend de ``CEP_CACHE['ALIAS']`` seja local ao processo.
+    """
+    backend = settings.CACHES[cache_de_cep.alias]['BACKEND']
+    if backend in BACKENDS_LOCAIS:
+        raise ImproperlyConfigured(
+            f'CEP_INDICE exige um cache compartilhado entre os processos em '
+            f'CACHES["{cache_de_cep.alias}"], mas {backend} e local a cada processo.'
+        )
+
+
+class IndiceDeCep:
+    """Indice somente leitura de enderecos, mapeado em memoria a partir de um arquivo.
+
+    O arquivo contem um cabecalho, um array ordenado com os CEPs de 8 digitos como inteiros de
+    32 bits, um array de offsets e os dados serializados de cada endereco em JSON compacto. A
+    busca e uma busca binaria sobre o array de CEPs, sem carregar o arquivo no heap do processo:
+    as paginas sao compartilhadas entre os workers pelo cache do sistema operacional.
+
+    O indice guarda a geracao do ``cache_de_cep`` em que foi construido; quando ela avanca (na
+    exclusao de todos os enderecos, ou quando o backend do cache perde a geracao) o indice deixa
+    de ser consultado ate ser reconstruido. Como a geracao e as marcas de CEPs alterados precisam
+    ser vistas por todos os processos, o indice exige um backend de cache compartilhado, ver
+    ``verifica_cache_compartilhado``. O instante de construcao (``construido_em``) limita a idade
+    do indice a validade dessas marcas.
+    """
+
+    def __init__(self, caminho: str):
+        """Abre o arquivo do indice.
+
+        :param caminho: Caminho do arquivo gerado por ``constroi_indice``.
+        """
+        with open(caminho, 'rb') as arquivo:
+            self._mmap = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+
+        assinatura, ordem, quantidade, self.geracao, self.construido_em = (
+            CABECALHO.unpack_from(self._mmap)
+        )
+        if assinatura != ASSINATURA or ordem != (sys.byteorder == 'little'):
+            raise ValueError(f'{caminho} nao e um indice de CEP valido para esta maquina.')
+
+        inicio_ceps = CABECALHO.size
+        inicio_offsets = inicio_ceps + 4 * quantidade
+        self._inicio_registros = inicio_offsets + 8 * (quantidade + 1)
+
+        memoria = memoryview(self._mmap)
+        self._ceps = memoria[inicio_ceps:inicio_offsets].cast('I')
+        self._offsets = memoria[inicio_offsets:self._inicio_registros].cast('Q')
+
+    def __len__(self) -> int:
+        return len(self._ceps)
+
+    def busca(self, cep: str) -> Optional[dict]:
+        """Procura os dados do endereco de um CEP.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Dados do endereco no formato do EnderecoSerializer ou None.
+        """
+        if not (len(cep) == 8 and cep.isdigit()):
+            return None
+
+        numero = int(cep)
+        posicao = bisect_left(self._ceps, numero)
+        if posicao == len(self._ceps) or self._ceps[posicao] != numero:
+            return None
+
+        inicio = self._inicio_registros + self._offsets[posicao]
+        fim = self._inicio_registros + self._offsets[posicao + 1]
+        return json.loads(self._mmap[inicio:fim])
+
+
+def constroi_indice(
+    dados_de_enderecos: Iterable[dict],
+    caminho: str,
+    geracao: int,
+    construido_em: Optional[float] = None,
+) -> int:
+    """Grava um arquivo de indice com os dados de enderecos informados.
+
+    O arquivo e escrito em um temporario e movido para ``caminho`` ao final, de modo que
+    processos lendo o indice anterior nao vejam um arquivo parcial.
+
+    :param dados_de_enderecos: Dados no formato do EnderecoSerializer.
+    :param caminho: Caminho do arquivo a ser gerado.
+    :param geracao: Geracao atual do ``cache_de_cep``.
+    :param construido_em: Instante, em segundos desde a epoca, anterior a leitura dos dados; por
+        padrao, o inicio da chamada.
+
+    :return: Quantidade de enderecos no indice.
+    """
+    if construido_em is None:
+        construido_em = time.time()
+    registros = sorted(
+        (int(dados['cep']), json.dumps(dados, cls=DjangoJSONEncoder, separators=(',', ':')))
+        for dados in dados_de_enderecos
+        if len(dados['cep']) == 8 and dados['cep'].isdigit()
+    )
+
+    ceps = array('I')
+    offsets = array('Q', [0])
+    corpo = bytearray()
+    for numero, registro in registros:
+        if ceps and ceps[-1] == numero:
+            continue
+        ceps.append(numero)
+        corpo += registro.encode('utf-8')
+        offsets.append(len(corpo))
+
+    temporario = f'{caminho}.tmp'
+    with open(temporario, 'wb') as arquivo:
+        arquivo.write(CABECALHO.pack(
+            ASSINATURA, sys.byteorder == 'little', len(ceps), geracao, construido_em,
+        ))
+        arquivo.write(ceps.tobytes())
+        arquivo.write(offsets.tobytes())
+        arquivo.write(corpo)
+    os.replace(temporario, caminho)
+
+    return len(ceps)
+
+
+_indice: Optional[IndiceDeCep] = None
+_indice_carregado = False
+_trava_indice = threading.Lock()
+
+
+def obtem_indice() -> Optional[IndiceDeCep]:
+    """Retorna o indice configurado em ``CEP_INDICE['ARQUIVO']``, carregando-o na primeira chamada.
+
+    :return: Indice de CEP ou None caso nenhum arquivo esteja configurado ou ele nao exista.
+
+    :raises ImproperlyConfigured: Caso o indice esteja configurado sem um cache compartilhado.
+    """
+    global _indice, _indice_carregado
+    if _indice_carregado:
+        return _indice
+
+    with _trava_indice:
+        if not _indice_carregado:
+            caminho = getattr(settings, 'CEP_INDICE', {}).get('ARQUIVO')
+            if caminho:
+                verifica_cache_compartilhado()
+            _indice = IndiceDeCep(caminho) if caminho and os.path.exists(caminho) else None
+            _indice_carregado = True
+    return _indice
+
+
+@receiver(setting_changed)
+def redefine_indice(setting: str, **kwargs) -> None:
+    """Descarta o indice carregado quando ``CEP_INDICE`` e alterado (ex.: nos testes)."""
+    global _indice, _indice_carregado
+    if setting in ('CEP_INDICE', 'CACHES'):
+        with _trava_indice:
+            _indice = None
+            _indice_carregado = False
@@ -0,0 +1,136 @@
+"""Comando de importacao de uma base de CEPs."""
+
+# Importacoes externas.
+import csv
+import json
+import os
+from typing import Iterator, List
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+# Importacoes internas.
+from cep.cache import cache_de_cep
+from cep.indice import constroi_indice, verifica_cache_compartilhado
+from cep.models import Endereco
+from cep.serializers import EnderecoSerializer
+from cep.utils import limpa_cep
+
+CAMPOS = ('cep', 'uf', 'bairro', 'cidade', 'logradouro', 'complemento')
+
+
+class Command(BaseCommand):
+    """Importa enderecos de arquivos CSV ou NDJSON e, opcionalmente, gera o indice de CEP."""
+
+    help = (
+        'Importa enderecos de arquivos CSV ou NDJSON (campos cep, uf, bairro, cidade ou '
+        'localidade, logradouro e complemento) em lotes, ignorando CEPs ja existentes, e gera '
+        'o indice de CEP em memoria com --indice.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivos', nargs='*', help='Arquivos .csv ou .ndjson a importar.')
+        parser.add_argument(
+            '--lote', type=int, default=5000, help='Quantidade de enderecos por insercao.',
+        )
+        parser.add_argument(
+            '--indice',
+            nargs='?',
+            default=False,
+            const=getattr(settings, 'CEP_INDICE', {}).get('ARQUIVO'),
+            help='Gera o indice de CEP no caminho informado (padrao: CEP_INDICE["ARQUIVO"]).',
+        )
+
+    def handle(self, *args, **options):
+        importados = ignorados = 0
+        for caminho in options['arquivos']:
+            lote = []
+            for dados in self.le_arquivo(caminho):
+                lote.append(dados)
+                if len(lote) >= options['lote']:
+                    novos, repetidos = self.importa_lote(lote)
+                    importados, ignorados = importados + novos, ignorados + repetidos
+                    lote = []
+            novos, repetidos = self.importa_lote(lote)
+            importados, ignorados = importados + novos, ignorados + repetidos
+
+        if options['arquivos']:
+            self.stdout.write(self.style.SUCCESS(
+                f'{importados} endereco(s) importado(s), {ignorados} ignorado(s).'
+            ))
+
+        if options['indice'] is not False:
+            self.gera_indice(options['indice'], options['lote'])
+
+    def le_arquivo(self, caminho: str) -> Iterator[dict]:
+        """Le os enderecos de um arquivo CSV ou NDJSON, normalizando os campos.
+
+        :param caminho: Caminho do arquivo.
+
+        :return: Iterador com os dados de cada endereco.
+        """
+        _, extensao = os.path.splitext(caminho)
+        if extensao not in ('.csv', '.ndjson', '.jsonl'):
+            raise CommandError(f'Formato de {caminho} nao suportado, use .csv ou .ndjson.')
+
+        with open(caminho, encoding='utf-8', newline='') as arquivo:
+            if extensao == '.csv':
+                linhas = csv.DictReader(arquivo)
+            else:
+                linhas = (json.loads(linha) for linha in arquivo if linha.strip())
+
+            for linha in linhas:
+                if 'cidade' not in linha and 'localidade' in linha:
+                    linha['cidade'] = linha['localidade']
+                dados = {campo: (linha.get(campo) or '').strip() for campo in CAMPOS}
+                dados['cep'] = limpa_cep(dados['cep'])
+                yield dados
+
+    def importa_lote(self, lote: List[dict]) -> tuple:
+        """Insere os enderecos do lote cujos CEPs ainda nao existem na base.
+
+        :param lote: Dados dos enderecos.
+
+        :return: Quantidade de enderecos importados e ignorados.
+        """
+        validos = {
+            dados['cep']: dados
+            for dados in lote
+            if len(dados['cep']) == 8 and dados['cep'].isdigit()
+        }
+        existentes = set(
+            Endereco.objects.filter(cep__in=list(validos)).values_list('cep', flat=True)
+        )
+        novos = [
+            Endereco(**dados, origem=Endereco.ORIGEM_IMPORTACAO)
+            for cep, dados in validos.items()
+            if cep not in existentes
+        ]
+        Endereco.objects.bulk_create(novos)
+
+        return len(novos), len(lote) - len(novos)
+
+    def gera_indice(self, caminho: str, tamanho_do_lote: int) -> None:
+        """Gera o indice de CEP com todos os enderecos da base.
+
+        :param caminho: Caminho do arquivo do indice.
+        :param tamanho_do_lote: Quantidade de enderecos lidos da base por vez.
+        """
+        if not caminho:
+            raise CommandError('Informe o caminho do indice ou configure CEP_INDICE["ARQUIVO"].')
+        try:
+            verifica_cache_compartilhado()
+        except ImproperlyConfigured as erro:
+            raise CommandError(str(erro))
+
+        serializer = EnderecoSerializer()
+        enderecos = Endereco.objects.order_by('pk').iterator(chunk_size=tamanho_do_lote)
+        quantidade = constroi_indice(
+            (serializer.to_representation(endereco) for endereco in enderecos),
+            caminho,
+            cache_de_cep.geracao(),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Indice com {quantidade} CEP(s) gerado em {caminho}.'
+        ))
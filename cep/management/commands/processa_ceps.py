@@ -0,0 +1,43 @@
+"""Comando do trabalhador da fila de enriquecimento de CEP."""
+
+# Importacoes externas.
+from django.core.management.base import BaseCommand
+
+# Importacoes internas.
+from cep.fila import LimitadorDeTaxa, TrabalhadorDeCep, obtem_configuracao, processa_tarefas
+
+
+class Command(BaseCommand):
+    """Processa as tarefas da fila de enriquecimento de CEP (``cep.fila``)."""
+
+    help = (
+        'Resolve os CEPs pendentes da fila de enriquecimento e associa os enderecos encontrados '
+        'as pessoas que aguardavam o CEP. Sem --uma-vez, continua consultando a fila ate ser '
+        'interrompido.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--uma-vez',
+            action='store_true',
+            help='Processa as tarefas disponiveis e termina quando a fila esvaziar.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['uma_vez']:
+            trabalhador = TrabalhadorDeCep()
+            try:
+                trabalhador.executa()
+            except KeyboardInterrupt:
+                pass
+            return
+
+        limitador = LimitadorDeTaxa(obtem_configuracao()['REQUISICOES_POR_SEGUNDO'])
+        total = 0
+        while True:
+            processadas = processa_tarefas(limitador)
+            if not processadas:
+                break
+            total += processadas
+
+        self.stdout.write(self.style.SUCCESS(f'{total} tarefa(s) de CEP processada(s).'))
@@ -0,0 +1,38 @@
+"""Comando de revalidacao periodica dos enderecos."""
+
+# Importacoes externas.
+from django.core.management.base import BaseCommand
+
+# Importacoes internas.
+from cep.revalidacao import revalida_enderecos
+
+
+class Command(BaseCommand):
+    """Revalida no ViaCEP os enderecos buscados ha mais tempo."""
+
+    help = (
+        'Revalida no ViaCEP os enderecos buscados ha mais tempo, em paralelo e com taxa '
+        'limitada, regravando apenas os que mudaram. Feito para ser agendado (ex.: cron). Os '
+        'valores padrao vem de CEP_REVALIDACAO.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quantidade', type=int, help='Quantidade de enderecos revalidados.',
+        )
+        parser.add_argument('--workers', type=int, help='Buscas simultaneas ao ViaCEP.')
+        parser.add_argument(
+            '--requisicoes-por-segundo', type=float, help='Limite de buscas por segundo.',
+        )
+
+    def handle(self, *args, **options):
+        resultado = revalida_enderecos(
+            options['quantidade'], options['workers'], options['requisicoes_por_segundo'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado["alterados"]} endereco(s) alterado(s), '
+            f'{resultado["inalterados"]} inalterado(s), '
+            f'{resultado["inexistentes"]} inexistente(s) no ViaCEP, '
+            f'{resultado["falhas"]} falha(s) e '
+            f'{resultado["concorrentes"]} alterado(s) por outro processo.'
+        ))
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.20 on 2026-10-18 14:51
+
+import re
+
+from django.db import migrations
+
+
+def deduplica_enderecos(apps, schema_editor):
+    """Normaliza os CEPs e remove enderecos duplicados antes da criacao do indice unico.
+
+    Para cada CEP e mantido o endereco de menor id; as pessoas que apontavam para as copias
+    passam a apontar para ele.
+    """
+    Endereco = apps.get_model('cep', 'Endereco')
+    Pessoa = apps.get_model('pessoa', 'Pessoa')
+
+    mantidos = {}
+    duplicados = {}
+    for endereco in Endereco.objects.order_by('pk').iterator():
+        cep = re.sub(r'[\s.-]', '', endereco.cep)
+        if cep in mantidos:
+            duplicados.setdefault(mantidos[cep], []).append(endereco.pk)
+            continue
+
+        mantidos[cep] = endereco.pk
+        if cep != endereco.cep:
+            Endereco.objects.filter(pk=endereco.pk).update(cep=cep)
+
+    for mantido, copias in duplicados.items():
+        Pessoa.objects.filter(endereco_id__in=copias).update(endereco_id=mantido)
+        Endereco.objects.filter(pk__in=copias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0001_initial'),
+        ('pessoa', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplica_enderecos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.20 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0002_deduplica_enderecos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='endereco',
+            name='cep',
+            field=models.CharField(max_length=8, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='endereco',
+            name='cidade',
+            field=models.CharField(db_index=True, max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='endereco',
+            name='uf',
+            field=models.CharField(db_index=True, max_length=30),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.20 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+def preenche_cep_numerico(apps, schema_editor):
+    """Preenche ``cep_numerico`` dos enderecos existentes, em lotes."""
+    Endereco = apps.get_model('cep', 'Endereco')
+    enderecos = Endereco.objects.using(schema_editor.connection.alias)
+
+    def grava(lote):
+        # O djongo nao traduz o CASE WHEN gerado pelo bulk_update.
+        if schema_editor.connection.vendor != 'djongo':
+            enderecos.bulk_update(lote, ['cep_numerico'])
+            return
+        for endereco in lote:
+            enderecos.filter(pk=endereco.pk).update(cep_numerico=endereco.cep_numerico)
+
+    lote = []
+    for endereco in enderecos.only('pk', 'cep').iterator(chunk_size=2000):
+        if endereco.cep.isdigit():
+            endereco.cep_numerico = int(endereco.cep)
+            lote.append(endereco)
+        if len(lote) >= 2000:
+            grava(lote)
+            lote = []
+    grava(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0003_indices_endereco'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='cep_numerico',
+            field=models.PositiveIntegerField(db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(preenche_cep_numerico, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.20 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0004_endereco_cep_numerico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaDeCep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cep', models.CharField(max_length=8, unique=True)),
+                ('situacao', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluida'), ('falhou', 'Falhou')], default='pendente', max_length=12)),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('erro', models.CharField(blank=True, default='', max_length=200)),
+                ('trabalhador', models.CharField(blank=True, default='', max_length=32)),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('atualizada_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tarefadecep',
+            index=models.Index(fields=['situacao', 'disponivel_em'], name='cep_tarefad_situaca_b59b1e_idx'),
+        ),
+    ]
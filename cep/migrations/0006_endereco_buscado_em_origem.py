@@ -0,0 +1,23 @@
+# Generated by Django 3.2.20 on 2026-10-18 15:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0005_tarefadecep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='buscado_em',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='endereco',
+            name='origem',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.20 on 2026-10-18 18:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0006_endereco_buscado_em_origem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-18 15:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0007_endereco_atualizado_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='revalidar_apos',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.20 on 2026-10-18 16:01
+
+from django.db import migrations, models
+
+
+def preenche_revalidado_em(apps, schema_editor):
+    """Inicia ``revalidado_em`` com o ``buscado_em``, mantendo a ordem da fila de revalidacao."""
+    Endereco = apps.get_model('cep', 'Endereco')
+    enderecos = Endereco.objects.using(schema_editor.connection.alias)
+
+    # O djongo nao traduz o UPDATE com uma expressao F.
+    if schema_editor.connection.vendor != 'djongo':
+        enderecos.update(revalidado_em=models.F('buscado_em'))
+        return
+    consulta = enderecos.filter(buscado_em__isnull=False).values_list('pk', 'buscado_em')
+    for pk, buscado_em in consulta.iterator(chunk_size=2000):
+        enderecos.filter(pk=pk).update(revalidado_em=buscado_em)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cep', '0008_endereco_revalidar_apos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='revalidado_em',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(preenche_revalidado_em, migrations.RunPython.noop),
+    ]
@@ -2,14 +2,95 @@
 
 # Importações externas
 from django.db import models
+from django.utils import timezone
+
+
+class EnderecoQuerySet(models.QuerySet):
+    """QuerySet de Endereco."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """[Overrides QuerySet.bulk_create]
+
+        Preenche ``cep_numerico``, ja que ``Endereco.save`` nao e chamado no ``bulk_create``.
+        """
+        objs = list(objs)
+        for endereco in objs:
+            endereco.atualiza_cep_numerico()
+
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Endereco(models.Model):
-    """Modelo de endereco para registrar as informacoes obtidas por meio da rota de CEP."""
+    """Modelo de endereco para registrar as informacoes obtidas por meio da rota de CEP.
 
-    cep = models.CharField(max_length=8)
-    uf = models.CharField(max_length=30)
+    ``origem`` indica de onde os dados vieram e ``buscado_em``, quando foram obtidos do ViaCEP.
+    ``revalidado_em`` registra a ultima vez em que foram obtidos ou confirmados no provedor, sem
+    fazer parte da representacao: o comando ``revalida_ceps`` revalida primeiro os enderecos
+    mais antigos e adia para ``revalidar_apos`` os que o provedor nao conseguiu responder, sem
+    alterar os demais campos dos confirmados. ``atualizado_em`` muda a cada gravacao e gera o
+    ETag e o Last-Modified das rotas de consulta (``TexCepChallenge.condicional``); gravacoes
+    que nao passam por ``save`` (``update`` e ``bulk_update``) devem atualiza-lo explicitamente.
+    """
+
+    cep = models.CharField(max_length=8, unique=True)
+    cep_numerico = models.PositiveIntegerField(null=True, db_index=True, editable=False)
+    uf = models.CharField(max_length=30, db_index=True)
     bairro = models.CharField(max_length=50)
-    cidade = models.CharField(max_length=40)
+    cidade = models.CharField(max_length=40, db_index=True)
     logradouro = models.CharField(max_length=70)
     complemento = models.CharField(max_length=70)
+    buscado_em = models.DateTimeField(null=True, blank=True, db_index=True)
+    origem = models.CharField(max_length=20, blank=True, default='')
+    revalidado_em = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    revalidar_apos = models.DateTimeField(null=True, blank=True, editable=False)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    ORIGEM_VIACEP = 'viacep'
+    ORIGEM_API = 'api'
+    ORIGEM_IMPORTACAO = 'importacao'
+
+    objects = EnderecoQuerySet.as_manager()
+
+    def atualiza_cep_numerico(self):
+        """Deriva do CEP a representacao inteira usada nas consultas por faixa e prefixo."""
+        self.cep_numerico = int(self.cep) if self.cep and self.cep.isdigit() else None
+
+    def save(self, *args, **kwargs):
+        """[Overrides Model.save]"""
+        self.atualiza_cep_numerico()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'atualizado_em'}
+            if 'cep' in update_fields:
+                update_fields.add('cep_numerico')
+            kwargs['update_fields'] = update_fields
+
+        super().save(*args, **kwargs)
+
+
+class TarefaDeCep(models.Model):
+    """Tarefa da fila de enriquecimento de CEP (``cep.fila``), uma por CEP a ser resolvido."""
+
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDA = 'concluida'
+    FALHOU = 'falhou'
+    SITUACOES = (
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDA, 'Concluida'),
+        (FALHOU, 'Falhou'),
+    )
+
+    cep = models.CharField(max_length=8, unique=True)
+    situacao = models.CharField(max_length=12, choices=SITUACOES, default=PENDENTE)
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    erro = models.CharField(max_length=200, blank=True, default='')
+    trabalhador = models.CharField(max_length=32, blank=True, default='')
+    disponivel_em = models.DateTimeField(default=timezone.now)
+    atualizada_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Meta classe para TarefaDeCep."""
+
+        indexes = [models.Index(fields=['situacao', 'disponivel_em'])]
@@ -0,0 +1,217 @@
+"""Formatos de resposta dos provedores de CEP.
+
+Cada formato sabe montar a URL de consulta e converter a resposta, com o corpo ainda em bytes,
+nos dados para criacao de um endereco. O formato de cada provedor e o de ``FORMATO`` na sua
+configuracao (``CEP_PROVEDOR`` para o ViaCEP e ``CEP_PROVEDORES['PROVEDORES']`` para os demais).
+Novos formatos podem ser adicionados com ``registra_formato``.
+"""
+
+# Importacoes externas.
+import json
+from abc import ABC, abstractmethod
+from typing import Dict
+from xml.etree import ElementTree
+
+from django.core.exceptions import ImproperlyConfigured
+
+# Importacoes internas.
+from cep.excecoes import CepInvalido, CepMalFormatado, FalhaNaBuscaDeCep
+from cep.utils import limpa_cep
+
+# Campos do ViaCEP e os campos de Endereco correspondentes.
+CAMPOS = {
+    'cep': 'cep',
+    'uf': 'uf',
+    'bairro': 'bairro',
+    'localidade': 'cidade',
+    'logradouro': 'logradouro',
+    'complemento': 'complemento',
+}
+
+# Status usado quando o provedor responde 200 com um corpo que nao pode ser interpretado.
+STATUS_RESPOSTA_INVALIDA = 502
+
+
+class FormatoDeResposta(ABC):
+    """Formato de resposta do provedor de CEP; as subclasses implementam ``interpreta``."""
+
+    nome = ''
+
+    def url(self, url_base: str, cep: str) -> str:
+        """Monta a URL de consulta do CEP neste formato.
+
+        :param url_base: URL base do provedor, sem a barra final.
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: URL de consulta.
+        """
+        return f'{url_base}/{cep}/{self.nome}/'
+
+    def interpreta_resposta(self, cep: str, status_code: int, conteudo: bytes) -> dict:
+        """Converte uma resposta do provedor nos dados para criacao de um endereco.
+
+        :param cep: CEP consultado.
+        :param status_code: Status HTTP da resposta.
+        :param conteudo: Corpo da resposta.
+
+        :return: Dados do endereco.
+
+        :raises CepMalFormatado: Caso o provedor responda 400.
+        :raises CepInvalido: Caso o provedor informe que o CEP nao existe.
+        :raises FalhaNaBuscaDeCep: Caso o provedor responda com outro status de falha ou com um
+            corpo que nao pode ser interpretado.
+        """
+        if status_code == 400:
+            raise CepMalFormatado(cep)
+        if status_code != 200:
+            raise FalhaNaBuscaDeCep(cep, status_code)
+
+        return self.interpreta(cep, conteudo)
+
+    @abstractmethod
+    def interpreta(self, cep: str, conteudo: bytes) -> dict:
+        """Converte o corpo de uma resposta 200 nos dados para criacao de um endereco.
+
+        :param cep: CEP consultado.
+        :param conteudo: Corpo da resposta.
+
+        :return: Dados do endereco, com todos os campos preenchidos (vazios quando ausentes).
+
+        :raises CepInvalido: Caso o provedor informe que o CEP nao existe.
+        :raises FalhaNaBuscaDeCep: Caso o corpo nao possa ser interpretado.
+        """
+
+
+class FormatoJson(FormatoDeResposta):
+    """Resposta JSON do ViaCEP (``/ws/<cep>/json/``), lida diretamente dos bytes."""
+
+    nome = 'json'
+
+    def interpreta(self, cep: str, conteudo: bytes) -> dict:
+        """[Overrides FormatoDeResposta.interpreta]"""
+        try:
+            dados = json.loads(conteudo)
+        except ValueError:
+            raise FalhaNaBuscaDeCep(cep, STATUS_RESPOSTA_INVALIDA)
+
+        if not isinstance(dados, dict):
+            raise FalhaNaBuscaDeCep(cep, STATUS_RESPOSTA_INVALIDA)
+        if dados.get('erro') not in (None, False, 'false'):
+            raise CepInvalido(cep)
+
+        return monta_dados(cep, {campo: dados.get(campo) for campo in CAMPOS})
+
+
+class FormatoXml(FormatoDeResposta):
+    """Resposta XML do ViaCEP (``/ws/<cep>/xml/``).
+
+    O corpo e lido direto dos bytes, sem decodificacao previa, e os elementos sao percorridos
+    uma unica vez em vez de um ``find`` por campo. Elementos ausentes resultam em campos vazios.
+    """
+
+    nome = 'xml'
+
+    def interpreta(self, cep: str, conteudo: bytes) -> dict:
+        """[Overrides FormatoDeResposta.interpreta]"""
+        try:
+            raiz = ElementTree.fromstring(conteudo)
+        except ElementTree.ParseError:
+            raise FalhaNaBuscaDeCep(cep, STATUS_RESPOSTA_INVALIDA)
+
+        valores = {}
+        for elemento in raiz:
+            if elemento.tag == 'erro':
+                raise CepInvalido(cep)
+            valores[elemento.tag] = elemento.text
+
+        return monta_dados(cep, valores)
+
+
+class FormatoBrasilApi(FormatoDeResposta):
+    """Resposta da BrasilAPI (``/api/cep/v1/<cep>``), que responde 404 para CEPs inexistentes."""
+
+    nome = 'brasilapi'
+
+    # Campos da BrasilAPI e os campos do ViaCEP correspondentes.
+    CAMPOS_BRASILAPI = {
+        'cep': 'cep',
+        'state': 'uf',
+        'neighborhood': 'bairro',
+        'city': 'localidade',
+        'street': 'logradouro',
+    }
+
+    def url(self, url_base: str, cep: str) -> str:
+        """[Overrides FormatoDeResposta.url]"""
+        return f'{url_base}/{cep}'
+
+    def interpreta_resposta(self, cep: str, status_code: int, conteudo: bytes) -> dict:
+        """[Overrides FormatoDeResposta.interpreta_resposta]"""
+        if status_code == 404:
+            raise CepInvalido(cep)
+
+        return super().interpreta_resposta(cep, status_code, conteudo)
+
+    def interpreta(self, cep: str, conteudo: bytes) -> dict:
+        """[Overrides FormatoDeResposta.interpreta]"""
+        try:
+            dados = json.loads(conteudo)
+        except ValueError:
+            raise FalhaNaBuscaDeCep(cep, STATUS_RESPOSTA_INVALIDA)
+
+        if not isinstance(dados, dict):
+            raise FalhaNaBuscaDeCep(cep, STATUS_RESPOSTA_INVALIDA)
+
+        return monta_dados(cep, {
+            campo_viacep: dados.get(campo) for campo, campo_viacep in self.CAMPOS_BRASILAPI.items()
+        })
+
+
+FORMATOS: Dict[str, FormatoDeResposta] = {}
+
+
+def registra_formato(formato: FormatoDeResposta) -> FormatoDeResposta:
+    """Registra um formato de resposta, tornando-o disponivel em ``FORMATO``.
+
+    :param formato: Formato a ser registrado pelo seu ``nome``.
+
+    :return: O proprio formato.
+    """
+    FORMATOS[formato.nome] = formato
+    return formato
+
+
+registra_formato(FormatoJson())
+registra_formato(FormatoXml())
+registra_formato(FormatoBrasilApi())
+
+
+def obtem_formato(nome: str) -> FormatoDeResposta:
+    """Retorna o formato de resposta pelo nome.
+
+    :param nome: Nome do formato (``json`` ou ``xml``).
+
+    :return: Formato de resposta.
+
+    :raises ImproperlyConfigured: Caso o formato nao exista.
+    """
+    try:
+        return FORMATOS[nome]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Formato de resposta {nome!r} invalido, use um de: {", ".join(FORMATOS)}.'
+        )
+
+
+def monta_dados(cep: str, valores: dict) -> dict:
+    """Converte os valores lidos do ViaCEP nos campos de Endereco.
+
+    :param cep: CEP consultado, usado quando a resposta nao traz o CEP.
+    :param valores: Valores indexados pelos nomes de campo do ViaCEP.
+
+    :return: Dados do endereco.
+    """
+    dados = {campo: valores.get(campo_viacep) or '' for campo_viacep, campo in CAMPOS.items()}
+    dados['cep'] = limpa_cep(dados['cep']) or cep
+
+    return dados
@@ -0,0 +1,132 @@
+"""Consulta de enderecos por CEP na base.
+
+A busca por CEP e a consulta mais frequente da API. Sobre o djongo, cada consulta do ORM passa
+pela traducao de SQL para MongoDB, cujo custo e maior que o da propria consulta; por isso, quando
+a base e um MongoDB e ``CEP_REPOSITORIO['NATIVO_NO_MONGO']`` esta ativo, o endereco e lido
+diretamente com o PyMongo, na colecao criada pelo djongo. Nas demais bases, o ORM e usado.
+
+Quando a requisicao le de uma replica (TexCepChallenge.replicas), a consulta nativa e feita com a
+preferencia de leitura ``secondaryPreferred``, nos secundarios do replica set.
+"""
+
+# Importacoes externas.
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+# Importacoes internas.
+from cep.models import Endereco
+from cep.serializers import representacao_de_endereco
+from TexCepChallenge.replicas import alias_de_leitura
+
+CONFIGURACAO_PADRAO = {
+    'NATIVO_NO_MONGO': True,
+}
+
+
+class RepositorioDeEndereco:
+    """Consulta de enderecos por CEP pelo ORM."""
+
+    def obtem(self, cep: str) -> Optional[dict]:
+        """Le o endereco do CEP.
+
+        :param cep: CEP ja limpo por ``limpa_cep``.
+
+        :return: Dados do endereco no formato do EnderecoSerializer ou None.
+        """
+        return representacao_de_endereco.obtem(cep=cep)
+
+
+class RepositorioMongoDeEndereco(RepositorioDeEndereco):
+    """Consulta de enderecos por CEP com o PyMongo, sem a traducao de SQL do djongo."""
+
+    def __init__(self, colecao):
+        """Inicializa o repositorio.
+
+        :param colecao: Colecao (``pymongo.collection.Collection``) de enderecos.
+        """
+        self.colecao = colecao
+        self.colunas = representacao_de_endereco.colunas()
+        self.projecao = {'_id': 0, **{coluna: 1 for coluna in self.colunas}}
+        self._colecao_secundaria = None
+
+    @property
+    def colecao_secundaria(self):
+        """Colecao lida preferencialmente dos secundarios do replica set."""
+        if self._colecao_secundaria is None:
+            from pymongo import ReadPreference
+
+            self._colecao_secundaria = self.colecao.with_options(
+                read_preference=ReadPreference.SECONDARY_PREFERRED,
+            )
+        return self._colecao_secundaria
+
+    @classmethod
+    def da_base(cls, base: dict) -> 'RepositorioMongoDeEndereco':
+        """Cria o repositorio sobre a base do djongo, com o seu proprio MongoClient.
+
+        :param base: Configuracao da base em ``settings.DATABASES``.
+
+        :return: Repositorio.
+        """
+        from pymongo import MongoClient
+
+        cliente = base.get('CLIENT', {})
+        if 'host' not in cliente:
+            cliente = {
+                **cliente,
+                'host': base.get('HOST') or '127.0.0.1',
+                'port': int(base.get('PORT') or 27017),
+            }
+        banco = MongoClient(tz_aware=True, **cliente)[base['NAME']]
+        return cls(banco[Endereco._meta.db_table])
+
+    def obtem(self, cep: str) -> Optional[dict]:
+        """[Overrides RepositorioDeEndereco.obtem]"""
+        colecao = self.colecao
+        if alias_de_leitura() != DEFAULT_DB_ALIAS:
+            colecao = self.colecao_secundaria
+        documento = colecao.find_one({'cep': cep}, self.projecao)
+        if documento is None:
+            return None
+        return representacao_de_endereco.representa(
+            [{coluna: documento.get(coluna) for coluna in self.colunas}],
+        )[0]
+
+
+_repositorio: Optional[RepositorioDeEndereco] = None
+_trava_repositorio = threading.Lock()
+
+
+def obtem_repositorio_de_endereco() -> RepositorioDeEndereco:
+    """Retorna o repositorio adequado a base configurada, criando-o na primeira chamada.
+
+    :return: RepositorioMongoDeEndereco sobre o djongo (salvo com ``NATIVO_NO_MONGO`` desativado)
+        ou RepositorioDeEndereco.
+    """
+    global _repositorio
+    if _repositorio is not None:
+        return _repositorio
+
+    with _trava_repositorio:
+        if _repositorio is None:
+            configuracao = {**CONFIGURACAO_PADRAO, **getattr(settings, 'CEP_REPOSITORIO', {})}
+            base = connections.databases[DEFAULT_DB_ALIAS]
+            if base['ENGINE'] == 'djongo' and configuracao['NATIVO_NO_MONGO']:
+                _repositorio = RepositorioMongoDeEndereco.da_base(base)
+            else:
+                _repositorio = RepositorioDeEndereco()
+    return _repositorio
+
+
+@receiver(setting_changed)
+def redefine_repositorio(setting: str, **kwargs) -> None:
+    """Descarta o repositorio quando ``CEP_REPOSITORIO`` ou ``DATABASES`` sao alterados."""
+    global _repositorio
+    if setting in ('CEP_REPOSITORIO', 'DATABASES'):
+        with _trava_repositorio:
+            _repositorio = None
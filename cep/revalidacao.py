@@ -0,0 +1,152 @@
+"""Revalidacao periodica dos enderecos obtidos do ViaCEP."""
+
+# Importacoes externas.
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Optional, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+# Importacoes internas.
+from cep.cache import cache_de_cep
+from cep.excecoes import CepInvalido, ErroDeCep
+from cep.fila import LimitadorDeTaxa
+from cep.models import Endereco
+from cep.servicos import busca_dados_no_provedor
+
+CONFIGURACAO_PADRAO = {
+    'QUANTIDADE': 1000,
+    'WORKERS': 4,
+    'REQUISICOES_POR_SEGUNDO': 5,
+    'ESPERA_APOS_FALHA': 60 * 60,
+}
+
+CAMPOS_REVALIDADOS = ['uf', 'bairro', 'cidade', 'logradouro', 'complemento']
+
+
+def revalida_enderecos(
+    quantidade: Optional[int] = None,
+    workers: Optional[int] = None,
+    requisicoes_por_segundo: Optional[float] = None,
+) -> dict:
+    """Revalida no ViaCEP os enderecos buscados ha mais tempo.
+
+    Os enderecos nunca revalidados (sem ``revalidado_em``) vem primeiro e os cadastrados pela
+    API (``origem='api'``) sao ignorados, ja que foram informados manualmente. As buscas sao
+    feitas em paralelo por ``workers`` threads, limitadas a ``requisicoes_por_segundo``. Apenas
+    os enderecos cujo conteudo mudou sao regravados, e somente se nao tiverem sido gravados por
+    outro processo durante a revalidacao (o ``atualizado_em`` lido continua o mesmo), para nao
+    sobrescrever, por exemplo, uma edicao pela API; nos demais, so ``revalidado_em`` e
+    atualizado, com um unico ``update``, mantendo o ``atualizado_em`` (base do ETag) e o cache
+    de CEP. Enderecos que o provedor nao conseguiu responder ficam fora da fila por
+    ``ESPERA_APOS_FALHA`` segundos (``revalidar_apos``), para nao ocuparem a frente dela.
+
+    Os valores nao informados vem de ``settings.CEP_REVALIDACAO``.
+
+    :param quantidade: Quantidade de enderecos revalidados.
+    :param workers: Buscas simultaneas ao ViaCEP.
+    :param requisicoes_por_segundo: Limite de buscas por segundo ao ViaCEP.
+
+    :return: Quantidade de enderecos alterados, inalterados, inexistentes no ViaCEP, com falha e
+        gravados por outro processo durante a revalidacao (``concorrentes``).
+    """
+    configuracao = {**CONFIGURACAO_PADRAO, **getattr(settings, 'CEP_REVALIDACAO', {})}
+    quantidade = quantidade or configuracao['QUANTIDADE']
+    workers = workers or configuracao['WORKERS']
+    limitador = LimitadorDeTaxa(
+        requisicoes_por_segundo or configuracao['REQUISICOES_POR_SEGUNDO'],
+    )
+
+    enderecos = list(
+        Endereco.objects.exclude(origem=Endereco.ORIGEM_API)
+        .filter(Q(revalidar_apos__isnull=True) | Q(revalidar_apos__lte=timezone.now()))
+        .order_by(F('revalidado_em').asc(nulls_first=True), 'pk')
+        .only('pk', 'cep', 'revalidado_em', 'atualizado_em', *CAMPOS_REVALIDADOS)[:quantidade]
+    )
+
+    def busca(endereco: Endereco) -> Union[dict, ErroDeCep]:
+        limitador.aguarda()
+        try:
+            return busca_dados_no_provedor(endereco.cep)
+        except ErroDeCep as erro:
+            return erro
+
+    buscas = []
+    if enderecos:
+        with ThreadPoolExecutor(max_workers=min(workers, len(enderecos))) as executor:
+            buscas = list(executor.map(busca, enderecos))
+
+    return grava_revalidacoes(enderecos, buscas, configuracao['ESPERA_APOS_FALHA'])
+
+
+def grava_revalidacoes(
+    enderecos: List[Endereco],
+    buscas: List[Union[dict, ErroDeCep]],
+    espera_apos_falha: float,
+) -> dict:
+    """Grava o resultado das buscas da revalidacao.
+
+    :param enderecos: Enderecos revalidados, como foram lidos antes das buscas.
+    :param buscas: Dados obtidos do provedor, ou o erro da busca, de cada endereco.
+    :param espera_apos_falha: Segundos que os enderecos com falha ficam fora da fila.
+
+    :return: Quantidade de enderecos de cada resultado, ver ``revalida_enderecos``.
+    """
+    resultado = {
+        'alterados': 0, 'inalterados': 0, 'inexistentes': 0, 'falhas': 0, 'concorrentes': 0,
+    }
+    alterados, confirmados, falhas = [], [], []
+    for endereco, dados_de_endereco in zip(enderecos, buscas):
+        if isinstance(dados_de_endereco, CepInvalido):
+            resultado['inexistentes'] += 1
+            confirmados.append(endereco.pk)
+        elif isinstance(dados_de_endereco, ErroDeCep):
+            resultado['falhas'] += 1
+            falhas.append(endereco.pk)
+        elif foi_alterado(endereco, dados_de_endereco):
+            alterados.append((endereco, dados_de_endereco))
+        else:
+            resultado['inalterados'] += 1
+            confirmados.append(endereco.pk)
+
+    agora = timezone.now()
+    revalidaveis = Endereco.objects.exclude(origem=Endereco.ORIGEM_API)
+    regravados = []
+    with transaction.atomic():
+        for endereco, dados_de_endereco in alterados:
+            # Regrava apenas se o endereco nao mudou desde a leitura (ex.: PUT com origem=api).
+            if revalidaveis.filter(pk=endereco.pk, atualizado_em=endereco.atualizado_em).update(
+                **{campo: dados_de_endereco[campo] for campo in CAMPOS_REVALIDADOS},
+                origem=dados_de_endereco.get('origem', Endereco.ORIGEM_VIACEP),
+                buscado_em=agora, revalidado_em=agora, atualizado_em=agora, revalidar_apos=None,
+            ):
+                regravados.append(endereco.cep)
+            else:
+                resultado['concorrentes'] += 1
+        # Os dados servidos nao mudam: o atualizado_em, base do ETag, e mantido.
+        revalidaveis.filter(pk__in=confirmados).update(revalidado_em=agora, revalidar_apos=None)
+        revalidaveis.filter(pk__in=falhas).update(
+            revalidar_apos=agora + timedelta(seconds=espera_apos_falha),
+        )
+
+    if regravados:
+        cache_de_cep.invalida(*regravados)
+    resultado['alterados'] = len(regravados)
+
+    return resultado
+
+
+def foi_alterado(endereco: Endereco, dados_de_endereco: dict) -> bool:
+    """Verifica se os dados obtidos do ViaCEP diferem dos gravados no endereco.
+
+    :param endereco: Endereco gravado.
+    :param dados_de_endereco: Dados obtidos do ViaCEP.
+
+    :return: Se algum dos ``CAMPOS_REVALIDADOS`` mudou.
+    """
+    return any(
+        getattr(endereco, campo) != dados_de_endereco[campo] for campo in CAMPOS_REVALIDADOS
+    )
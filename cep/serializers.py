@@ -2,25 +2,52 @@
 
 # Importações externas
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 
 # Importações internas
+from TexCepChallenge.renderizacao import RepresentacaoRapida
+from TexCepChallenge.serializers import CamposDinamicosMixin
 from cep.models import Endereco
+from cep.utils import limpa_cep
 
 
-class EnderecoSerializer(serializers.ModelSerializer):
+class NormalizaCepMixin:
+    """Aplica ``limpa_cep`` ao CEP recebido antes das validacoes, inclusive a de unicidade."""
+
+    def to_internal_value(self, data):
+        """[Overrides ModelSerializer.to_internal_value]"""
+        if isinstance(data, dict) and isinstance(data.get('cep'), str):
+            data = data.copy()
+            data['cep'] = limpa_cep(data['cep'])
+
+        return super().to_internal_value(data)
+
+
+class EnderecoSerializer(CamposDinamicosMixin, NormalizaCepMixin, serializers.ModelSerializer):
     """Serializer para Endereco."""
 
     class Meta:
         """Meta classe para serializer de Endereco."""
 
         model = Endereco
-        fields = '__all__'
+        exclude = ('cep_numerico', 'revalidado_em', 'revalidar_apos')
+        read_only_fields = ('buscado_em', 'origem')
+
+
+representacao_de_endereco = RepresentacaoRapida(EnderecoSerializer)
 
 
-class EnderecoUpdateSerializer(serializers.ModelSerializer):
+class EnderecoUpdateSerializer(NormalizaCepMixin, serializers.ModelSerializer):
     """Serializer para atualizacao de Endereco."""
 
-    cep = serializers.CharField(required=False)
+    cep = serializers.CharField(
+        required=False,
+        max_length=8,
+        validators=[UniqueValidator(
+            queryset=Endereco.objects.all(),
+            message='endereco with this cep already exists.',
+        )],
+    )
     uf = serializers.CharField(required=False)
     bairro = serializers.CharField(required=False)
     cidade = serializers.CharField(required=False)
@@ -31,4 +58,5 @@ class EnderecoUpdateSerializer(serializers.ModelSerializer):
         """Meta classe para serializer de Endereco."""
 
         model = Endereco
-        fields = '__all__'
+        exclude = ('cep_numerico', 'revalidado_em', 'revalidar_apos')
+        read_only_fields = ('buscado_em', 'origem')
@@ -0,0 +1,339 @@
+"""CEP Servicos."""
+
+# Importacoes externas.
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Union
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+# Importacoes internas.
+from TexCepChallenge.instrumentacao import mede
+from cep.cache import cache_de_cep
+from cep.cliente import obtem_grupo_de_provedores, obtem_grupo_de_provedores_assincrono
+from cep.coalescencia import Coalescedor, CoalescedorAssincrono
+from cep.excecoes import CepInvalido, CepMalFormatado, ErroDeCep
+from cep.indice import obtem_indice
+from cep.models import Endereco
+from cep.provedores import FORMATOS
+from cep.repositorio import obtem_repositorio_de_endereco
+from cep.serializers import EnderecoSerializer
+
+coalescedor_de_cep = Coalescedor()
+coalescedor_assincrono_de_cep = CoalescedorAssincrono()
+
+
+def obtem_dados_de_endereco(cep: str) -> dict:
+    """Retorna os dados serializados do endereco do CEP, buscando-os no ViaCEP se necessario.
+
+    A ordem de consulta e: cache de CEP, indice de CEP (caso configurado), cache negativo, base
+    e por fim o ViaCEP. Buscas concorrentes pelo mesmo CEP ausente do cache sao coalescidas em
+    uma unica consulta a base e ao ViaCEP, evitando requisicoes e enderecos duplicados.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco no formato do EnderecoSerializer.
+
+    :raises CepMalFormatado: Caso o CEP nao tenha 8 digitos, sem consultar o ViaCEP.
+    :raises CepInvalido: Caso o CEP nao exista no ViaCEP.
+    :raises FalhaNaBuscaDeCep: Caso o ViaCEP responda com falha.
+    :raises ProvedorIndisponivel: Caso o ViaCEP nao responda ou o disjuntor esteja aberto.
+    """
+    dados_endereco = cache_de_cep.obtem(cep) or dados_do_indice(cep)
+    if dados_endereco is not None:
+        return dados_endereco
+
+    verifica_cep(cep)
+
+    return coalescedor_de_cep.executa(cep, lambda: resolve_endereco(cep))
+
+
+async def obtem_dados_de_endereco_async(cep: str) -> dict:
+    """Versao assincrona de ``obtem_dados_de_endereco``.
+
+    A consulta ao ViaCEP e feita pelo cliente assincrono, sem ocupar uma thread durante a
+    espera; cache e base continuam sendo acessados pelas funcoes sincronas via ``sync_to_async``.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco no formato do EnderecoSerializer.
+    """
+    dados_endereco = await sync_to_async(cache_de_cep.obtem)(cep)
+    if dados_endereco is None:
+        dados_endereco = await sync_to_async(dados_do_indice)(cep)
+    if dados_endereco is not None:
+        return dados_endereco
+
+    await sync_to_async(verifica_cep)(cep)
+
+    return await coalescedor_assincrono_de_cep.executa(cep, lambda: resolve_endereco_async(cep))
+
+
+def dados_do_indice(cep: str) -> Optional[dict]:
+    """Procura o CEP no indice em memoria configurado em ``CEP_INDICE``.
+
+    O indice so e consultado se tiver sido construido na geracao atual do cache, ha menos tempo
+    que a validade das marcas de CEPs alterados, e o CEP nao tiver sido alterado depois disso;
+    os dados encontrados sao guardados no cache.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco ou None.
+    """
+    indice = obtem_indice()
+    if (
+        indice is None
+        or indice.geracao != cache_de_cep.geracao()
+        or time.time() - indice.construido_em > cache_de_cep.ttl_alteracao
+    ):
+        return None
+
+    dados_endereco = indice.busca(cep)
+    if dados_endereco is None or cache_de_cep.foi_alterado(cep):
+        return None
+
+    cache_de_cep.define(cep, dados_endereco)
+    return dados_endereco
+
+
+def verifica_cep(cep: str) -> None:
+    """Recusa CEPs mal formatados ou presentes no cache negativo.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :raises CepMalFormatado: Caso o CEP nao tenha 8 digitos.
+    :raises CepInvalido: Caso o CEP tenha sido marcado como invalido.
+    """
+    if not re.fullmatch(r'\d{8}', cep):
+        raise CepMalFormatado(cep)
+    if cache_de_cep.eh_invalido(cep):
+        raise CepInvalido(cep)
+
+
+def resolve_endereco(cep: str) -> dict:
+    """Procura o endereco do CEP na base ou no ViaCEP e guarda o resultado no cache.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco no formato do EnderecoSerializer.
+    """
+    dados_endereco = dados_da_base(cep)
+    if dados_endereco is not None:
+        return dados_endereco
+
+    try:
+        dados_de_endereco = busca_dados_no_provedor(cep)
+    except CepInvalido:
+        cache_de_cep.marca_invalido(cep)
+        raise
+
+    return registra_endereco(cep, dados_de_endereco)
+
+
+async def resolve_endereco_async(cep: str) -> dict:
+    """Versao assincrona de ``resolve_endereco``.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco no formato do EnderecoSerializer.
+    """
+    dados_endereco = await sync_to_async(dados_da_base)(cep)
+    if dados_endereco is not None:
+        return dados_endereco
+
+    try:
+        with mede('provedor'):
+            dados_de_endereco = await obtem_grupo_de_provedores_assincrono().busca_dados(cep)
+    except CepInvalido:
+        await sync_to_async(cache_de_cep.marca_invalido)(cep)
+        raise
+
+    return await sync_to_async(registra_endereco)(cep, dados_de_endereco)
+
+
+def dados_da_base(cep: str) -> Optional[dict]:
+    """Procura o endereco do CEP na base, guardando os dados serializados no cache.
+
+    A consulta e feita pelo repositorio adequado a base, ver ``obtem_repositorio_de_endereco``.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco ou None caso ele nao exista na base.
+    """
+    dados_endereco = obtem_repositorio_de_endereco().obtem(cep)
+    if dados_endereco is None:
+        return None
+
+    cache_de_cep.define(cep, dados_endereco)
+
+    return dados_endereco
+
+
+def obtem_dados_conhecidos(cep: str) -> Optional[dict]:
+    """Retorna os dados do endereco do CEP caso ele ja seja conhecido, sem consultar o ViaCEP.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco, vindos do cache, do indice ou da base, ou None.
+    """
+    return cache_de_cep.obtem(cep) or dados_do_indice(cep) or dados_da_base(cep)
+
+
+def registra_endereco(cep: str, dados_de_endereco: dict) -> dict:
+    """Cria o endereco obtido do provedor e guarda os dados serializados no cache.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+    :param dados_de_endereco: Dados obtidos do provedor.
+
+    :return: Dados do endereco no formato do EnderecoSerializer.
+    """
+    endereco = cria_endereco(dados_de_endereco)
+
+    dados_endereco = EnderecoSerializer(endereco).data
+    cache_de_cep.define(cep, dados_endereco)
+
+    return dados_endereco
+
+
+def obtem_dados_de_enderecos(
+    ceps: List[str],
+    antes_da_busca: Optional[Callable[[], None]] = None,
+) -> Dict[str, Union[dict, ErroDeCep]]:
+    """Resolve varios CEPs de uma vez, retornando os dados ou o erro de cada um.
+
+    Os CEPs ausentes do cache sao procurados na base com uma unica consulta ``cep__in``; os que
+    tambem nao estiverem na base sao buscados no ViaCEP em paralelo, limitado a
+    ``CEP_BUSCA_EM_LOTE['WORKERS']`` buscas simultaneas, e criados com um unico ``bulk_create``.
+
+    :param ceps: CEPs ja limpos por ``limpa_cep``.
+    :param antes_da_busca: Chamada por cada worker antes de cada busca no ViaCEP (ex.: o
+        ``aguarda`` de um ``LimitadorDeTaxa``).
+
+    :return: Dados do endereco ou erro da resolucao, indexados pelo CEP.
+    """
+    resultados: Dict[str, Union[dict, ErroDeCep]] = {}
+    faltantes = []
+
+    for cep in dict.fromkeys(ceps):
+        dados_endereco = cache_de_cep.obtem(cep) or dados_do_indice(cep)
+        if dados_endereco is not None:
+            resultados[cep] = dados_endereco
+            continue
+        try:
+            verifica_cep(cep)
+        except CepInvalido as erro:
+            resultados[cep] = erro
+            continue
+        faltantes.append(cep)
+
+    if not faltantes:
+        return resultados
+
+    for endereco in Endereco.objects.filter(cep__in=faltantes):
+        if endereco.cep not in resultados:
+            resultados[endereco.cep] = EnderecoSerializer(endereco).data
+            cache_de_cep.define(endereco.cep, resultados[endereco.cep])
+
+    faltantes = [cep for cep in faltantes if cep not in resultados]
+    if not faltantes:
+        return resultados
+
+    workers = getattr(settings, 'CEP_BUSCA_EM_LOTE', {}).get('WORKERS', 8)
+    novos_enderecos = {}
+    agora = timezone.now()
+    with mede('provedor'), ThreadPoolExecutor(max_workers=min(workers, len(faltantes))) as executor:
+        buscas = dict(zip(faltantes, executor.map(
+            lambda cep: _busca_dados_ou_erro(cep, antes_da_busca), faltantes,
+        )))
+
+    for cep, dados_de_endereco in buscas.items():
+        if isinstance(dados_de_endereco, CepInvalido):
+            cache_de_cep.marca_invalido(cep)
+        if isinstance(dados_de_endereco, ErroDeCep):
+            resultados[cep] = dados_de_endereco
+        else:
+            novos_enderecos[cep] = Endereco(**{
+                'origem': Endereco.ORIGEM_VIACEP,
+                **dados_de_endereco,
+                'cep': cep,
+                'buscado_em': agora,
+                'revalidado_em': agora,
+            })
+
+    try:
+        with transaction.atomic():
+            Endereco.objects.bulk_create(novos_enderecos.values())
+    except IntegrityError:
+        for endereco in novos_enderecos.values():
+            cria_endereco(model_to_dict(endereco, exclude=['id']))
+
+    for endereco in Endereco.objects.filter(cep__in=list(novos_enderecos)):
+        resultados[endereco.cep] = EnderecoSerializer(endereco).data
+        cache_de_cep.define(endereco.cep, resultados[endereco.cep])
+
+    return resultados
+
+
+def _busca_dados_ou_erro(
+    cep: str, antes_da_busca: Optional[Callable[[], None]] = None,
+) -> Union[dict, ErroDeCep]:
+    if antes_da_busca is not None:
+        antes_da_busca()
+    try:
+        return busca_dados_no_provedor(cep)
+    except ErroDeCep as erro:
+        return erro
+
+
+def busca_dados_no_provedor(cep: str) -> dict:
+    """Busca nos provedores de CEP os dados para criacao de um endereco.
+
+    Os provedores sao consultados pelo ``GrupoDeProvedores``, com requisicoes hedged e failover.
+
+    :param cep: CEP ja limpo por ``limpa_cep``.
+
+    :return: Dados do endereco, com o provedor que respondeu em ``origem``.
+    """
+    with mede('provedor'):
+        return obtem_grupo_de_provedores().busca_dados(cep)
+
+
+def cria_endereco(dados_de_endereco: dict) -> Endereco:
+    """Cria um novo endereco na base, ou retorna o ja existente com o mesmo CEP.
+
+    Salvo indicacao contraria nos dados, o endereco e registrado como buscado agora no ViaCEP.
+    Dados vindos de outro provedor trazem o nome dele em ``origem``.
+
+    O indice unico em ``Endereco.cep`` garante que criacoes concorrentes do mesmo CEP resultem
+    em um unico endereco: quem perder a corrida recebe o endereco criado pelo outro.
+
+    :param dados_de_endereco: Dados a serem utilizados na criacao de endereco.
+
+    :return: Objeto de endereco criado ou ja existente.
+    """
+    agora = timezone.now()
+    dados_de_endereco = {
+        'origem': Endereco.ORIGEM_VIACEP, 'buscado_em': agora, 'revalidado_em': agora,
+        **dados_de_endereco,
+    }
+    cep = dados_de_endereco.pop('cep')
+    endereco, _ = Endereco.objects.get_or_create(cep=cep, defaults=dados_de_endereco)
+
+    return endereco
+
+
+def monta_objeto_endereco(xml_content: str, cep: str = '') -> dict:
+    """Prepara um dicionario com as informacoes para criacao de uma instancia de endereco.
+
+    :param xml_content: Conteudo xml de onde extrair as informacoes de endereco.
+    :param cep: CEP consultado, usado na mensagem de erro.
+
+    :return: Objeto de endereco montado para criacao.
+
+    :raises CepInvalido: Caso o ViaCEP responda com ``<erro>``.
+    """
+    return FORMATOS['xml'].interpreta(cep, xml_content.encode('utf-8'))
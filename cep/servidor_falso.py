@@ -0,0 +1,200 @@
+"""Servidor ViaCEP (e BrasilAPI) falso para testes e benchmarks."""
+
+# Importacoes externas.
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from xml.sax.saxutils import escape
+
+CAMPOS_VIACEP = ('cep', 'logradouro', 'complemento', 'bairro', 'localidade', 'uf')
+
+# Campos do ViaCEP e os campos da BrasilAPI correspondentes.
+CAMPOS_BRASILAPI = {
+    'cep': 'cep',
+    'uf': 'state',
+    'localidade': 'city',
+    'bairro': 'neighborhood',
+    'logradouro': 'street',
+}
+
+
+def gera_dados(cep: str) -> dict:
+    """Gera dados no formato do ViaCEP para um CEP qualquer.
+
+    :param cep: CEP limpo.
+
+    :return: Dados do CEP.
+    """
+    return {
+        'cep': f'{cep[:5]}-{cep[5:]}',
+        'logradouro': f'Rua {cep}',
+        'complemento': '',
+        'bairro': f'Bairro {cep[:5]}',
+        'localidade': f'Cidade {cep[:3]}',
+        'uf': 'PI',
+    }
+
+
+def monta_corpo(dados: Optional[dict], formato: str) -> bytes:
+    """Monta o corpo de uma resposta do ViaCEP ou da BrasilAPI.
+
+    :param dados: Dados no formato do ViaCEP, ou None para a resposta de CEP inexistente.
+    :param formato: ``json``, ``xml`` ou ``brasilapi``.
+
+    :return: Corpo da resposta codificado em UTF-8.
+    """
+    if formato == 'brasilapi':
+        if dados is None:
+            corpo = {'name': 'CepPromiseError', 'message': 'CEP nao encontrado.'}
+        else:
+            corpo = {
+                campo_brasilapi: dados.get(campo, '').replace('-', '') if campo == 'cep'
+                else dados.get(campo, '')
+                for campo, campo_brasilapi in CAMPOS_BRASILAPI.items()
+            }
+        return json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+
+    if formato == 'json':
+        return json.dumps(dados or {'erro': True}, ensure_ascii=False).encode('utf-8')
+
+    if dados is None:
+        corpo = '<xmlcep><erro>true</erro></xmlcep>'
+    else:
+        elementos = ''.join(
+            f'<{campo}>{escape(dados.get(campo, ""))}</{campo}>' for campo in CAMPOS_VIACEP
+        )
+        corpo = f'<xmlcep>{elementos}</xmlcep>'
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n{corpo}'.encode('utf-8')
+
+
+class _ServidorHttp(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        """Ignora clientes que desistem da resposta (ex.: por timeout)."""
+
+
+class ServidorViaCepFalso:
+    """Servidor HTTP local que imita as rotas ``/ws/<cep>/xml/`` e ``/ws/<cep>/json/`` do ViaCEP
+    e ``/api/cep/v1/<cep>`` da BrasilAPI.
+
+    Permite injetar latencia e uma taxa de respostas 503 para exercitar o cliente sem acesso a
+    rede. Pode ser usado como gerenciador de contexto.
+    """
+
+    def __init__(
+        self,
+        enderecos: Optional[Dict[str, dict]] = None,
+        latencia: float = 0,
+        taxa_de_erro: float = 0,
+        gera_enderecos: bool = False,
+    ):
+        """Inicializa o servidor.
+
+        :param enderecos: Dados no formato do ViaCEP indexados pelo CEP limpo.
+        :param latencia: Tempo, em segundos, de espera antes de cada resposta.
+        :param taxa_de_erro: Fracao das requisicoes respondidas com 503.
+        :param gera_enderecos: Se CEPs ausentes de ``enderecos`` devem ter dados gerados.
+        """
+        self.enderecos = enderecos or {}
+        self.latencia = latencia
+        self.taxa_de_erro = taxa_de_erro
+        self.gera_enderecos = gera_enderecos
+        self.requisicoes = 0
+        self._trava = threading.Lock()
+        self._servidor = _ServidorHttp(('127.0.0.1', 0), self._cria_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url_base(self) -> str:
+        """URL base equivalente a ``https://viacep.com.br/ws``."""
+        host, porta = self._servidor.server_address[:2]
+        return f'http://{host}:{porta}/ws'
+
+    @property
+    def url_base_brasilapi(self) -> str:
+        """URL base equivalente a ``https://brasilapi.com.br/api/cep/v1``."""
+        host, porta = self._servidor.server_address[:2]
+        return f'http://{host}:{porta}/api/cep/v1'
+
+    def inicia(self) -> 'ServidorViaCepFalso':
+        """Inicia o servidor em uma thread separada."""
+        self._thread = threading.Thread(
+            target=self._servidor.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def para(self) -> None:
+        """Para o servidor e libera a porta."""
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def __enter__(self) -> 'ServidorViaCepFalso':
+        return self.inicia()
+
+    def __exit__(self, *args) -> None:
+        self.para()
+
+    def dados(self, cep: str) -> Optional[dict]:
+        """Retorna os dados no formato do ViaCEP para o CEP, ou None caso ele nao exista.
+
+        :param cep: CEP limpo.
+
+        :return: Dados do CEP.
+        """
+        if cep in self.enderecos:
+            return {'cep': f'{cep[:5]}-{cep[5:]}', **self.enderecos[cep]}
+        if self.gera_enderecos:
+            return gera_dados(cep)
+        return None
+
+    def _cria_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with servidor._trava:
+                    servidor.requisicoes += 1
+                if servidor.latencia:
+                    time.sleep(servidor.latencia)
+
+                rota = re.fullmatch(r'/ws/([^/]+)/(xml|json)/?', self.path)
+                rota_brasilapi = re.fullmatch(r'/api/cep/v1/([^/]+)', self.path)
+                if not rota and not rota_brasilapi:
+                    return self._responde(404, b'', 'text/plain')
+                if random.random() < servidor.taxa_de_erro:
+                    return self._responde(503, b'', 'text/plain')
+
+                if rota_brasilapi:
+                    return self._responde_brasilapi(rota_brasilapi.group(1))
+
+                cep, formato = rota.groups()
+                if not re.fullmatch(r'\d{8}', cep):
+                    return self._responde(400, b'', 'text/html')
+
+                corpo = monta_corpo(servidor.dados(cep), formato)
+                return self._responde(200, corpo, f'application/{formato}')
+
+            def _responde_brasilapi(self, cep):
+                dados = servidor.dados(cep) if re.fullmatch(r'\d{8}', cep) else None
+                corpo = monta_corpo(dados, 'brasilapi')
+                return self._responde(200 if dados else 404, corpo, 'application/json')
+
+            def _responde(self, status_code, corpo, content_type):
+                self.send_response(status_code)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -1,14 +1,79 @@
 """Cep Tests."""
 
 # Importações externas
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+import requests
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import CommandError, call_command
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, transaction
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
 # Importações internas
-from cep.models import Endereco
+from TexCepChallenge.exclusao import ExclusaoEmLotes
+from TexCepChallenge.instrumentacao import metricas_de_rotas
+from TexCepChallenge.replicas import (
+    COOKIE_DE_ESCRITA, RoteadorDeReplicas, estado_da_requisicao, le_da_replica,
+)
+from cep.cache import CacheLocal, cache_de_cep
+from cep.cliente import (
+    ClienteViaCep, ClienteViaCepAssincrono, Disjuntor, latencias_de_provedores,
+)
+from cep.coalescencia import Coalescedor, CoalescedorAssincrono
+from cep.excecoes import CepInvalido, FalhaNaBuscaDeCep, ProvedorIndisponivel
+from cep import fila
+from cep.fila import LimitadorDeTaxa, enfileira_ceps, processa_tarefas, reserva_tarefas
+from cep.indice import IndiceDeCep, constroi_indice, obtem_indice
+from cep.models import Endereco, TarefaDeCep
+from cep.provedores import FormatoDeResposta, obtem_formato
+from cep.repositorio import (
+    RepositorioDeEndereco,
+    RepositorioMongoDeEndereco,
+    obtem_repositorio_de_endereco,
+)
+from cep.revalidacao import CAMPOS_REVALIDADOS, grava_revalidacoes, revalida_enderecos
+from cep.serializers import EnderecoSerializer
+from cep.servicos import cria_endereco, dados_do_indice, monta_objeto_endereco
+from cep.servidor_falso import ServidorViaCepFalso, monta_corpo
 from cep.views import limpa_cep
+from pessoa.models import Pessoa
+
+
+def usa_servidor_falso(test_case: TestCase, **kwargs) -> ServidorViaCepFalso:
+    """Inicia um ServidorViaCepFalso e aponta o cliente do ViaCEP para ele durante o teste.
+
+    :param test_case: Teste que usara o servidor.
+    :param kwargs: Argumentos repassados ao ServidorViaCepFalso.
+
+    :return: Servidor iniciado.
+    """
+    servidor = ServidorViaCepFalso(**kwargs).inicia()
+    test_case.addCleanup(servidor.para)
+
+    configuracao = override_settings(
+        CEP_PROVEDOR={**settings.CEP_PROVEDOR, 'URL_BASE': servidor.url_base},
+    )
+    configuracao.enable()
+    test_case.addCleanup(configuracao.disable)
+
+    return servidor
 
 
 class CepViewsTestCase(TestCase):
@@ -17,6 +82,15 @@ class CepViewsTestCase(TestCase):
     def setUp(self):
         """set Up."""
         self.client = APIClient()
+        self.viacep = usa_servidor_falso(self, enderecos={
+            '64082550': {
+                'logradouro': 'Rua Teste',
+                'complemento': '',
+                'bairro': 'Bairro Teste',
+                'localidade': 'Teresina',
+                'uf': 'PI',
+            },
+        })
         self.endereco_data = {
             'bairro': 'Test Bairro',
             'cidade': 'Test Cidade',
@@ -26,6 +100,7 @@ class CepViewsTestCase(TestCase):
             'complemento': 'Test Complemento',
         }
         self.endereco = Endereco.objects.create(**self.endereco_data)
+        cache_de_cep.invalida_tudo()
 
     def test_get_endereco(self):
         """Testa o retrieve de endereco."""
@@ -50,11 +125,151 @@ class CepViewsTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['bairro'], novos_dados['bairro'])
 
+    def test_get_endereco_condicional(self):
+        """Testa o 304 do retrieve de endereco e a mudanca do ETag apos o update."""
+        rota = reverse('endereco_detail', args=[self.endereco.pk])
+        response = self.client.get(rota)
+        etag = response['ETag']
+
+        with self.settings(RENDERIZACAO_RAPIDA={'ROTAS': []}):
+            self.assertEqual(self.client.get(rota)['ETag'], etag)
+        nao_modificado = self.client.get(rota, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(nao_modificado.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(nao_modificado['ETag'], etag)
+        self.assertEqual(nao_modificado.content, b'')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('Last-Modified', response)
+
+        self.client.put(rota, {'bairro': 'Novo'}, format='json')
+
+        response = self.client.get(rota, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_busca_por_cep_cache_control(self):
+        """Testa que a busca por CEP pode ser guardada por proxies e revalidada pelo ETag."""
+        rota = reverse('endereco_cep', args=['12345-678'])
+        response = self.client.get(rota)
+
+        self.assertIn(f'max-age={settings.CACHE_HTTP["MAX_AGE_CEP"]}', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        response = self.client.get(rota, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_endereco_list_condicional(self):
+        """Testa o ETag da listagem, que muda quando um endereco e excluido."""
+        Endereco.objects.create(**{**self.endereco_data, 'cep': '11111111'})
+        etag = self.client.get(reverse('enderecos'))['ETag']
+
+        response = self.client.get(reverse('enderecos'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.endereco.delete()
+        response = self.client.get(reverse('enderecos'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
     def test_endereco_list(self):
         """Testa listagem de enderecos."""
         response = self.client.get(reverse('enderecos'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_endereco_list_paginada(self):
+        """Testa a paginacao por cursor da listagem de enderecos, com filtros."""
+        for cep in ('11111111', '22222222', '33333333'):
+            Endereco.objects.create(**{**self.endereco_data, 'cep': cep})
+
+        primeira = self.client.get(reverse('enderecos'), {'page_size': 2, 'uf': 'TE'}).json()
+        segunda = self.client.get(primeira['next']).json()
+
+        self.assertEqual(len(primeira['results']), 2)
+        self.assertEqual(len(segunda['results']), 2)
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(
+            [e['cep'] for e in primeira['results'] + segunda['results']],
+            ['12345678', '11111111', '22222222', '33333333'],
+        )
+
+    def test_endereco_list_filtro_nao_permitido(self):
+        """Testa que filtros fora do esquema declarado sao recusados."""
+        response = self.client.get(reverse('enderecos'), {'bairro__icontains': 'Test'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(), {'filtros': ['Filtro "bairro__icontains" não permitido.']},
+        )
+
+    def test_endereco_list_filtro_in_ordenacao_e_campos(self):
+        """Testa filtro com varios valores, ordenacao e projecao de campos."""
+        Endereco.objects.create(**{**self.endereco_data, 'cep': '11111111', 'uf': 'PI'})
+        Endereco.objects.create(**{**self.endereco_data, 'cep': '22222222', 'uf': 'CE'})
+
+        response = self.client.get(
+            reverse('enderecos'),
+            {'uf__in': 'PI,CE', 'ordering': '-cep', 'fields': 'cep,uf'},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['results'],
+            [{'cep': '22222222', 'uf': 'CE'}, {'cep': '11111111', 'uf': 'PI'}],
+        )
+
+    def test_endereco_list_campo_nao_serializado(self):
+        """Testa que a projecao recusa colunas que o serializer nao devolve."""
+        response = self.client.get(reverse('enderecos'), {'fields': 'cep,cep_numerico'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'filtros': ['Campo "cep_numerico" não existe.']})
+
+    def test_busca_enderecos_por_faixa(self):
+        """Testa a busca por faixa e por prefixo de CEP, ordenada pelo cep_numerico."""
+        for cep in ('64099999', '64000000', '64100000', '63999999'):
+            Endereco.objects.create(**{**self.endereco_data, 'cep': cep})
+
+        response = self.client.get(
+            reverse('enderecos_faixa'), {'inicio': '64000-000', 'fim': '64099-999'},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [e['cep'] for e in response.json()['results']], ['64000000', '64099999'],
+        )
+
+        response = self.client.get(reverse('enderecos_faixa'), {'prefixo': '641', 'page_size': 1})
+        self.assertEqual([e['cep'] for e in response.json()['results']], ['64100000'])
+        self.assertNotIn('cep_numerico', response.json()['results'][0])
+
+    def test_busca_enderecos_por_faixa_invalida(self):
+        """Testa que parametros de faixa invalidos retornam 400."""
+        for parametros in ({}, {'inicio': '64000000'}, {'inicio': '64099999', 'fim': '64000000'},
+                           {'prefixo': '64a'}, {'prefixo': '640', 'fim': '64099999'}):
+            response = self.client.get(reverse('enderecos_faixa'), parametros)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, parametros)
+
+    def test_cep_numerico_preenchido(self):
+        """Testa que o cep_numerico acompanha o CEP no save e no bulk_create."""
+        self.assertEqual(self.endereco.cep_numerico, 12345678)
+
+        self.endereco.cep = '00012345'
+        self.endereco.save(update_fields=['cep'])
+        self.endereco.refresh_from_db()
+        self.assertEqual(self.endereco.cep_numerico, 12345)
+
+        Endereco.objects.bulk_create([Endereco(**{**self.endereco_data, 'cep': '64082550'})])
+        self.assertEqual(Endereco.objects.get(cep='64082550').cep_numerico, 64082550)
+
+    def test_exporta_enderecos(self):
+        """Testa a exportacao de enderecos em NDJSON e em array JSON."""
+        Endereco.objects.create(**{**self.endereco_data, 'cep': '11111111'})
+
+        response = self.client.get(reverse('enderecos_exportar'))
+        linhas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual([json.loads(linha)['cep'] for linha in linhas], ['12345678', '11111111'])
+
+        response = self.client.get(reverse('enderecos_exportar'), {'formato': 'json'})
+        enderecos = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([e['cep'] for e in enderecos], ['12345678', '11111111'])
+
     def test_endereco_delete(self):
         """Testa exclusao de todos enderecos."""
         response = self.client.delete(reverse('enderecos'))
@@ -77,3 +292,1086 @@ class CepViewsTestCase(TestCase):
         """Testa funcao de limpeza de chars especiais de uma string de CEP."""
         cep_limpo = limpa_cep('123.456-78')
         self.assertEqual(cep_limpo, '12345678')
+
+    def test_busca_por_cep_usa_cache(self):
+        """Testa que uma segunda busca pelo mesmo CEP nao consulta a base."""
+        self.client.get(reverse('endereco_cep', args=['12345-678']))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('endereco_cep', args=['12345678']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['id'], self.endereco.pk)
+
+    def test_atualiza_endereco_invalida_cache(self):
+        """Testa que o update de endereco remove o CEP do cache."""
+        self.client.get(reverse('endereco_cep', args=['12345678']))
+        self.client.put(
+            reverse('endereco_detail', args=[self.endereco.pk]),
+            {'bairro': 'Updated Bairro'},
+            format='json',
+        )
+
+        response = self.client.get(reverse('endereco_cep', args=['12345678']))
+        self.assertEqual(response.json()['endereco']['bairro'], 'Updated Bairro')
+
+    def test_endereco_delete_invalida_cache(self):
+        """Testa que a exclusao de todos enderecos invalida o cache."""
+        self.client.get(reverse('endereco_cep', args=['12345678']))
+        self.client.delete(reverse('enderecos'))
+
+        self.assertIsNone(cache_de_cep.obtem('12345678'))
+
+    @override_settings(EXCLUSAO={'TAMANHO_DO_LOTE': 2})
+    def test_endereco_delete_filtrado_em_lotes(self):
+        """Testa que o DELETE respeita os filtros do GET e exclui os residentes em lotes."""
+        Endereco.objects.bulk_create(
+            Endereco(cep=f'6400000{indice}', uf='PI', bairro='B', cidade='Teresina')
+            for indice in range(5)
+        )
+        Pessoa.objects.create(
+            nome='Residente', idade=30, email='r@example.com',
+            endereco=Endereco.objects.get(cep='64000000'),
+        )
+        Pessoa.objects.create(
+            nome='Outra', idade=30, email='o@example.com', endereco=self.endereco,
+        )
+
+        # Limite sincrono, 3 lotes (pks, savepoint, ceps, residentes, enderecos, release) e a
+        # leitura vazia que encerra a exclusao.
+        with self.assertNumQueries(1 + 3 * 6 + 1):
+            response = self.client.delete(reverse('enderecos') + '?uf=PI')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Endereco.objects.values_list('cep', flat=True)), ['12345678'])
+        self.assertEqual(list(Pessoa.objects.values_list('email', flat=True)), ['o@example.com'])
+
+    def test_endereco_delete_filtrado_invalida_apenas_os_ceps_excluidos(self):
+        """Testa que o DELETE filtrado invalida no cache apenas os CEPs excluidos."""
+        Endereco.objects.create(cep='01001000', uf='SP', bairro='Se', cidade='Sao Paulo')
+        self.client.get(reverse('endereco_cep', args=['12345678']))
+        self.client.get(reverse('endereco_cep', args=['01001000']))
+        geracao = cache_de_cep.geracao()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('enderecos') + '?uf=SP')
+
+        self.assertEqual(cache_de_cep.geracao(), geracao)
+        self.assertIsNone(cache_de_cep.obtem('01001000'))
+        self.assertTrue(cache_de_cep.foi_alterado('01001000'))
+        self.assertIsNotNone(cache_de_cep.obtem('12345678'))
+
+    def test_endereco_delete_filtro_invalido(self):
+        """Testa que o DELETE com filtro desconhecido nao exclui nada."""
+        response = self.client.delete(reverse('enderecos') + '?bairro=Test')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Endereco.objects.count(), 1)
+
+    def test_cep_inexistente_usa_cache_negativo(self):
+        """Testa que um CEP que o ViaCEP informa nao existir nao e consultado novamente."""
+        primeira = self.client.get(reverse('endereco_cep', args=['99999999']))
+        segunda = self.client.get(reverse('endereco_cep', args=['99999999']))
+
+        self.assertEqual(primeira.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(segunda.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.viacep.requisicoes, 1)
+        self.assertEqual(Endereco.objects.count(), 1)
+
+    def test_cep_mal_formatado_nao_consulta_viacep(self):
+        """Testa que um CEP mal formatado e recusado com 400, sem consulta ao ViaCEP."""
+        response = self.client.get(reverse('endereco_cep', args=['1234']))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['message'], 'Falha na busca pelo cep 1234!')
+        self.assertEqual(self.viacep.requisicoes, 0)
+
+    def test_monta_objeto_endereco_com_erro(self):
+        """Testa que a resposta de erro do ViaCEP lanca CepInvalido."""
+        with self.assertRaises(CepInvalido):
+            monta_objeto_endereco('<xmlcep><erro>true</erro></xmlcep>', '99999999')
+
+    def test_viacep_indisponivel(self):
+        """Testa que a falha de conexao com o ViaCEP retorna 503."""
+        self.viacep.para()
+
+        response = self.client.get(reverse('endereco_cep', args=['64082550']))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_cria_endereco_existente(self):
+        """Testa que criar um endereco com CEP ja existente retorna o endereco da base."""
+        endereco = cria_endereco({**self.endereco_data, 'bairro': 'Outro Bairro'})
+
+        self.assertEqual(endereco.pk, self.endereco.pk)
+        self.assertEqual(Endereco.objects.count(), 1)
+
+    def test_cria_endereco_com_cep_duplicado(self):
+        """Testa que a rota de criacao recusa um CEP ja existente, mesmo que formatado."""
+        response = self.client.post(
+            reverse('enderecos'),
+            {**self.endereco_data, 'cep': '12345-678'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Endereco.objects.count(), 1)
+
+    def test_atualiza_endereco_com_cep_duplicado(self):
+        """Testa que o update recusa um CEP que pertence a outro endereco."""
+        outro = Endereco.objects.create(**{**self.endereco_data, 'cep': '87654321'})
+        response = self.client.put(
+            reverse('endereco_detail', args=[outro.pk]),
+            {'cep': '12345-678'},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_busca_em_lote(self):
+        """Testa a busca de varios CEPs, conhecidos, novos e invalidos, em uma requisicao."""
+        response = self.client.post(
+            reverse('endereco_ceps'),
+            {'ceps': ['12345-678', '64082550', '99999999', '1234', '64082-550']},
+            format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultados = response.json()['resultados']
+        self.assertEqual([r['sucesso'] for r in resultados], [True, True, False, False, True])
+        self.assertEqual(resultados[0]['endereco']['id'], self.endereco.pk)
+        self.assertEqual(resultados[1]['endereco']['cidade'], 'Teresina')
+        self.assertEqual(resultados[2]['status'], status.HTTP_404_NOT_FOUND)
+        self.assertEqual(resultados[3]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Endereco.objects.count(), 2)
+        self.assertEqual(self.viacep.requisicoes, 2)
+
+    def test_busca_em_lote_sem_ceps(self):
+        """Testa que a busca em lote exige a lista de CEPs."""
+        response = self.client.post(reverse('endereco_ceps'), {'cep': '12345678'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_busca_por_cep_async(self):
+        """Testa a criacao de endereco pela rota assincrona."""
+        response = await AsyncClient().get(reverse('endereco_cep_async', args=['64082-550']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['cidade'], 'Teresina')
+
+    async def test_busca_por_cep_async_invalido(self):
+        """Testa que a rota assincrona retorna 404 para um CEP inexistente."""
+        response = await AsyncClient().get(reverse('endereco_cep_async', args=['99999999']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class IndiceDeCepTestCase(TestCase):
+    """Testes para a importacao de CEPs e o indice em memoria."""
+
+    def setUp(self):
+        """Set Up."""
+        self.client = APIClient()
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        self.indice = os.path.join(self.diretorio, 'ceps.idx')
+
+        # O indice exige um cache compartilhado entre os processos.
+        configuracao = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(self.diretorio, 'cache'),
+        }})
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        cache_de_cep.invalida_tudo()
+
+        self.csv = os.path.join(self.diretorio, 'ceps.csv')
+        with open(self.csv, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('cep,uf,bairro,localidade,logradouro,complemento\n')
+            arquivo.write('64000-001,PI,Centro,Teresina,Rua A,\n')
+            arquivo.write('64000-002,PI,Centro,Teresina,Rua B,Casa\n')
+            arquivo.write('64000-001,PI,Centro,Teresina,Rua A,\n')
+            arquivo.write('invalido,PI,Centro,Teresina,Rua C,\n')
+
+    def test_importa_ceps_e_gera_indice(self):
+        """Testa a importacao em lotes e a busca no indice gerado."""
+        call_command('importa_ceps', self.csv, lote=2, indice=self.indice, stdout=StringIO())
+        call_command('importa_ceps', self.csv, stdout=StringIO())
+
+        self.assertEqual(Endereco.objects.count(), 2)
+        indice = IndiceDeCep(self.indice)
+        endereco = Endereco.objects.get(cep='64000002')
+        self.assertEqual(len(indice), 2)
+        self.assertEqual(indice.busca('64000002'), EnderecoSerializer(endereco).data)
+        self.assertIsNone(indice.busca('64000003'))
+
+    def test_busca_por_cep_usa_indice(self):
+        """Testa que a busca por CEP responde pelo indice e o ignora apos uma alteracao."""
+        call_command('importa_ceps', self.csv, indice=self.indice, stdout=StringIO())
+        endereco = Endereco.objects.get(cep='64000001')
+
+        with override_settings(CEP_INDICE={'ARQUIVO': self.indice}):
+            with self.assertNumQueries(0):
+                response = self.client.get(reverse('endereco_cep', args=['64000-001']))
+            self.assertEqual(response.json()['endereco']['id'], endereco.pk)
+
+            self.client.put(
+                reverse('endereco_detail', args=[endereco.pk]), {'bairro': 'Novo'}, format='json',
+            )
+            response = self.client.get(reverse('endereco_cep', args=['64000-001']))
+            self.assertEqual(response.json()['endereco']['bairro'], 'Novo')
+
+    def test_indice_ignorado_apos_limpeza_do_cache(self):
+        """Testa que, perdida a geracao do cache (reinicio ou limpeza), o indice nao e usado."""
+        cache_de_cep.compartilhado.clear()
+        call_command('importa_ceps', self.csv, indice=self.indice, stdout=StringIO())
+        Endereco.objects.filter(cep='64000001').delete()
+        cache_de_cep.compartilhado.clear()
+        cache_de_cep.local.limpa()
+
+        with override_settings(CEP_INDICE={'ARQUIVO': self.indice}):
+            response = self.client.get(reverse('endereco_cep', args=['64000-002']))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsNone(dados_do_indice('64000001'))
+
+    def test_indice_ignorado_apos_validade_das_marcas(self):
+        """Testa que o indice mais antigo que a validade das marcas de alteracao nao e usado."""
+        dados = {'cep': '64000001', 'cidade': 'Teresina'}
+        construido_em = time.time() - cache_de_cep.ttl_alteracao
+        constroi_indice([dados], self.indice, cache_de_cep.geracao(), construido_em + 60)
+
+        with override_settings(CEP_INDICE={'ARQUIVO': self.indice}):
+            self.assertEqual(dados_do_indice('64000001'), dados)
+
+        constroi_indice([dados], self.indice, cache_de_cep.geracao(), construido_em - 60)
+        with override_settings(CEP_INDICE={'ARQUIVO': self.indice}):
+            self.assertIsNone(dados_do_indice('64000001'))
+
+    def test_indice_exige_cache_compartilhado(self):
+        """Testa que o indice e recusado com um cache local a cada processo."""
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem):
+            with self.assertRaises(CommandError):
+                call_command('importa_ceps', indice=self.indice, stdout=StringIO())
+            with override_settings(CEP_INDICE={'ARQUIVO': self.indice}):
+                with self.assertRaises(ImproperlyConfigured):
+                    obtem_indice()
+
+
+class ClienteViaCepTestCase(TestCase):
+    """Testes para o cliente do ViaCEP."""
+
+    def cria_cliente(self, servidor: ServidorViaCepFalso, **configuracao) -> ClienteViaCep:
+        """Cria um cliente apontado para o servidor falso, sem espera entre tentativas."""
+        return ClienteViaCep({
+            **settings.CEP_PROVEDOR,
+            'URL_BASE': servidor.url_base,
+            'ESPERA_BASE': 0,
+            **configuracao,
+        })
+
+    def test_repete_respostas_5xx(self):
+        """Testa que respostas 5xx sao repetidas ate o limite de tentativas."""
+        with ServidorViaCepFalso(taxa_de_erro=1) as servidor:
+            cliente = self.cria_cliente(servidor, TENTATIVAS=3)
+
+            with self.assertRaises(FalhaNaBuscaDeCep):
+                cliente.busca('64082550')
+
+        self.assertEqual(servidor.requisicoes, 3)
+
+    def test_timeout_de_leitura(self):
+        """Testa que um ViaCEP lento e interrompido pelo timeout de leitura."""
+        with ServidorViaCepFalso(latencia=0.5) as servidor:
+            cliente = self.cria_cliente(servidor, TENTATIVAS=1, TIMEOUT_LEITURA=0.05)
+
+            with self.assertRaises(ProvedorIndisponivel):
+                cliente.busca('64082550')
+
+    def test_disjuntor_aberto_nao_consulta_viacep(self):
+        """Testa que, com o disjuntor aberto, o ViaCEP nao e consultado."""
+        with ServidorViaCepFalso(taxa_de_erro=1) as servidor:
+            cliente = self.cria_cliente(servidor, TENTATIVAS=1, LIMITE_DE_FALHAS=2)
+
+            for _ in range(2):
+                with self.assertRaises(FalhaNaBuscaDeCep):
+                    cliente.busca('64082550')
+            with self.assertRaises(ProvedorIndisponivel):
+                cliente.busca('64082550')
+
+        self.assertEqual(servidor.requisicoes, 2)
+
+    def test_disjuntor_meio_aberto(self):
+        """Testa que o disjuntor libera uma chamada de teste apos o tempo aberto."""
+        agora = [0]
+        disjuntor = Disjuntor(limite_de_falhas=1, tempo_aberto=10, relogio=lambda: agora[0])
+        disjuntor.registra_falha()
+        self.assertFalse(disjuntor.permite())
+
+        agora[0] = 10
+        self.assertTrue(disjuntor.permite())
+        self.assertFalse(disjuntor.permite())
+
+        disjuntor.registra_sucesso()
+        self.assertTrue(disjuntor.permite())
+
+    async def test_cancelamento_libera_chamada_de_teste(self):
+        """Testa que a chamada de teste cancelada nao deixa o disjuntor meio-aberto travado."""
+        agora = [0]
+        disjuntor = Disjuntor(limite_de_falhas=1, tempo_aberto=10, relogio=lambda: agora[0])
+        disjuntor.registra_falha()
+        agora[0] = 10
+
+        with ServidorViaCepFalso(latencia=0.5) as servidor:
+            cliente = ClienteViaCepAssincrono(
+                {**settings.CEP_PROVEDOR, 'URL_BASE': servidor.url_base}, disjuntor,
+            )
+            tarefa = asyncio.ensure_future(cliente.busca('64082550'))
+            await asyncio.sleep(0.1)
+            tarefa.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await tarefa
+            await cliente.sessao.aclose()
+
+        self.assertTrue(disjuntor.permite())
+
+    def test_erro_inesperado_conta_como_falha(self):
+        """Testa que um erro fora dos repetidos pelo cliente encerra a chamada de teste."""
+        agora = [0]
+        disjuntor = Disjuntor(limite_de_falhas=1, tempo_aberto=10, relogio=lambda: agora[0])
+        disjuntor.registra_falha()
+        agora[0] = 10
+        cliente = ClienteViaCep({**settings.CEP_PROVEDOR, 'URL_BASE': 'ftp://cep'}, disjuntor)
+
+        with self.assertRaises(requests.exceptions.InvalidSchema):
+            cliente.busca('64082550')
+
+        self.assertFalse(disjuntor.permite())
+        agora[0] = 20
+        self.assertTrue(disjuntor.permite())
+
+
+class CoalescedorTestCase(TestCase):
+    """Testes para a coalescencia de chamadas concorrentes."""
+
+    def test_executa_uma_vez_por_chave(self):
+        """Testa que chamadas concorrentes com a mesma chave compartilham uma execucao."""
+        coalescedor = Coalescedor()
+        liberada = threading.Event()
+        iniciadas = threading.Semaphore(0)
+        chamadas = []
+        resultados = []
+
+        def funcao():
+            chamadas.append(1)
+            liberada.wait(timeout=5)
+            return {'cep': '12345678'}
+
+        def busca():
+            iniciadas.release()
+            resultados.append(coalescedor.executa('cep', funcao))
+
+        threads = [threading.Thread(target=busca) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for _ in threads:
+            iniciadas.acquire()
+        time.sleep(0.1)
+        liberada.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, [{'cep': '12345678'}] * 5)
+
+    async def test_executa_uma_vez_por_chave_async(self):
+        """Testa que corrotinas concorrentes com a mesma chave compartilham uma execucao."""
+        coalescedor = CoalescedorAssincrono()
+        chamadas = []
+
+        async def funcao():
+            chamadas.append(1)
+            await asyncio.sleep(0.05)
+            return {'cep': '12345678'}
+
+        resultados = await asyncio.gather(*(coalescedor.executa('cep', funcao) for _ in range(5)))
+
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, [{'cep': '12345678'}] * 5)
+
+
+    async def test_cancelamento_do_lider_nao_cancela_os_demais(self):
+        """Testa que, com a corrotina lider cancelada, outra assume a chamada."""
+        coalescedor = CoalescedorAssincrono()
+        chamadas = []
+
+        async def funcao():
+            chamadas.append(1)
+            await asyncio.sleep(0.05)
+            return {'cep': '12345678'}
+
+        lider = asyncio.ensure_future(coalescedor.executa('cep', funcao))
+        await asyncio.sleep(0)
+        seguidores = [asyncio.ensure_future(coalescedor.executa('cep', funcao)) for _ in range(3)]
+        await asyncio.sleep(0)
+        lider.cancel()
+
+        resultados = await asyncio.gather(*seguidores)
+
+        self.assertTrue(lider.cancelled())
+        self.assertEqual(resultados, [{'cep': '12345678'}] * 3)
+        self.assertEqual(len(chamadas), 2)
+
+
+class CacheLocalTestCase(TestCase):
+    """Testes para o LRU local do cache de CEP."""
+
+    def setUp(self):
+        """Set Up."""
+        self.agora = 0
+        self.cache = CacheLocal(tamanho_maximo=2, ttl=10, relogio=lambda: self.agora)
+
+    def test_despeja_menos_usado(self):
+        """Testa que o item menos usado e despejado ao atingir o limite."""
+        self.cache.define('a', {'cep': 'a'})
+        self.cache.define('b', {'cep': 'b'})
+        self.cache.obtem('a')
+        self.cache.define('c', {'cep': 'c'})
+
+        self.assertIsNone(self.cache.obtem('b'))
+        self.assertEqual(self.cache.obtem('a'), {'cep': 'a'})
+        self.assertEqual(self.cache.despejos, 1)
+
+    def test_expira_pelo_ttl(self):
+        """Testa que os itens expiram apos o TTL."""
+        self.cache.define('a', {'cep': 'a'})
+        self.agora = 10
+
+        self.assertIsNone(self.cache.obtem('a'))
+        self.assertEqual(self.cache.expiracoes, 1)
+
+
+class FilaDeCepTestCase(TestCase):
+    """Testes para a fila de enriquecimento de CEP."""
+
+    def setUp(self):
+        """Set Up."""
+        self.client = APIClient()
+        self.viacep = usa_servidor_falso(self, enderecos={
+            '64082550': {
+                'logradouro': 'Rua Teste',
+                'complemento': '',
+                'bairro': 'Bairro Teste',
+                'localidade': 'Teresina',
+                'uf': 'PI',
+            },
+        })
+        cache_de_cep.invalida_tudo()
+
+    def cria_pessoa(self, email: str, cep: str) -> dict:
+        response = self.client.post(
+            reverse('pessoas'), {'nome': 'Nome', 'idade': 30, 'email': email, 'cep': cep},
+            format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.json()
+
+    def test_cria_pessoa_sem_aguardar_viacep(self):
+        """Testa que o CEP desconhecido e resolvido pela fila e associado a pessoa."""
+        pessoa = self.cria_pessoa('um@example.com', '64082-550')
+        self.cria_pessoa('dois@example.com', '64082550')
+
+        self.assertEqual((pessoa['endereco'], pessoa['cep_pendente']), (None, '64082550'))
+        self.assertEqual(self.viacep.requisicoes, 0)
+        self.assertEqual(TarefaDeCep.objects.get().situacao, TarefaDeCep.PENDENTE)
+
+        self.assertEqual(processa_tarefas(), 1)
+
+        self.assertEqual(self.viacep.requisicoes, 1)
+        self.assertEqual(TarefaDeCep.objects.get().situacao, TarefaDeCep.CONCLUIDA)
+        endereco = Endereco.objects.get(cep='64082550')
+        self.assertEqual(
+            list(Pessoa.objects.values_list('endereco', 'cep_pendente')),
+            [(endereco.pk, ''), (endereco.pk, '')],
+        )
+
+        pessoa = self.cria_pessoa('tres@example.com', '64082550')
+        self.assertEqual((pessoa['endereco']['id'], pessoa['cep_pendente']), (endereco.pk, ''))
+
+    def test_cep_inexistente_falha_sem_novas_tentativas(self):
+        """Testa que um CEP inexistente encerra a tarefa como falha."""
+        self.cria_pessoa('um@example.com', '99999999')
+
+        processa_tarefas()
+
+        tarefa = TarefaDeCep.objects.get()
+        self.assertEqual((tarefa.situacao, tarefa.tentativas), (TarefaDeCep.FALHOU, 1))
+        self.assertEqual(Pessoa.objects.get().cep_pendente, '99999999')
+        self.assertEqual(processa_tarefas(), 0)
+
+    def test_enfileira_durante_o_processamento(self):
+        """Testa que uma pessoa enfileirada enquanto a tarefa do CEP e processada e associada."""
+        self.cria_pessoa('um@example.com', '64082550')
+        conclui_tarefas = fila.conclui_tarefas
+
+        def enfileira_e_conclui(tarefas):
+            # As pessoas pendentes do lote ja foram associadas pelo trabalhador.
+            Pessoa.objects.create(
+                nome='Dois', idade=30, email='dois@example.com', cep_pendente='64082550',
+            )
+            enfileira_ceps(['64082550'])
+            conclui_tarefas(tarefas)
+
+        with mock.patch('cep.fila.conclui_tarefas', side_effect=enfileira_e_conclui):
+            self.assertEqual(processa_tarefas(), 1)
+
+        self.assertEqual(TarefaDeCep.objects.get().situacao, TarefaDeCep.PENDENTE)
+        self.assertEqual(processa_tarefas(), 1)
+        self.assertEqual(TarefaDeCep.objects.get().situacao, TarefaDeCep.CONCLUIDA)
+        self.assertFalse(Pessoa.objects.filter(endereco__isnull=True).exists())
+        self.assertEqual(self.viacep.requisicoes, 1)
+
+    def test_reserva_tarefas_interrompidas(self):
+        """Testa que tarefas presas em processamento voltam a ser reservadas."""
+        TarefaDeCep.objects.create(cep='64082550', situacao=TarefaDeCep.PROCESSANDO)
+        self.assertEqual(reserva_tarefas(10), [])
+
+        with self.settings(CEP_FILA={**settings.CEP_FILA, 'TEMPO_MAXIMO_PROCESSANDO': -1}):
+            self.assertEqual([tarefa.cep for tarefa in reserva_tarefas(10)], ['64082550'])
+
+    def test_limitador_de_taxa(self):
+        """Testa que o limitador aguarda quando as fichas acabam."""
+        agora, esperas = [0.0], []
+        limitador = LimitadorDeTaxa(10, relogio=lambda: agora[0], dorme=esperas.append)
+
+        limitador.aguarda(10)
+        limitador.aguarda(5)
+        agora[0] = 1.0
+        limitador.aguarda(5)
+
+        self.assertEqual(esperas, [0.5])
+
+    def test_limitador_consome_uma_ficha_por_busca_no_provedor(self):
+        """Testa que o limitador da fila e aplicado a cada busca, e nao ao lote inteiro."""
+        Endereco.objects.create(
+            cep='01001000', logradouro='Praca da Se', complemento='', bairro='Se',
+            cidade='Sao Paulo', uf='SP',
+        )
+        for cep in ('64082550', '01001000', '99999999'):
+            TarefaDeCep.objects.create(cep=cep)
+        esperas = []
+        limitador = LimitadorDeTaxa(1, relogio=lambda: 0.0, dorme=esperas.append)
+
+        self.assertEqual(processa_tarefas(limitador), 3)
+
+        # Duas buscas no provedor: a primeira usa a ficha do balde e a segunda aguarda 1s.
+        self.assertEqual(self.viacep.requisicoes, 2)
+        self.assertEqual(esperas, [1.0])
+
+
+class RevalidacaoTestCase(TestCase):
+    """Testes para a revalidacao periodica dos enderecos."""
+
+    def setUp(self):
+        """Set Up."""
+        dados = {'logradouro': 'Rua', 'complemento': '', 'bairro': 'Novo', 'uf': 'PI'}
+        self.viacep = usa_servidor_falso(self, enderecos={
+            '64082550': {**dados, 'localidade': 'Teresina'},
+            '64000000': {**dados, 'localidade': 'Teresina'},
+        })
+        base = {'logradouro': 'Rua', 'complemento': '', 'uf': 'PI', 'cidade': 'Teresina'}
+        self.antigo = timezone.now() - timedelta(days=30)
+        Endereco.objects.create(
+            **base, cep='64082550', bairro='Antigo', origem='viacep', buscado_em=self.antigo,
+            revalidado_em=self.antigo,
+        )
+        Endereco.objects.create(**base, cep='64000000', bairro='Novo', origem='importacao')
+        Endereco.objects.create(**base, cep='99999999', bairro='B', origem='viacep')
+        Endereco.objects.create(**base, cep='11111111', bairro='Manual', origem='api')
+
+    def test_revalida_apenas_enderecos_alterados(self):
+        """Testa que apenas os enderecos alterados sao regravados."""
+        cache_de_cep.define('64082550', {'cep': '64082550', 'bairro': 'Antigo'})
+        saida = StringIO()
+
+        call_command('revalida_ceps', '--requisicoes-por-segundo', '100', stdout=saida)
+
+        self.assertIn(
+            '1 endereco(s) alterado(s), 1 inalterado(s), 1 inexistente(s)', saida.getvalue(),
+        )
+        self.assertEqual(self.viacep.requisicoes, 3)
+        alterado = Endereco.objects.get(cep='64082550')
+        self.assertEqual(alterado.bairro, 'Novo')
+        self.assertGreater(alterado.buscado_em, self.antigo)
+        self.assertIsNone(cache_de_cep.obtem('64082550'))
+        self.assertIsNotNone(Endereco.objects.get(cep='64000000').revalidado_em)
+        self.assertIsNone(Endereco.objects.get(cep='11111111').revalidado_em)
+
+    def test_confirmacao_mantem_etag_e_cache(self):
+        """Testa que um endereco confirmado pelo provedor mantem o ETag e o cache de CEP."""
+        endereco = Endereco.objects.get(cep='64000000')
+        rota = reverse('endereco_detail', args=[endereco.pk])
+        etag = APIClient().get(rota)['ETag']
+        dados = {campo: getattr(endereco, campo) for campo in CAMPOS_REVALIDADOS}
+        cache_de_cep.define('64000000', {'cep': '64000000', 'bairro': 'Novo'})
+
+        resultado = grava_revalidacoes([endereco], [dados], 60)
+
+        self.assertEqual(resultado['inalterados'], 1)
+        confirmado = Endereco.objects.get(pk=endereco.pk)
+        self.assertIsNotNone(confirmado.revalidado_em)
+        self.assertEqual(confirmado.atualizado_em, endereco.atualizado_em)
+        self.assertEqual(APIClient().get(rota)['ETag'], etag)
+        self.assertIsNotNone(cache_de_cep.obtem('64000000'))
+
+    def test_revalida_os_mais_antigos(self):
+        """Testa que os enderecos nunca revalidados sao escolhidos primeiro."""
+        resultado = revalida_enderecos(quantidade=2, requisicoes_por_segundo=100)
+
+        self.assertEqual(resultado['alterados'], 0)
+        self.assertEqual(self.viacep.requisicoes, 2)
+        self.assertEqual(Endereco.objects.get(cep='64082550').revalidado_em, self.antigo)
+
+    def test_nao_sobrescreve_edicao_concorrente(self):
+        """Testa que um endereco editado durante a revalidacao nao e sobrescrito."""
+        enderecos = list(Endereco.objects.filter(cep='64082550'))
+        editado = Endereco.objects.get(cep='64082550')
+        editado.bairro = 'Editado'
+        editado.save()
+
+        dados = {campo: getattr(editado, campo) for campo in CAMPOS_REVALIDADOS}
+        resultado = grava_revalidacoes(enderecos, [{**dados, 'bairro': 'Novo'}], 60)
+
+        self.assertEqual((resultado['alterados'], resultado['concorrentes']), (0, 1))
+        self.assertEqual(Endereco.objects.get(cep='64082550').bairro, 'Editado')
+
+    def test_falha_adia_revalidacao(self):
+        """Testa que um endereco cuja busca falhou sai da frente da fila."""
+        enderecos = list(Endereco.objects.filter(cep='64000000'))
+        resultado = grava_revalidacoes(enderecos, [FalhaNaBuscaDeCep('64000000', 503)], 60)
+        self.assertEqual(resultado['falhas'], 1)
+
+        revalida_enderecos(quantidade=1, requisicoes_por_segundo=100)
+
+        self.assertIsNone(Endereco.objects.get(cep='64000000').revalidado_em)
+        self.assertIsNotNone(Endereco.objects.get(cep='99999999').revalidado_em)
+
+
+class FormatoDeRespostaTestCase(TestCase):
+    """Testes para os formatos de resposta do ViaCEP."""
+
+    def test_interpreta_json_e_xml(self):
+        """Testa que os dois formatos resultam nos mesmos dados de endereco."""
+        dados = {
+            'cep': '64082-550', 'logradouro': 'Rua', 'complemento': '', 'bairro': 'Centro',
+            'localidade': 'Teresina', 'uf': 'PI',
+        }
+        esperado = {
+            'cep': '64082550', 'logradouro': 'Rua', 'complemento': '', 'bairro': 'Centro',
+            'cidade': 'Teresina', 'uf': 'PI',
+        }
+
+        for formato in ('json', 'xml'):
+            with self.subTest(formato=formato):
+                conteudo = monta_corpo(dados, formato)
+                self.assertEqual(obtem_formato(formato).interpreta('64082550', conteudo), esperado)
+
+    def test_formato_exige_interpreta(self):
+        """Testa que um formato sem ``interpreta`` e recusado ao ser instanciado."""
+        class FormatoIncompleto(FormatoDeResposta):
+            nome = 'incompleto'
+
+        with self.assertRaises(TypeError):
+            FormatoIncompleto()
+
+    def test_interpreta_payload_de_erro(self):
+        """Testa que o payload de erro do ViaCEP lanca CepInvalido nos dois formatos."""
+        for formato, conteudo in (
+            ('json', b'{"erro": true}'),
+            ('json', b'{"erro": "true"}'),
+            ('xml', b'<xmlcep><erro>true</erro></xmlcep>'),
+        ):
+            with self.subTest(conteudo=conteudo), self.assertRaises(CepInvalido):
+                obtem_formato(formato).interpreta('99999999', conteudo)
+
+    def test_interpreta_resposta_incompleta_ou_invalida(self):
+        """Testa campos ausentes e corpos que nao podem ser interpretados."""
+        dados = obtem_formato('xml').interpreta('64082550', b'<xmlcep><uf>PI</uf></xmlcep>')
+        self.assertEqual((dados['cep'], dados['uf'], dados['bairro']), ('64082550', 'PI', ''))
+
+        for formato, conteudo in (('json', b'<html>'), ('json', b'[]'), ('xml', b'{}')):
+            with self.subTest(conteudo=conteudo):
+                with self.assertRaises(FalhaNaBuscaDeCep) as contexto:
+                    obtem_formato(formato).interpreta('64082550', conteudo)
+                self.assertEqual(contexto.exception.status_code, 502)
+
+        with self.assertRaises(ImproperlyConfigured):
+            obtem_formato('csv')
+
+    def test_busca_no_formato_configurado(self):
+        """Testa a busca por CEP consultando o ViaCEP em XML."""
+        viacep = usa_servidor_falso(self, gera_enderecos=True)
+        cache_de_cep.invalida_tudo()
+
+        with self.settings(CEP_PROVEDOR={**settings.CEP_PROVEDOR, 'FORMATO': 'xml'}):
+            response = APIClient().get(reverse('endereco_cep', args=['64000-000']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['cidade'], 'Cidade 640')
+        self.assertEqual(viacep.requisicoes, 1)
+
+
+class GrupoDeProvedoresTestCase(TestCase):
+    """Testes para a consulta hedged e o failover entre provedores de CEP."""
+
+    def setUp(self):
+        """Aponta o ViaCEP e uma BrasilAPI secundaria para servidores falsos."""
+        cache_de_cep.invalida_tudo()
+        self.brasilapi = ServidorViaCepFalso(gera_enderecos=True).inicia()
+        self.addCleanup(self.brasilapi.para)
+
+    def configura_provedores(self, viacep: ServidorViaCepFalso, orcamento: float = 0.05):
+        """Configura o ViaCEP seguido da BrasilAPI, sem novas tentativas."""
+        configuracao = override_settings(
+            CEP_PROVEDOR={**settings.CEP_PROVEDOR, 'URL_BASE': viacep.url_base, 'TENTATIVAS': 1},
+            CEP_PROVEDORES={
+                'ORDEM': ['viacep', 'brasilapi'],
+                'ORCAMENTO_DE_LATENCIA': orcamento,
+                'PROVEDORES': {
+                    'brasilapi': {
+                        'URL_BASE': self.brasilapi.url_base_brasilapi,
+                        'FORMATO': 'brasilapi',
+                        'TENTATIVAS': 1,
+                    },
+                },
+            },
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_provedor_lento_dispara_o_proximo(self):
+        """Testa que o proximo provedor e consultado quando o primeiro estoura o orcamento."""
+        viacep = ServidorViaCepFalso(gera_enderecos=True, latencia=0.5).inicia()
+        self.addCleanup(viacep.para)
+        self.configura_provedores(viacep)
+
+        inicio = time.monotonic()
+        response = APIClient().get(reverse('endereco_cep', args=['64000-000']))
+
+        self.assertLess(time.monotonic() - inicio, 0.5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['cidade'], 'Cidade 640')
+        self.assertEqual(Endereco.objects.get(cep='64000000').origem, 'brasilapi')
+
+    def test_falha_do_provedor_dispara_o_proximo(self):
+        """Testa o failover imediato quando o primeiro provedor falha."""
+        viacep = ServidorViaCepFalso(taxa_de_erro=1).inicia()
+        self.addCleanup(viacep.para)
+        self.configura_provedores(viacep, orcamento=5)
+
+        response = APIClient().get(reverse('endereco_cep', args=['64000-000']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((viacep.requisicoes, self.brasilapi.requisicoes), (1, 1))
+
+    def test_cep_inexistente_nao_consulta_o_proximo(self):
+        """Testa que a resposta de CEP inexistente do primeiro provedor e definitiva."""
+        viacep = ServidorViaCepFalso().inicia()
+        self.addCleanup(viacep.para)
+        self.configura_provedores(viacep, orcamento=5)
+
+        response = APIClient().get(reverse('endereco_cep', args=['99999-999']))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.brasilapi.requisicoes, 0)
+
+    async def test_busca_assincrona_com_provedor_lento(self):
+        """Testa a consulta hedged pela rota assincrona."""
+        viacep = ServidorViaCepFalso(gera_enderecos=True, latencia=0.5).inicia()
+        self.addCleanup(viacep.para)
+        self.configura_provedores(viacep)
+
+        response = await AsyncClient().get(reverse('endereco_cep_async', args=['64000-000']))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['origem'], 'brasilapi')
+
+    def test_estatisticas_de_provedores(self):
+        """Testa que a latencia de cada consulta aparece nas estatisticas dos provedores."""
+        viacep = ServidorViaCepFalso(gera_enderecos=True).inicia()
+        self.addCleanup(viacep.para)
+        self.configura_provedores(viacep, orcamento=5)
+        total_anterior = latencias_de_provedores['viacep'].instantaneo()['total']
+
+        APIClient().get(reverse('endereco_cep', args=['64000-000']))
+        response = APIClient().get(reverse('enderecos_provedores'))
+
+        provedores = response.json()['provedores']
+        self.assertEqual([provedor['nome'] for provedor in provedores], ['viacep', 'brasilapi'])
+        self.assertEqual(provedores[0]['latencia']['total'], total_anterior + 1)
+        self.assertFalse(provedores[0]['disjuntor_aberto'])
+
+    def test_interpreta_brasilapi(self):
+        """Testa a conversao da resposta da BrasilAPI e do seu 404 de CEP inexistente."""
+        formato = obtem_formato('brasilapi')
+        conteudo = monta_corpo(
+            {'cep': '64082-550', 'uf': 'PI', 'localidade': 'Teresina'}, 'brasilapi',
+        )
+
+        dados = formato.interpreta_resposta('64082550', 200, conteudo)
+
+        self.assertEqual(
+            (dados['cep'], dados['uf'], dados['cidade']), ('64082550', 'PI', 'Teresina'),
+        )
+        with self.assertRaises(CepInvalido):
+            formato.interpreta_resposta('99999999', 404, monta_corpo(None, 'brasilapi'))
+
+    def test_ordem_com_provedor_desconhecido(self):
+        """Testa que a ordem nao pode citar um provedor sem configuracao."""
+        with self.settings(CEP_PROVEDORES={'ORDEM': ['viacep', 'correios']}):
+            with self.assertRaises(ImproperlyConfigured):
+                APIClient().get(reverse('enderecos_provedores'))
+
+
+class InstrumentacaoTestCase(TestCase):
+    """Testes para a instrumentacao das requisicoes e a rota /metrics."""
+
+    def setUp(self):
+        """Zera as metricas e o cache e aponta o ViaCEP para um servidor falso."""
+        metricas_de_rotas.clear()
+        cache_de_cep.invalida_tudo()
+        self.viacep = usa_servidor_falso(self, gera_enderecos=True)
+
+    def test_registra_consultas_provedor_e_serializacao(self):
+        """Testa as metricas de uma busca por CEP que consulta o ViaCEP e grava o endereco."""
+        response = APIClient().get(reverse('endereco_cep', args=['64000-000']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        metricas = metricas_de_rotas['endereco_cep', 'GET']
+        self.assertEqual(metricas.duracao.instantaneo()['total'], 1)
+        self.assertGreater(metricas.consultas.instantaneo()['soma'], 0)
+        self.assertGreater(metricas.etapas['provedor'].instantaneo()['soma'], 0)
+        self.assertGreater(metricas.etapas['serializacao'].instantaneo()['soma'], 0)
+        self.assertEqual(metricas.tamanho.instantaneo()['soma'], len(response.content))
+
+        texto = APIClient().get(reverse('metricas')).content.decode()
+        self.assertIn('# TYPE texcep_requisicao_duracao_segundos histogram', texto)
+        self.assertIn(
+            'texcep_requisicao_duracao_segundos_count{rota="endereco_cep",metodo="GET"} 1', texto,
+        )
+        self.assertIn('texcep_provedor_latencia_segundos_count{provedor="viacep"}', texto)
+        self.assertIn('# TYPE texcep_cache_de_cep_faltas_total counter', texto)
+
+    async def test_requisicoes_assincronas_concorrentes(self):
+        """Testa que, servidas pelo ASGI, as buscas assincronas aguardam o provedor em paralelo."""
+        self.viacep.latencia = 0.3
+        aplicacao = ASGIHandler()
+        # Como o AsyncClient, mantem a conexao do TestCase aberta entre as requisicoes.
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+        async def busca(cep: str) -> int:
+            comunicador = ApplicationCommunicator(aplicacao, {
+                'type': 'http', 'method': 'GET', 'query_string': b'',
+                'headers': [(b'host', b'testserver')],
+                'path': reverse('endereco_cep_async', args=[cep]),
+            })
+            await comunicador.send_input({'type': 'http.request', 'body': b''})
+            resposta = await comunicador.receive_output(5)
+            await comunicador.receive_output(5)
+            return resposta['status']
+
+        inicio = time.monotonic()
+        status_das_respostas = await asyncio.gather(
+            *(busca('640000%02d' % indice) for indice in range(10)),
+        )
+
+        self.assertEqual(status_das_respostas, [200] * 10)
+        self.assertLess(time.monotonic() - inicio, 10 * 0.3 / 2)
+        metricas = metricas_de_rotas['endereco_cep_async', 'GET']
+        self.assertEqual(metricas.duracao.instantaneo()['total'], 10)
+
+    @override_settings(INSTRUMENTACAO={'LIMITE_DE_LENTIDAO': 0})
+    def test_registra_requisicao_lenta(self):
+        """Testa o log estruturado das requisicoes acima do limite de lentidao."""
+        with self.assertLogs('TexCepChallenge.instrumentacao', 'WARNING') as logs:
+            APIClient().get(reverse('enderecos'))
+
+        linha = json.loads(logs.records[0].getMessage())
+        self.assertEqual(linha['evento'], 'requisicao_lenta')
+        self.assertEqual((linha['rota'], linha['status']), ('enderecos', 200))
+        self.assertGreaterEqual(linha['consultas'], 1)
+
+
+class ColecaoFalsa:
+    """Colecao do PyMongo em memoria, com o ``find_one`` usado pelo repositorio."""
+
+    def __init__(self, documentos: list, read_preference=None):
+        """Inicializa a colecao com os documentos informados."""
+        self.documentos = documentos
+        self.read_preference = read_preference
+        self.consultas = []
+
+    def with_options(self, read_preference):
+        """Retorna a colecao com a preferencia de leitura informada."""
+        return ColecaoFalsa(self.documentos, read_preference)
+
+    def find_one(self, filtro: dict, projecao: dict):
+        """Retorna o primeiro documento que atende ao filtro, apenas com os campos projetados."""
+        self.consultas.append((filtro, projecao))
+        for documento in self.documentos:
+            if all(documento.get(campo) == valor for campo, valor in filtro.items()):
+                return {campo: valor for campo, valor in documento.items() if projecao.get(campo)}
+        return None
+
+
+class RepositorioDeEnderecoTestCase(TestCase):
+    """Testes para a consulta de enderecos por CEP na base."""
+
+    def setUp(self):
+        """Set Up."""
+        self.endereco = Endereco.objects.create(
+            cep='64000000', uf='PI', bairro='Centro', cidade='Teresina', logradouro='Rua A',
+            buscado_em=timezone.now(), origem=Endereco.ORIGEM_VIACEP,
+        )
+
+    def test_usa_orm_fora_do_mongo(self):
+        """Testa que, sem o djongo, a consulta e feita pelo ORM."""
+        repositorio = obtem_repositorio_de_endereco()
+
+        self.assertIs(type(repositorio), RepositorioDeEndereco)
+        self.assertEqual(repositorio.obtem('64000000'), EnderecoSerializer(self.endereco).data)
+        self.assertIsNone(repositorio.obtem('99999999'))
+
+    def test_repositorio_mongo(self):
+        """Testa que a consulta nativa retorna os mesmos dados do serializer."""
+        documento = {
+            '_id': 'ObjectId', 'cep_numerico': 64000000,
+            **Endereco.objects.filter(pk=self.endereco.pk).values()[0],
+        }
+        colecao = ColecaoFalsa([documento])
+        repositorio = RepositorioMongoDeEndereco(colecao)
+
+        self.assertEqual(repositorio.obtem('64000000'), EnderecoSerializer(self.endereco).data)
+        self.assertIsNone(repositorio.obtem('99999999'))
+        self.assertEqual(colecao.consultas[0][0], {'cep': '64000000'})
+        self.assertNotIn('cep_numerico', colecao.consultas[0][1])
+
+
+ROTAS_DE_REPLICA = {'ALIASES': ['inexistente'], 'ROTAS': ['enderecos', 'endereco_cep']}
+
+
+class RoteadorDeReplicasTestCase(SimpleTestCase):
+    """Testes para o roteamento das leituras, fora de transacoes da base principal."""
+
+    def test_roteia_leituras_para_replica(self):
+        """Testa que as leituras vao a replica ate a primeira escrita da requisicao."""
+        roteador = RoteadorDeReplicas()
+        self.assertEqual(roteador.db_for_read(Endereco), 'default')
+
+        with estado_da_requisicao('replica_0') as estado:
+            self.assertEqual(roteador.db_for_read(Endereco), 'replica_0')
+            self.assertEqual(roteador.db_for_write(Endereco), 'default')
+            self.assertTrue(estado.escreveu)
+            self.assertEqual(roteador.db_for_read(Endereco), 'default')
+
+    def test_exclusao_em_lotes_usa_a_base_de_escrita(self):
+        """Testa que a exclusao em lotes le e exclui na principal e registra a escrita."""
+        with estado_da_requisicao('replica_0') as estado:
+            exclusao = ExclusaoEmLotes(Endereco.objects.all())
+
+            self.assertEqual((exclusao.alias, exclusao.queryset.db), ('default', 'default'))
+            self.assertTrue(estado.escreveu)
+
+    def test_repositorio_mongo_le_dos_secundarios(self):
+        """Testa que a consulta nativa le dos secundarios quando a requisicao le de replica."""
+        repositorio = RepositorioMongoDeEndereco(ColecaoFalsa([]))
+
+        with estado_da_requisicao('replica_0'):
+            self.assertIsNone(repositorio.obtem('64000000'))
+
+        secundaria = repositorio.colecao_secundaria
+        self.assertEqual(secundaria.read_preference.mongos_mode, 'secondaryPreferred')
+        self.assertEqual(len(secundaria.consultas), 1)
+        self.assertEqual(repositorio.colecao.consultas, [])
+
+    @override_settings(REPLICAS_DE_LEITURA=ROTAS_DE_REPLICA)
+    def test_le_da_replica(self):
+        """Testa quais requisicoes podem ler de uma replica."""
+        fabrica = RequestFactory()
+        self.assertTrue(le_da_replica(fabrica.get(reverse('enderecos'))))
+        self.assertFalse(le_da_replica(fabrica.post(reverse('enderecos'))))
+        self.assertFalse(le_da_replica(fabrica.get(reverse('metricas'))))
+
+        fabrica.cookies[COOKIE_DE_ESCRITA] = str(time.time())
+        self.assertFalse(le_da_replica(fabrica.get(reverse('enderecos'))))
+        fabrica.cookies[COOKIE_DE_ESCRITA] = str(time.time() - 60)
+        self.assertTrue(le_da_replica(fabrica.get(reverse('enderecos'))))
+
+
+class ReplicasDeLeituraTestCase(TestCase):
+    """Testes para a escolha da replica e o cookie de leitura na principal."""
+
+    def setUp(self):
+        """Aponta o ViaCEP para um servidor falso."""
+        cache_de_cep.invalida_tudo()
+        usa_servidor_falso(self, gera_enderecos=True)
+
+    def test_le_da_principal_em_transacao(self):
+        """Testa que, dentro de uma transacao (a do TestCase), as leituras vao a principal."""
+        self.assertTrue(transaction.get_connection().in_atomic_block)
+        with estado_da_requisicao('replica_0'):
+            self.assertEqual(RoteadorDeReplicas().db_for_read(Endereco), 'default')
+
+    @override_settings(REPLICAS_DE_LEITURA=ROTAS_DE_REPLICA)
+    def test_replica_indisponivel_le_da_principal(self):
+        """Testa que uma replica sem conexao e evitada e a leitura e feita na principal."""
+        with self.assertLogs('TexCepChallenge.replicas', 'WARNING') as logs:
+            response = APIClient().get(reverse('enderecos'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(APIClient().get(reverse('enderecos')).status_code, 200)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('inexistente', logs.records[0].getMessage())
+
+    @override_settings(REPLICAS_DE_LEITURA=ROTAS_DE_REPLICA)
+    def test_escrita_define_cookie(self):
+        """Testa que uma busca por CEP que grava o endereco define o cookie de escrita."""
+        client = APIClient()
+        response = client.get(reverse('endereco_cep', args=['64000-000']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(COOKIE_DE_ESCRITA, response.cookies)
+
+        response = client.get(reverse('endereco_cep', args=['64000-000']))
+        self.assertNotIn(COOKIE_DE_ESCRITA, response.cookies)
+
+    @override_settings(REPLICAS_DE_LEITURA=ROTAS_DE_REPLICA)
+    def test_exclusao_em_lotes_define_cookie(self):
+        """Testa que o DELETE das listagens exclui na principal e define o cookie de escrita."""
+        endereco = Endereco.objects.create(
+            cep='64000000', uf='PI', bairro='B', cidade='C', logradouro='L', complemento='',
+        )
+        Pessoa.objects.create(nome='N', idade=20, email='n@example.com', endereco=endereco)
+
+        for rota in (reverse('pessoas'), reverse('enderecos')):
+            with self.subTest(rota=rota), CaptureQueriesContext(connection) as consultas:
+                response = APIClient().delete(rota)
+
+                self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+                self.assertIn(COOKIE_DE_ESCRITA, response.cookies)
+                self.assertTrue(any(
+                    consulta['sql'].startswith('DELETE') for consulta in consultas
+                ))
+        self.assertFalse(Endereco.objects.exists())
+
+    @override_settings(REPLICAS_DE_LEITURA={**ROTAS_DE_REPLICA, 'ROTAS': ['endereco_cep_async']})
+    async def test_escrita_define_cookie_async(self):
+        """Testa o estado de replicas e o cookie de escrita na rota assincrona."""
+        with self.assertLogs('TexCepChallenge.replicas', 'WARNING'):
+            response = await AsyncClient().get(
+                reverse('endereco_cep_async', args=['64000-000']),
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(COOKIE_DE_ESCRITA, response.cookies)
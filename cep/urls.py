@@ -8,6 +8,11 @@ from cep import views
 
 urlpatterns = [
     path('', views.endereco_list, name='enderecos'),
+    path('exportar', views.exporta_enderecos, name='enderecos_exportar'),
+    path('faixa', views.busca_enderecos_por_faixa, name='enderecos_faixa'),
+    path('provedores', views.lista_estatisticas_de_provedores, name='enderecos_provedores'),
+    path('busca_ceps', views.busca_enderecos_por_ceps, name='endereco_ceps'),
     path('<pk>', views.endereco_detail, name='endereco_detail'),
-    path('busca_cep/<cep>', views.busca_endereco_por_cep, name='endereco_cep')
+    path('busca_cep/<cep>', views.busca_endereco_por_cep, name='endereco_cep'),
+    path('busca_cep_async/<cep>', views.busca_endereco_por_cep_async, name='endereco_cep_async'),
 ]
@@ -0,0 +1,14 @@
+"""CEP Utils."""
+
+# Importacoes externas.
+import re
+
+
+def limpa_cep(cep: str) -> str:
+    """Remover espacos, pontos e tracos e manter apenas os numeros.
+
+    :param cep: CEP a ser limpo.
+
+    :return: CEP Limpo.
+    """
+    return re.sub(r'[\s.-]', '', cep)
@@ -1,19 +1,46 @@
 """CEP Views."""
 
 # Importacoes externas.
-import re
-from typing import Union
-from xml.etree import ElementTree
-import requests
+from datetime import datetime
+from typing import Optional, Tuple, Union
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponse
 from django.http.response import JsonResponse
 
 # Importacoes internas.
+from TexCepChallenge.condicional import (
+    como_data,
+    etag_de,
+    obtem_configuracao as configuracao_de_cache_http,
+    resposta_condicional,
+)
+from TexCepChallenge.exclusao import ExclusaoEmLotes, resposta_de_exclusao
+from TexCepChallenge.exportacao import resposta_de_exportacao
+from TexCepChallenge.paginacao import resposta_paginada, resposta_paginada_rapida
+from TexCepChallenge.renderizacao import resposta_json, usa_renderizacao_rapida
+from cep.cache import cache_de_cep
+from cep.cliente import estatisticas_de_provedores
+from cep.excecoes import CepMalFormatado, ErroDeCep, FalhaNaBuscaDeCep, ProvedorIndisponivel
+from cep.filtros import filtros_de_endereco
 from cep.models import Endereco
-from cep.serializers import EnderecoSerializer, EnderecoUpdateSerializer
+from cep.serializers import (
+    EnderecoSerializer,
+    EnderecoUpdateSerializer,
+    representacao_de_endereco,
+)
+from cep.servicos import (
+    obtem_dados_de_endereco,
+    obtem_dados_de_endereco_async,
+    obtem_dados_de_enderecos,
+)
+from cep.utils import limpa_cep
+from pessoa.models import Pessoa
 
 
 def get_endereco(pk: str) -> Union[Endereco, JsonResponse]:
@@ -36,72 +63,229 @@ def get_endereco(pk: str) -> Union[Endereco, JsonResponse]:
 
 @api_view(['GET', 'POST', 'DELETE'])
 def endereco_list(request: Request) -> JsonResponse:
-    """Lista enderecos presentes na base atualmente.
+    """Lista enderecos presentes na base atualmente, paginados por cursor.
+
+    Os filtros, ordenacoes e campos aceitos na listagem sao os declarados em
+    ``filtros_de_endereco``. O DELETE exclui, em lotes, os enderecos que atendem aos mesmos
+    filtros do GET, junto com os seus residentes (ver ``exclui_enderecos``).
 
     :param request: Objeto de request.
 
     :return: Informacoes sobre o resultado do processo chamado.
     """
     if request.method == 'GET':
-        enderecos = Endereco.objects.all()
-        filtros = {key: value[0] for key, value in dict(request.GET).items()}
-
-        if filtros:
-            enderecos = enderecos.filter(**filtros)
-
-        enderecos_serializer = EnderecoSerializer(enderecos, many=True)
-        return JsonResponse(enderecos_serializer.data, safe=False)
+        consulta = filtros_de_endereco.aplica(request, Endereco.objects.all())
+        if usa_renderizacao_rapida(request):
+            return resposta_paginada_rapida(
+                request, consulta.queryset, representacao_de_endereco, consulta.ordenacao,
+                consulta.campos,
+            )
+
+        return resposta_paginada(
+            request, consulta.queryset, EnderecoSerializer, consulta.ordenacao, consulta.campos,
+        )
 
     elif request.method == 'POST':
         endereco_data = JSONParser().parse(request)
         endereco_serializer = EnderecoSerializer(data=endereco_data)
         if endereco_serializer.is_valid():
-            endereco_serializer.save()
+            endereco_serializer.save(origem=Endereco.ORIGEM_API)
+            cache_de_cep.invalida(endereco_serializer.instance.cep)
             return JsonResponse(endereco_serializer.data, status=status.HTTP_201_CREATED)
         return JsonResponse(endereco_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        count = Endereco.objects.all().delete()
+        consulta = filtros_de_endereco.aplica(request, Endereco.objects.all())
+        return resposta_de_exclusao(
+            request, exclui_enderecos(consulta.queryset), '{} Endereco(s) deletado(s) com sucesso!',
+        )
+
+
+def exclui_enderecos(enderecos: QuerySet) -> ExclusaoEmLotes:
+    """Monta a exclusao em lotes dos enderecos.
+
+    Os ``residentes_atuais`` de cada lote (o ``CASCADE`` de ``Pessoa.endereco``) sao excluidos
+    com uma unica consulta ``endereco_id__in``, sem carregar as pessoas. Na exclusao filtrada, os
+    CEPs de cada lote sao invalidados no cache de CEP quando o lote e gravado; sem filtros, todo o
+    cache e invalidado ao fim da exclusao.
+
+    :param enderecos: Enderecos a serem excluidos.
+
+    :return: Exclusao, ainda nao iniciada.
+    """
+    # A mesma base de escrita da transacao de cada lote da ExclusaoEmLotes.
+    alias = router.db_for_write(Pessoa)
+
+    def exclui_residentes(pks) -> int:
+        return Pessoa.objects.using(alias).filter(endereco_id__in=pks)._raw_delete(alias)
+
+    def invalida_ceps(pks) -> None:
+        ceps = list(
+            Endereco.objects.using(alias).filter(pk__in=pks).values_list('cep', flat=True)
+        )
+        transaction.on_commit(lambda: cache_de_cep.invalida(*ceps), using=alias)
+
+    if enderecos.query.has_filters():
+        return ExclusaoEmLotes(
+            enderecos,
+            dependentes={Pessoa._meta.label: exclui_residentes},
+            antes_do_lote=invalida_ceps,
+        )
+    return ExclusaoEmLotes(
+        enderecos,
+        dependentes={Pessoa._meta.label: exclui_residentes},
+        ao_concluir=cache_de_cep.invalida_tudo,
+    )
+
+
+@api_view(['GET'])
+def exporta_enderecos(request: Request) -> HttpResponse:
+    """Exporta os enderecos da base em streaming (NDJSON ou array JSON).
+
+    Aceita os mesmos filtros, ordenacoes e campos da listagem.
+
+    :param request: Objeto de request.
+
+    :return: Resposta em streaming com os enderecos serializados.
+    """
+    consulta = filtros_de_endereco.aplica(request, Endereco.objects.all())
+    enderecos = consulta.queryset.order_by(*consulta.ordenacao)
+
+    return resposta_de_exportacao(
+        request, enderecos, EnderecoSerializer, 'enderecos', consulta.campos,
+    )
+
+
+@api_view(['GET'])
+def busca_enderecos_por_faixa(request: Request) -> JsonResponse:
+    """Lista, paginados por cursor, os enderecos de uma faixa ou de um prefixo de CEP.
+
+    Aceita ``?inicio=64000-000&fim=64099-999`` ou ``?prefixo=64000``. A consulta e feita sobre
+    ``cep_numerico``, indexado, em vez de comparar o CEP como texto.
+
+    :param request: Objeto de request.
+
+    :return: Pagina de enderecos ordenados por CEP ou mensagem de erro.
+    """
+    faixa = faixa_de_cep(
+        request.GET.get('inicio'), request.GET.get('fim'), request.GET.get('prefixo'),
+    )
+
+    if faixa is None:
         return JsonResponse(
-            {'message': f'{count[0]} Endereco(s) deletado(s) com sucesso!'},
-            status=status.HTTP_204_NO_CONTENT,
+            {'message': 'Informe "inicio" e "fim" com CEPs de 8 dígitos ou "prefixo" com 1 a 8 '
+                        'dígitos.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    enderecos = Endereco.objects.filter(cep_numerico__range=faixa)
+
+    if usa_renderizacao_rapida(request):
+        return resposta_paginada_rapida(
+            request, enderecos, representacao_de_endereco, ('cep_numerico', 'pk'),
         )
 
+    return resposta_paginada(request, enderecos, EnderecoSerializer, ('cep_numerico', 'pk'))
+
+
+def faixa_de_cep(
+    inicio: Optional[str], fim: Optional[str], prefixo: Optional[str],
+) -> Optional[Tuple[int, int]]:
+    """Converte os parametros da busca por faixa nos limites inteiros de ``cep_numerico``.
+
+    O prefixo ``640`` corresponde a faixa de ``64000000`` a ``64099999``.
+
+    :param inicio: Primeiro CEP da faixa.
+    :param fim: Ultimo CEP da faixa.
+    :param prefixo: Digitos iniciais dos CEPs procurados.
+
+    :return: Limites inclusivos da faixa ou None caso os parametros sejam invalidos.
+    """
+    if prefixo is not None:
+        if inicio is not None or fim is not None:
+            return None
+        prefixo = limpa_cep(prefixo)
+        if not prefixo.isdigit() or len(prefixo) > 8:
+            return None
+        escala = 10 ** (8 - len(prefixo))
+        return int(prefixo) * escala, (int(prefixo) + 1) * escala - 1
+
+    if inicio is None or fim is None:
+        return None
+    inicio, fim = limpa_cep(inicio), limpa_cep(fim)
+    if not all(len(cep) == 8 and cep.isdigit() for cep in (inicio, fim)) or inicio > fim:
+        return None
+    return int(inicio), int(fim)
+
 
 @api_view(['GET', 'PUT', 'DELETE'])
 def endereco_detail(request: Request, pk: str) -> JsonResponse:
     """Procura endereco por pk (id).
 
+    O GET responde ``304`` quando o cliente ja tem a versao atual (``If-None-Match``), sem
+    serializar o endereco.
+
     :param request: Objeto de request.
     :param pk: Primary Key do endereco a ser procurado.
 
     :return: Informacoes sobre o resultado do processo chamado.
     """
+    if request.method == 'GET' and usa_renderizacao_rapida(request):
+        dados_endereco = representacao_de_endereco.obtem(pk=pk)
+        if dados_endereco is not None:
+            return resposta_de_endereco_condicional(
+                request, dados_endereco['id'], como_data(dados_endereco['atualizado_em']),
+                lambda: resposta_json(dados_endereco),
+            )
+
     endereco = get_endereco(pk)
 
     if not isinstance(endereco, Endereco):
         return endereco
 
     if request.method == 'GET':
-        endereco_serializer = EnderecoSerializer(endereco)
-        return JsonResponse(endereco_serializer.data)
+        return resposta_de_endereco_condicional(
+            request, endereco.pk, endereco.atualizado_em,
+            lambda: JsonResponse(EnderecoSerializer(endereco).data),
+        )
 
     elif request.method == 'PUT':
+        cep_anterior = endereco.cep
         endereco_data = JSONParser().parse(request)
         endereco_serializer = EnderecoUpdateSerializer(endereco, data=endereco_data)
         if endereco_serializer.is_valid():
-            endereco_serializer.save()
+            endereco_serializer.save(origem=Endereco.ORIGEM_API)
+            cache_de_cep.invalida(cep_anterior, endereco.cep)
             return JsonResponse(endereco_serializer.data)
         return JsonResponse(endereco_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
         endereco.delete()
+        cache_de_cep.invalida(endereco.cep)
         return JsonResponse(
             {'message': 'Endereco deletado com sucesso!'},
             status=status.HTTP_204_NO_CONTENT,
         )
 
 
+def resposta_de_endereco_condicional(
+    request: Request, pk: int, atualizado_em: Optional[datetime], gera_resposta,
+) -> HttpResponse:
+    """Retorna a resposta de detalhe do endereco ou ``304`` caso o cliente ja tenha essa versao.
+
+    :param request: Objeto de request.
+    :param pk: Pk do endereco.
+    :param atualizado_em: Data da ultima alteracao do endereco.
+    :param gera_resposta: Funcao que serializa o endereco.
+
+    :return: Resposta com ETag, Last-Modified e Cache-Control.
+    """
+    return resposta_condicional(
+        request, etag_de(pk, atualizado_em), atualizado_em, gera_resposta,
+        configuracao_de_cache_http()['MAX_AGE'],
+    )
+
+
 @api_view(['GET'])
 def busca_endereco_por_cep(request: Request, cep: str) -> JsonResponse:
     """Busca endereco por CEP.
@@ -109,7 +293,9 @@ def busca_endereco_por_cep(request: Request, cep: str) -> JsonResponse:
     Caso não seja encontrado nenhum endereco de CEP igual ao em questão, uma busca será realizada
     em <https://viacep.com.br/ws/< CEP>/xml/> para buscar por dados para a criacao de um novo
     endereco com essas informacoes, e caso o CEP em si seja invalido sera retornado um JsonResponse
-    relatando a falha.
+    relatando a falha. A resolucao fica a cargo de ``obtem_dados_de_endereco``, que guarda os dados
+    serializados em cache, mantem um cache negativo de CEPs inexistentes e coalesce buscas
+    concorrentes pelo mesmo CEP.
 
     :param request: Objeto de request.
     :param cep: CEP que se deseja procurar informacoes.
@@ -117,76 +303,143 @@ def busca_endereco_por_cep(request: Request, cep: str) -> JsonResponse:
     :return: Resposta da operacao acerca do CEP enviado.
     """
     cep = limpa_cep(cep)
-    endereco = Endereco.objects.filter(cep=cep).first()
 
-    if endereco:
-        return resposta_de_endereco_unico(endereco)
+    try:
+        dados_endereco = obtem_dados_de_endereco(cep)
+    except ErroDeCep as erro:
+        return resposta_de_erro_de_cep(erro)
+
+    return resposta_de_endereco_unico(request, dados_endereco)
+
+
+async def busca_endereco_por_cep_async(request: HttpRequest, cep: str) -> JsonResponse:
+    """Versao assincrona de ``busca_endereco_por_cep``.
 
-    url = f'https://viacep.com.br/ws/{cep}/xml/'
-    response = requests.get(url)
+    A consulta ao ViaCEP e feita com um cliente HTTP assincrono, de modo que, servida por ASGI,
+    uma unica thread mantem varias buscas em andamento enquanto aguarda o provedor.
+
+    :param request: Objeto de request.
+    :param cep: CEP que se deseja procurar informacoes.
 
-    if response.status_code != 200:
+    :return: Resposta da operacao acerca do CEP enviado.
+    """
+    if request.method != 'GET':
         return JsonResponse(
-            {'message': f'Falha na busca pelo cep {cep}!'},
-            status=response.status_code,
+            {'detail': f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED,
         )
-    xml_content = response.content.decode('utf-8')
-    dados_endereco = monta_objeto_endereco(xml_content)
-    endereco = cria_endereco(dados_endereco)
 
-    return resposta_de_endereco_unico(endereco)
+    cep = limpa_cep(cep)
 
+    try:
+        dados_endereco = await obtem_dados_de_endereco_async(cep)
+    except ErroDeCep as erro:
+        return resposta_de_erro_de_cep(erro)
 
-def resposta_de_endereco_unico(endereco: Endereco) -> JsonResponse:
-    """Retorna o Json Response para casos de Endereco unico.
+    return resposta_de_endereco_unico(request, dados_endereco)
 
-    :param endereco: Endereco a ser utilizado no serializer.
 
-    :return: Endereco montado no serializer.
+@api_view(['POST'])
+def busca_enderecos_por_ceps(request: Request) -> JsonResponse:
+    """Busca os enderecos de varios CEPs em uma unica requisicao.
+
+    Recebe ``{"ceps": [...]}`` e resolve todos os CEPs de uma vez com
+    ``obtem_dados_de_enderecos``. O resultado de cada CEP e informado individualmente, de modo
+    que a falha em um deles nao impede a resposta dos demais.
+
+    :param request: Objeto de request.
+
+    :return: Resultado da busca de cada CEP enviado, na ordem recebida.
     """
-    endereco_serializer = EnderecoSerializer(endereco)
-    resposta = {'sucesso': True, 'endereco': endereco_serializer.data}
+    dados = JSONParser().parse(request)
+    ceps = dados.get('ceps') if isinstance(dados, dict) else None
 
-    return JsonResponse(resposta, status=status.HTTP_200_OK)
+    if not isinstance(ceps, list) or not all(isinstance(cep, str) for cep in ceps):
+        return JsonResponse(
+            {'message': 'Envie a lista de CEPs a serem buscados no campo "ceps".'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
+    maximo_de_ceps = settings.CEP_BUSCA_EM_LOTE['MAXIMO_DE_CEPS']
+    if len(ceps) > maximo_de_ceps:
+        return JsonResponse(
+            {'message': f'Envie no máximo {maximo_de_ceps} CEPs por requisição.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    ceps_limpos = [limpa_cep(cep) for cep in ceps]
+    resolvidos = obtem_dados_de_enderecos(ceps_limpos)
 
-def cria_endereco(dados_de_endereco: dict) -> Endereco:
-    """Cria um novo endereco na base.
+    resultados = []
+    for cep, cep_limpo in zip(ceps, ceps_limpos):
+        resolvido = resolvidos[cep_limpo]
+        if isinstance(resolvido, ErroDeCep):
+            resultados.append({
+                'cep': cep,
+                'sucesso': False,
+                'status': status_de_erro_de_cep(resolvido),
+                'message': resolvido.mensagem,
+            })
+        else:
+            resultados.append({'cep': cep, 'sucesso': True, 'endereco': resolvido})
 
-    :param dados_de_endereco: Dados a serem utilizados na criacao de endereco.
+    return JsonResponse({'resultados': resultados}, status=status.HTTP_200_OK)
 
-    :return: Objeto de endereco criado.
+
+@api_view(['GET'])
+def lista_estatisticas_de_provedores(request: Request) -> JsonResponse:
+    """Lista o estado do disjuntor e o histograma de latencia de cada provedor de CEP.
+
+    :param request: Objeto de request.
+
+    :return: Estatisticas dos provedores, na ordem de preferencia.
     """
-    endereco = Endereco(**dados_de_endereco)
-    endereco.save()
+    return JsonResponse({'provedores': estatisticas_de_provedores()})
 
-    return endereco
 
+def resposta_de_erro_de_cep(erro: ErroDeCep) -> JsonResponse:
+    """Retorna o Json Response para falhas na resolucao de um CEP.
+
+    :param erro: Erro lancado durante a resolucao.
 
-def monta_objeto_endereco(xml_content: str) -> dict:
-    """Prepara um dicionario com as informacoes para criacao de uma instancia de endereco.
+    :return: Resposta com a mensagem e o status correspondentes ao erro.
+    """
+    return JsonResponse({'message': erro.mensagem}, status=status_de_erro_de_cep(erro))
+
+
+def status_de_erro_de_cep(erro: ErroDeCep) -> int:
+    """Retorna o status HTTP correspondente a uma falha na resolucao de um CEP.
 
-    :param xml_content: Conteudo xml de onde extrair as informacoes de endereco.
+    :param erro: Erro lancado durante a resolucao.
 
-    :return: Objeto de endereco montado para criacao.
+    :return: Status HTTP.
     """
-    root = ElementTree.fromstring(xml_content)
+    if isinstance(erro, CepMalFormatado):
+        return status.HTTP_400_BAD_REQUEST
+    if isinstance(erro, FalhaNaBuscaDeCep):
+        return erro.status_code
+    if isinstance(erro, ProvedorIndisponivel):
+        return status.HTTP_503_SERVICE_UNAVAILABLE
+    return status.HTTP_404_NOT_FOUND
 
-    return {
-        'bairro': root.find('bairro').text,
-        'cidade': root.find('localidade').text,
-        'uf': root.find('uf').text,
-        'cep': limpa_cep(root.find('cep').text),
-        'logradouro': root.find('logradouro').text,
-        'complemento': root.find('complemento').text,
-    }
 
+def resposta_de_endereco_unico(request: Request, dados_endereco: dict) -> HttpResponse:
+    """Retorna o Json Response para casos de Endereco unico.
 
-def limpa_cep(cep: str) -> str:
-    """Remover espacos, pontos e tracos e manter apenas os numeros.
+    A resposta pode ser guardada por proxies por ``CACHE_HTTP['MAX_AGE_CEP']`` segundos e e
+    revalidada pelo ETag da versao do endereco, respondendo ``304`` sem codificar os dados.
 
-    :param cep: CEP a ser limpo.
+    :param request: Objeto de request.
+    :param dados_endereco: Dados serializados do endereco.
 
-    :return: CEP Limpo.
+    :return: Resposta com os dados do endereco.
     """
-    return re.sub(r'[\s.-]', '', cep)
+    resposta = {'sucesso': True, 'endereco': dados_endereco}
+    codifica = resposta_json if usa_renderizacao_rapida(request) else JsonResponse
+    atualizado_em = dados_endereco.get('atualizado_em')
+
+    return resposta_condicional(
+        request, etag_de(dados_endereco['id'], atualizado_em), como_data(atualizado_em),
+        lambda: codifica(resposta, status=status.HTTP_200_OK),
+        configuracao_de_cache_http()['MAX_AGE_CEP'],
+    )
@@ -0,0 +1,20 @@
+"""Filtros para Pessoa."""
+
+# Importacoes internas.
+from TexCepChallenge.exclusao import PARAMETRO_ASSINCRONO
+from TexCepChallenge.filtros import EsquemaDeFiltros
+from TexCepChallenge.paginacao import PARAMETROS_DE_PAGINACAO
+from pessoa.models import Pessoa
+from pessoa.serializers import PessoaSerializer
+
+filtros_de_pessoa = EsquemaDeFiltros(
+    Pessoa,
+    PessoaSerializer,
+    filtros={
+        'id': ('exact', 'in'),
+        'email': ('exact', 'in'),
+        'endereco': ('exact', 'in', 'isnull'),
+    },
+    ordenaveis=('id', 'email'),
+    ignorados=(*PARAMETROS_DE_PAGINACAO, 'formato', PARAMETRO_ASSINCRONO),
+)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pessoa', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pessoa',
+            name='cep_pendente',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=8),
+        ),
+    ]
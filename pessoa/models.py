@@ -5,7 +5,12 @@ from django.db import models
 
 
 class Pessoa(models.Model):
-    """Modelo para pessoa."""
+    """Modelo para pessoa.
+
+    ``atualizado_em`` muda a cada gravacao e, junto com o do endereco, gera o ETag e o
+    Last-Modified das rotas de consulta; gravacoes que nao passam por ``save`` (``update`` e
+    ``bulk_update``) devem atualiza-lo explicitamente.
+    """
 
     nome = models.CharField(max_length=70)
     idade = models.IntegerField()
@@ -16,6 +21,16 @@ class Pessoa(models.Model):
         null=True,
         related_name='residentes_atuais',
     )
+    cep_pendente = models.CharField(max_length=8, blank=True, default='', db_index=True)
+    atualizado_em = models.DateTimeField(auto_now=True, db_index=True)
+
+    def save(self, *args, **kwargs):
+        """[Overrides Model.save]"""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'atualizado_em'}
+
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nome
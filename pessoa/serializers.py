@@ -4,46 +4,146 @@
 from rest_framework import serializers
 
 # Importações internas
+from TexCepChallenge.renderizacao import RepresentacaoRapida
+from TexCepChallenge.serializers import CamposDinamicosMixin
 from cep.models import Endereco
+from cep.excecoes import CepInvalido
 from cep.serializers import EnderecoSerializer
+from cep.fila import enfileira_ceps
+from cep.servicos import obtem_dados_conhecidos, obtem_dados_de_endereco, verifica_cep
+from cep.utils import limpa_cep
 from pessoa.models import Pessoa
 
 
-class PessoaSerializer(serializers.ModelSerializer):
-    """Serializer para criação de Pessoa."""
+class PessoaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Serializer para criação de Pessoa.
+
+    Na criacao, o endereco pode ser informado pelo CEP, em ``cep``. Um CEP ja conhecido e
+    associado imediatamente; os demais ficam em ``cep_pendente`` e sao resolvidos em segundo
+    plano pela fila de enriquecimento de CEP (``cep.fila``), sem bloquear a requisicao.
+    """
 
     endereco = EnderecoSerializer(required=False)
+    cep = serializers.CharField(required=False, write_only=True)
 
     class Meta:
         """Meta classe para serializer de Pessoa."""
 
         model = Pessoa
         fields = '__all__'
+        read_only_fields = ('cep_pendente',)
+
+    def validate_cep(self, cep):
+        """Recusa CEPs mal formatados ou sabidamente inexistentes."""
+        cep = limpa_cep(cep)
+        try:
+            verifica_cep(cep)
+        except CepInvalido as erro:
+            raise serializers.ValidationError(erro.mensagem)
+
+        return cep
+
+    def create(self, validated_data):
+        """[Overrides ModelSerializer.create]"""
+        cep = validated_data.pop('cep', None)
+        if cep is not None:
+            dados_endereco = obtem_dados_conhecidos(cep)
+            if dados_endereco is None:
+                validated_data['cep_pendente'] = cep
+            else:
+                validated_data['endereco_id'] = dados_endereco['id']
+
+        pessoa = super().create(validated_data)
+        if pessoa.cep_pendente:
+            enfileira_ceps([pessoa.cep_pendente])
+
+        return pessoa
+
+
+representacao_de_pessoa = RepresentacaoRapida(PessoaSerializer)
+
+
+class PessoaLoteSerializer(serializers.ModelSerializer):
+    """Serializer para validacao de cada Pessoa enviada na importacao em lote.
+
+    O endereco e recebido pelo id e a unicidade do email e verificada pela importacao, com uma
+    unica consulta por lote, em vez de uma consulta por pessoa.
+    """
+
+    email = serializers.EmailField(max_length=90)
+    endereco = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        """Meta classe para serializer de Pessoa."""
+
+        model = Pessoa
+        fields = ('nome', 'idade', 'email', 'endereco')
 
 
 class PessoaUpdateSerializer(serializers.ModelSerializer):
-    """Serializer para atualizacao de Pessoa."""
+    """Serializer para atualizacao de Pessoa.
+
+    O endereco pode ser informado pelo id, em ``endereco``, ou pelo CEP, em ``cep``; neste caso
+    ele e resolvido por ``obtem_dados_de_endereco``, o mesmo caminho com cache da busca por CEP,
+    e buscado no ViaCEP caso ainda nao exista na base.
+    """
 
     nome = serializers.CharField(required=False)
     idade = serializers.IntegerField(required=False)
     email = serializers.EmailField(required=False)
-    endereco = serializers.CharField(required=False)
+    endereco = serializers.IntegerField(required=False, allow_null=True, write_only=True)
+    cep = serializers.CharField(required=False, write_only=True)
 
     class Meta:
         """Meta classe para serializer de Pessoa."""
 
         model = Pessoa
-        fields = '__all__'
+        fields = ('nome', 'idade', 'email', 'endereco', 'cep')
+
+    def validate_endereco(self, endereco_id):
+        """Verifica se o endereco informado pelo id existe."""
+        if endereco_id is not None and not Endereco.objects.filter(pk=endereco_id).exists():
+            raise serializers.ValidationError(f'Endereco com id {endereco_id} nao encontrado.')
+
+        return endereco_id
+
+    def validate(self, attrs):
+        """[Overrides ModelSerializer.validate]
+
+        Troca ``endereco`` ou ``cep`` pelo ``endereco_id`` a ser gravado, descartando o CEP que
+        aguardava a fila de enriquecimento.
+
+        :raises ErroDeCep: Caso o ViaCEP falhe ou esteja indisponivel ao resolver o CEP.
+        """
+        if 'endereco' in attrs and 'cep' in attrs:
+            raise serializers.ValidationError('Informe o endereco pelo id ou pelo CEP, nao ambos.')
+
+        if 'endereco' in attrs:
+            attrs['endereco_id'] = attrs.pop('endereco')
+            attrs['cep_pendente'] = ''
+        elif 'cep' in attrs:
+            try:
+                dados_endereco = obtem_dados_de_endereco(limpa_cep(attrs.pop('cep')))
+            except CepInvalido as erro:
+                raise serializers.ValidationError({'cep': [erro.mensagem]})
+            attrs['endereco_id'] = dados_endereco['id']
+            attrs['cep_pendente'] = ''
+
+        return attrs
 
     def update(self, instance, validated_data):
-        """[Overrides ModelSerializer.update]"""
-        if 'endereco' in validated_data:
-            endereco = Endereco.objects.get(pk=validated_data['endereco'])
-            if not endereco:
-                raise serializers.ValidationError(
-                    f'Endereco com id {validated_data["endereco"]} nao encontrado.'
-                )
+        """[Overrides ModelSerializer.update]
+
+        Grava apenas os campos alterados, com ``save(update_fields=...)``.
+        """
+        alterados = [
+            campo for campo, valor in validated_data.items()
+            if getattr(instance, campo) != valor
+        ]
+        for campo in alterados:
+            setattr(instance, campo, validated_data[campo])
 
-            validated_data['endereco'] = endereco
+        if alterados:
+            instance.save(update_fields=alterados)
 
-        return super().update(instance, validated_data)
+        return instance
@@ -0,0 +1,164 @@
+"""Pessoa Servicos."""
+
+# Importacoes externas.
+import json
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+# Importacoes internas.
+from cep.models import Endereco
+from pessoa.models import Pessoa
+from pessoa.serializers import PessoaLoteSerializer
+
+CAMPOS_ATUALIZADOS_NO_UPSERT = ['nome', 'idade', 'endereco', 'atualizado_em']
+
+
+def le_ndjson(linhas: Iterable[bytes]) -> Iterator[Any]:
+    """Le um objeto JSON por linha, ignorando linhas em branco.
+
+    :param linhas: Linhas do corpo da requisicao.
+
+    :return: Objetos lidos ou o ValueError das linhas que nao sao JSON validos.
+    """
+    for linha in linhas:
+        if not linha.strip():
+            continue
+        try:
+            yield json.loads(linha)
+        except ValueError as erro:
+            yield erro
+
+
+def importa_pessoas(linhas: Iterable[Any], upsert: bool = False) -> dict:
+    """Valida e grava as pessoas recebidas em lotes de ``PESSOA_IMPORTACAO['TAMANHO_DO_LOTE']``.
+
+    Em cada lote, a existencia dos enderecos referenciados e verificada com uma unica consulta e
+    as pessoas ja existentes com outra, pelo email. As novas sao gravadas com ``bulk_create`` e,
+    com ``upsert``, as existentes sao atualizadas com ``bulk_update`` (ver ``_atualiza``); sem
+    ``upsert``, emails ja existentes sao informados como erro. Uma linha invalida nao impede a
+    gravacao das demais. Um email repetido no mesmo lote e recusado ou, com ``upsert``, a ultima
+    linha prevalece e a anterior e informada nos erros.
+
+    :param linhas: Dados de cada pessoa, na ordem recebida.
+    :param upsert: Se as pessoas ja existentes devem ser atualizadas.
+
+    :return: Quantidade de pessoas criadas e atualizadas e os erros de cada linha recusada.
+    """
+    tamanho_do_lote = settings.PESSOA_IMPORTACAO['TAMANHO_DO_LOTE']
+    resultado = {'criadas': 0, 'atualizadas': 0, 'erros': []}
+    validador = PessoaLoteSerializer()
+
+    linhas = enumerate(linhas)
+    while True:
+        lote = list(islice(linhas, tamanho_do_lote))
+        if not lote:
+            return resultado
+        _importa_lote(lote, upsert, validador, resultado)
+
+
+def _importa_lote(
+    lote: List[Tuple[int, Any]], upsert: bool, validador: PessoaLoteSerializer, resultado: dict,
+) -> None:
+    erros = resultado['erros']
+    validas = {}
+
+    for indice, linha in lote:
+        if isinstance(linha, ValueError):
+            erros.append({'indice': indice, 'erros': {'non_field_errors': ['JSON inválido.']}})
+            continue
+        try:
+            dados = validador.run_validation(linha)
+        except ValidationError as erro:
+            erros.append({'indice': indice, 'erros': erro.detail})
+            continue
+        if dados['email'] in validas:
+            if not upsert:
+                erros.append({'indice': indice, 'erros': {'email': ['Email repetido no lote.']}})
+                continue
+            # No upsert a ultima linha prevalece; a substituida e informada como erro.
+            indice_substituido, _ = validas.pop(dados['email'])
+            erros.append({
+                'indice': indice_substituido,
+                'erros': {'email': [f'Email repetido no lote; substituido pela linha {indice}.']},
+            })
+        validas[dados['email']] = (indice, dados)
+
+    ids_de_endereco = {
+        dados['endereco'] for _, dados in validas.values() if dados.get('endereco') is not None
+    }
+    enderecos = set(
+        Endereco.objects.filter(pk__in=ids_de_endereco).values_list('pk', flat=True)
+    ) if ids_de_endereco else set()
+    existentes = Pessoa.objects.in_bulk(list(validas), field_name='email') if validas else {}
+
+    novas, atualizadas = [], []
+    for email, (indice, dados) in validas.items():
+        informou_endereco = 'endereco' in dados
+        endereco_id = dados.pop('endereco', None)
+        if endereco_id is not None and endereco_id not in enderecos:
+            erros.append({
+                'indice': indice,
+                'erros': {'endereco': [f'Endereco com id {endereco_id} nao encontrado.']},
+            })
+            continue
+
+        pessoa = existentes.get(email)
+        if pessoa is None:
+            novas.append((indice, Pessoa(**dados, endereco_id=endereco_id)))
+        elif upsert:
+            pessoa.nome, pessoa.idade = dados['nome'], dados['idade']
+            pessoa.atualizado_em = timezone.now()
+            if informou_endereco:
+                pessoa.endereco_id = endereco_id
+            atualizadas.append((indice, pessoa))
+        else:
+            erros.append({
+                'indice': indice,
+                'erros': {'email': ['pessoa with this email already exists.']},
+            })
+
+    try:
+        with transaction.atomic():
+            Pessoa.objects.bulk_create([pessoa for _, pessoa in novas])
+            _atualiza([pessoa for _, pessoa in atualizadas])
+    except IntegrityError:
+        _grava_uma_a_uma(novas, atualizadas, resultado)
+    else:
+        resultado['criadas'] += len(novas)
+        resultado['atualizadas'] += len(atualizadas)
+
+
+def _atualiza(pessoas: List[Pessoa]) -> None:
+    """Grava os ``CAMPOS_ATUALIZADOS_NO_UPSERT`` das pessoas informadas.
+
+    O djongo nao traduz o ``CASE WHEN`` gerado pelo ``bulk_update``; nele, cada pessoa e gravada
+    com o seu proprio ``update``.
+    """
+    if connections[router.db_for_write(Pessoa)].vendor != 'djongo':
+        Pessoa.objects.bulk_update(pessoas, CAMPOS_ATUALIZADOS_NO_UPSERT)
+        return
+    for pessoa in pessoas:
+        pessoa.save(update_fields=CAMPOS_ATUALIZADOS_NO_UPSERT)
+
+
+def _grava_uma_a_uma(
+    novas: List[Tuple[int, Pessoa]], atualizadas: List[Tuple[int, Pessoa]], resultado: dict,
+) -> None:
+    """Grava as pessoas do lote individualmente apos um conflito de email concorrente."""
+    for contador, pessoas in (('criadas', novas), ('atualizadas', atualizadas)):
+        for indice, pessoa in pessoas:
+            try:
+                with transaction.atomic():
+                    pessoa.save()
+            except IntegrityError:
+                resultado['erros'].append({
+                    'indice': indice,
+                    'erros': {'email': ['pessoa with this email already exists.']},
+                })
+            else:
+                resultado[contador] += 1
@@ -1,13 +1,25 @@
 """Pessoa Tests."""
 
 # Importações externas
-from django.test import TestCase
-from django.urls import reverse
+import json
+from unittest import mock
+
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 
 # Importações internas
+from TexCepChallenge.exclusao import ExclusaoEmLotes, obtem_exclusao
+from TexCepChallenge.paginacao import PaginacaoPorCursor
+from TexCepChallenge.renderizacao import usa_renderizacao_rapida
+from cep.cache import cache_de_cep
+from cep.models import Endereco
 from pessoa.models import Pessoa
+from pessoa.serializers import PessoaSerializer
 
 
 class PessoaViewsTestCase(TestCase):
@@ -33,7 +45,109 @@ class PessoaViewsTestCase(TestCase):
         """Testa listagem de pessoas."""
         response = self.client.get(reverse('pessoas'))
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertTrue(len(response.json()) > 0)
+        self.assertTrue(len(response.json()['results']) > 0)
+
+    def test_list_pessoas_paginada(self):
+        """Testa a paginacao por cursor da listagem de pessoas."""
+        Pessoa.objects.create(nome='Outra', idade=30, email='outra@example.com')
+
+        primeira = self.client.get(reverse('pessoas'), {'page_size': 1}).json()
+        segunda = self.client.get(primeira['next']).json()
+
+        self.assertEqual(primeira['results'][0]['email'], self.pessoa_data['email'])
+        self.assertEqual(segunda['results'][0]['email'], 'outra@example.com')
+        self.assertIsNone(segunda['next'])
+
+    def test_list_pessoas_tamanho_de_pagina_dos_settings(self):
+        """Testa que os tamanhos de pagina sao lidos dos settings a cada requisicao."""
+        Pessoa.objects.create(nome='Outra', idade=30, email='outra@example.com')
+        Pessoa.objects.create(nome='Mais uma', idade=30, email='mais@example.com')
+
+        with self.settings(PAGINACAO={'TAMANHO_PADRAO': 1, 'TAMANHO_MAXIMO': 2}):
+            padrao = self.client.get(reverse('pessoas')).json()
+            maximo = self.client.get(reverse('pessoas'), {'page_size': 10}).json()
+
+        self.assertEqual((len(padrao['results']), len(maximo['results'])), (1, 2))
+
+    def test_paginacao_desempata_pelo_pk(self):
+        """Testa que a paginacao acrescenta o pk a ordenacao por campos nao unicos."""
+        paginacao = PaginacaoPorCursor()
+        pessoas = Pessoa.objects.all()
+
+        paginacao.ordering = ('-idade',)
+        self.assertEqual(paginacao.get_ordering(None, pessoas, None), ('-idade', '-pk'))
+        paginacao.ordering = ('idade', 'id')
+        self.assertEqual(paginacao.get_ordering(None, pessoas, None), ('idade', 'id'))
+
+    def test_list_pessoas_com_endereco_sem_n_mais_um(self):
+        """Testa que a listagem faz o mesmo numero de consultas independente da quantidade."""
+        for indice in range(10):
+            endereco = Endereco.objects.create(
+                cep=f'{indice:08d}', uf='TE', bairro='B', cidade='C', logradouro='L',
+                complemento='',
+            )
+            Pessoa.objects.create(
+                nome='N', idade=20, email=f'p{indice}@example.com', endereco=endereco,
+            )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('pessoas'))
+
+        self.assertEqual(len(response.json()['results']), 11)
+        self.assertEqual(response.json()['results'][-1]['endereco']['cep'], '00000009')
+
+    def test_list_pessoas_filtro_entre_relacoes_nao_permitido(self):
+        """Testa que filtros por campos de endereco nao sao aceitos na listagem de pessoas."""
+        response = self.client.get(reverse('pessoas'), {'endereco__cidade__regex': '^T'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_pessoas_campos_sem_endereco(self):
+        """Testa que a projecao sem endereco nao consulta enderecos."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('pessoas'), {'fields': 'nome,email'})
+
+        self.assertEqual(
+            response.json()['results'], [{'nome': 'Test Nome', 'email': 'test@example.com'}],
+        )
+
+    def test_get_pessoa_com_endereco(self):
+        """Testa que o retrieve de pessoa traz o endereco na mesma consulta."""
+        endereco = Endereco.objects.create(
+            cep='12345678', uf='TE', bairro='B', cidade='C', logradouro='L', complemento='',
+        )
+        Pessoa.objects.filter(pk=self.pessoa.pk).update(endereco=endereco)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('pessoa_detail', args=[self.pessoa.pk]))
+
+        self.assertEqual(response.json()['endereco']['cep'], '12345678')
+
+    def test_get_pessoa_condicional(self):
+        """Testa que o ETag da pessoa muda quando o seu endereco e alterado."""
+        endereco = Endereco.objects.create(
+            cep='12345678', uf='TE', bairro='B', cidade='C', logradouro='L', complemento='',
+        )
+        Pessoa.objects.filter(pk=self.pessoa.pk).update(endereco=endereco)
+        rota = reverse('pessoa_detail', args=[self.pessoa.pk])
+        etag = self.client.get(rota)['ETag']
+
+        response = self.client.get(rota, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.put(
+            reverse('endereco_detail', args=[endereco.pk]), {'bairro': 'Novo'}, format='json',
+        )
+        response = self.client.get(rota, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['bairro'], 'Novo')
+
+    def test_exporta_pessoas(self):
+        """Testa a exportacao de pessoas em NDJSON."""
+        response = self.client.get(reverse('pessoas_exportar'))
+        linhas = b''.join(response.streaming_content).decode().splitlines()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([json.loads(linha)['email'] for linha in linhas], ['test@example.com'])
 
     def test_create_pessoa_with_existing_email(self):
         """Testa o tentativa de criacao de pessoa com email ja cadastrado."""
@@ -63,6 +177,73 @@ class PessoaViewsTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.json()['nome'], new_data['nome'])
 
+    def test_importa_pessoas_em_lote(self):
+        """Testa a criacao em lote, com erros por linha e enderecos resolvidos em uma consulta."""
+        endereco = Endereco.objects.create(
+            cep='64082550', uf='PI', bairro='B', cidade='C', logradouro='L', complemento='',
+        )
+        pessoas = [
+            {'nome': 'Um', 'idade': 20, 'email': 'um@example.com', 'endereco': endereco.pk},
+            {'nome': 'Dois', 'idade': 'x', 'email': 'dois@example.com'},
+            {'nome': 'Tres', 'idade': 30, 'email': 'tres@example.com', 'endereco': 999},
+            {'nome': 'Quatro', 'idade': 40, 'email': self.pessoa_data['email']},
+            {'nome': 'Cinco', 'idade': 50, 'email': 'cinco@example.com'},
+        ]
+
+        # Enderecos, pessoas existentes e um bulk_create, alem do savepoint da transacao.
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('pessoas_lote'), pessoas, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        resultado = response.json()
+        self.assertEqual((resultado['criadas'], resultado['atualizadas']), (2, 0))
+        self.assertEqual([erro['indice'] for erro in resultado['erros']], [1, 2, 3])
+        self.assertEqual(Pessoa.objects.get(email='um@example.com').endereco, endereco)
+
+    def test_upsert_pessoas_em_lote_ndjson(self):
+        """Testa o upsert por email de pessoas recebidas em NDJSON, em mais de um lote."""
+        linhas = [
+            json.dumps({'nome': 'Atualizado', 'idade': 26, 'email': self.pessoa_data['email']}),
+            '{invalido',
+            '',
+            json.dumps({'nome': 'Novo', 'idade': 30, 'email': 'novo@example.com'}),
+        ]
+
+        with self.settings(PESSOA_IMPORTACAO={'TAMANHO_DO_LOTE': 2}):
+            response = self.client.post(
+                f'{reverse("pessoas_lote")}?upsert=true',
+                '\n'.join(linhas),
+                content_type='application/x-ndjson',
+            )
+
+        resultado = response.json()
+        self.assertEqual((resultado['criadas'], resultado['atualizadas']), (1, 1))
+        self.assertEqual(resultado['erros'][0]['indice'], 1)
+        self.pessoa.refresh_from_db()
+        self.assertEqual((self.pessoa.nome, self.pessoa.idade), ('Atualizado', 26))
+
+    def test_upsert_informa_linha_substituida_por_email_repetido(self):
+        """Testa que, no upsert, a linha substituida por um email repetido no lote e informada."""
+        linhas = [
+            json.dumps({'nome': 'Primeira', 'idade': 26, 'email': self.pessoa_data['email']}),
+            json.dumps({'nome': 'Segunda', 'idade': 27, 'email': self.pessoa_data['email']}),
+        ]
+
+        # O djongo nao suporta o bulk_update; as pessoas sao gravadas uma a uma.
+        with mock.patch.object(connections['default'], 'vendor', 'djongo'):
+            response = self.client.post(
+                f'{reverse("pessoas_lote")}?upsert=true',
+                '\n'.join(linhas),
+                content_type='application/x-ndjson',
+            )
+
+        resultado = response.json()
+        self.assertEqual((resultado['criadas'], resultado['atualizadas']), (0, 1))
+        self.assertEqual([erro['indice'] for erro in resultado['erros']], [0])
+        self.assertIn('linha 1', resultado['erros'][0]['erros']['email'][0])
+        self.pessoa.refresh_from_db()
+        self.assertEqual((self.pessoa.nome, self.pessoa.idade), ('Segunda', 27))
+
     def test_update_pessoa(self):
         """Testa o atualizacao de dados de uma pessoa."""
         updated_data = {
@@ -77,7 +258,175 @@ class PessoaViewsTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()['nome'], updated_data['nome'])
 
+    def test_patch_pessoa_grava_apenas_campos_alterados(self):
+        """Testa que o PATCH grava apenas os campos alterados."""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.patch(
+                reverse('pessoa_detail', args=[self.pessoa.pk]),
+                {'nome': self.pessoa_data['nome'], 'idade': 26},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['idade'], 26)
+        updates = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"idade"', updates[0])
+        self.assertNotIn('"nome"', updates[0])
+
+    def test_update_pessoa_com_endereco_por_cep(self):
+        """Testa a atualizacao do endereco de uma pessoa pelo CEP."""
+        endereco = Endereco.objects.create(
+            cep='64082550', uf='PI', bairro='B', cidade='C', logradouro='L', complemento='',
+        )
+        cache_de_cep.invalida_tudo()
+
+        response = self.client.patch(
+            reverse('pessoa_detail', args=[self.pessoa.pk]), {'cep': '64082-550'}, format='json',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['endereco']['cep'], '64082550')
+        self.pessoa.refresh_from_db()
+        self.assertEqual(self.pessoa.endereco, endereco)
+
+    def test_update_pessoa_com_endereco_inexistente(self):
+        """Testa que endereco inexistente ou CEP invalido retornam 400."""
+        url = reverse('pessoa_detail', args=[self.pessoa.pk])
+
+        response = self.client.put(url, {'endereco': 999}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(), {'endereco': ['Endereco com id 999 nao encontrado.']},
+        )
+
+        response = self.client.patch(url, {'cep': '123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cep', response.json())
+
     def test_delete_pessoa(self):
         """Testa o exclusao de uma pessoa."""
         response = self.client.delete(reverse('pessoa_detail', args=[self.pessoa.pk]))
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_delete_pessoas_filtradas(self):
+        """Testa que o DELETE da listagem exclui apenas as pessoas que atendem aos filtros."""
+        Pessoa.objects.create(nome='Outra', idade=30, email='outra@example.com')
+
+        response = self.client.delete(reverse('pessoas') + '?email=outra@example.com')
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Pessoa.objects.values_list('pk', flat=True)), [self.pessoa.pk])
+
+    def test_rotas_rapidas_por_padrao(self):
+        """Testa que, por padrao, apenas o detalhe de endereco e a busca por CEP sao rapidos."""
+        rotas = {
+            reverse('endereco_detail', args=[1]): True,
+            reverse('endereco_cep', args=['64082550']): True,
+            reverse('enderecos'): False,
+            reverse('pessoas'): False,
+            reverse('pessoa_detail', args=[1]): False,
+        }
+
+        for rota, rapida in rotas.items():
+            with self.subTest(rota=rota):
+                request = mock.Mock(resolver_match=resolve(rota))
+                self.assertIs(usa_renderizacao_rapida(request), rapida)
+
+
+ROTAS_RAPIDAS = [
+    'enderecos', 'enderecos_faixa', 'endereco_detail', 'endereco_cep', 'endereco_cep_async',
+    'pessoas', 'pessoa_detail',
+]
+
+
+@override_settings(RENDERIZACAO_RAPIDA={'ROTAS': ROTAS_RAPIDAS})
+class RenderizacaoRapidaTestCase(TestCase):
+    """Testes para a renderizacao rapida das rotas de consulta."""
+
+    def setUp(self):
+        """Set Up."""
+        self.client = APIClient()
+        self.endereco = Endereco.objects.create(
+            cep='64082550', uf='PI', bairro='Centro', cidade='Teresina', logradouro='Rua',
+            complemento='', origem=Endereco.ORIGEM_VIACEP, buscado_em=timezone.now(),
+        )
+        Pessoa.objects.create(nome='Com', idade=20, email='com@example.com', endereco=self.endereco)
+        Pessoa.objects.create(nome='Sem', idade=30, email='sem@example.com')
+
+    def test_mesmo_resultado_dos_serializers(self):
+        """Testa que as rotas rapidas retornam os mesmos dados dos serializers."""
+        rotas = (
+            (reverse('pessoas'), {}),
+            (reverse('pessoas'), {'fields': 'nome,endereco'}),
+            (reverse('pessoa_detail', args=[Pessoa.objects.first().pk]), {}),
+            (reverse('enderecos'), {}),
+            (reverse('enderecos_faixa'), {'prefixo': '64'}),
+            (reverse('endereco_detail', args=[self.endereco.pk]), {}),
+        )
+
+        for rota, parametros in rotas:
+            with self.subTest(rota=rota, parametros=parametros):
+                rapida = self.client.get(rota, parametros)
+                with override_settings(RENDERIZACAO_RAPIDA={'ROTAS': []}):
+                    serializada = self.client.get(rota, parametros)
+
+                self.assertEqual(rapida.status_code, status.HTTP_200_OK)
+                self.assertEqual(rapida['Content-Type'], 'application/json')
+                self.assertEqual(rapida.json(), serializada.json())
+
+    def test_pessoa_inexistente(self):
+        """Testa que a rota rapida de detalhe mantem o 404 de pessoa inexistente."""
+        response = self.client.get(reverse('pessoa_detail', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lista_pessoas_sem_n_mais_um(self):
+        """Testa que a listagem rapida busca os enderecos da pagina em uma unica consulta."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('pessoas'))
+
+        self.assertEqual(
+            [pessoa['endereco'] for pessoa in response.json()['results']],
+            [PessoaSerializer(Pessoa.objects.first()).data['endereco'], None],
+        )
+
+
+class ExclusaoEmSegundoPlanoTestCase(TransactionTestCase):
+    """Testes para a exclusao em lotes em segundo plano."""
+
+    def setUp(self):
+        """Set Up."""
+        self.client = APIClient()
+        Pessoa.objects.bulk_create(
+            Pessoa(nome=f'Pessoa {indice}', idade=30, email=f'p{indice}@example.com')
+            for indice in range(5)
+        )
+
+    @override_settings(EXCLUSAO={'TAMANHO_DO_LOTE': 2, 'LIMITE_SINCRONO': 3})
+    def test_delete_acima_do_limite_roda_em_segundo_plano(self):
+        """Testa que o DELETE acima do limite responde 202 e informa o progresso da exclusao."""
+        response = self.client.delete(reverse('pessoas'))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+
+        exclusao = obtem_exclusao(response.json()['id'])
+        exclusao.thread.join(timeout=10)
+
+        progresso = self.client.get(response.json()['progresso']).json()
+        self.assertEqual(progresso['situacao'], 'concluida')
+        self.assertEqual(progresso['lotes'], 3)
+        self.assertEqual(progresso['excluidos'], {'pessoa.Pessoa': 5})
+        self.assertEqual(Pessoa.objects.count(), 0)
+
+    def test_exclusao_concluida_expira(self):
+        """Testa que as exclusoes concluidas sao descartadas apos o tempo de retencao."""
+        exclusao = ExclusaoEmLotes(Pessoa.objects.all()).inicia_em_segundo_plano()
+        exclusao.thread.join(timeout=10)
+        self.assertIs(obtem_exclusao(exclusao.id), exclusao)
+
+        with override_settings(EXCLUSAO={'RETENCAO': 0}):
+            self.assertIsNone(obtem_exclusao(exclusao.id))
+
+    def test_progresso_de_exclusao_inexistente(self):
+        """Testa a consulta do progresso de uma exclusao desconhecida."""
+        response = self.client.get(reverse('exclusao_detail', args=['inexistente']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -8,5 +8,7 @@ from pessoa import views
 
 urlpatterns = [
     path('', views.pessoa_list, name='pessoas'),
+    path('lote', views.importa_pessoas_em_lote, name='pessoas_lote'),
+    path('exportar', views.exporta_pessoas, name='pessoas_exportar'),
     path('<pk>', views.pessoa_detail, name='pessoa_detail'),
 ]
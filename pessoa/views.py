@@ -1,16 +1,27 @@
 """Pessoa Views."""
 
 # Importacoes externas.
-from typing import Union
+from datetime import datetime
+from typing import Optional, Union
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
+from django.http import HttpResponse
 from django.http.response import JsonResponse
 
 # Importacoes internas.
+from TexCepChallenge.condicional import como_data, etag_de, obtem_configuracao, resposta_condicional
+from TexCepChallenge.exclusao import ExclusaoEmLotes, resposta_de_exclusao
+from TexCepChallenge.exportacao import resposta_de_exportacao
+from TexCepChallenge.paginacao import resposta_paginada, resposta_paginada_rapida
+from TexCepChallenge.renderizacao import resposta_json, usa_renderizacao_rapida
+from cep.excecoes import ErroDeCep
+from cep.views import resposta_de_erro_de_cep
+from pessoa.filtros import filtros_de_pessoa
 from pessoa.models import Pessoa
-from pessoa.serializers import PessoaSerializer, PessoaUpdateSerializer
+from pessoa.serializers import PessoaSerializer, PessoaUpdateSerializer, representacao_de_pessoa
+from pessoa.servicos import importa_pessoas, le_ndjson
 
 
 def get_pessoa(pk: str) -> Union[Pessoa, JsonResponse]:
@@ -22,7 +33,7 @@ def get_pessoa(pk: str) -> Union[Pessoa, JsonResponse]:
 
     """
     try:
-        pessoa = Pessoa.objects.get(pk=pk)
+        pessoa = Pessoa.objects.select_related('endereco').get(pk=pk)
     except Pessoa.DoesNotExist:
         return JsonResponse(
             {'message': 'A pessoa procurada não existe na base atual.'},
@@ -33,21 +44,31 @@ def get_pessoa(pk: str) -> Union[Pessoa, JsonResponse]:
 
 @api_view(['GET', 'POST', 'DELETE'])
 def pessoa_list(request: Request) -> JsonResponse:
-    """Lista pessoas presentes na base atualmente.
+    """Lista pessoas presentes na base atualmente, paginadas por cursor.
+
+    Os enderecos das pessoas de cada pagina sao buscados em uma unica consulta ``pk__in``. Os
+    filtros, ordenacoes e campos aceitos na listagem sao os declarados em ``filtros_de_pessoa``.
+    O DELETE exclui, em lotes, as pessoas que atendem aos mesmos filtros do GET.
 
     :param request: Objeto de request.
 
     :return: Informacoes sobre o resultado do processo chamado.
     """
     if request.method == 'GET':
-        pessoas = Pessoa.objects.all()
-        filtros = {key: value[0] for key, value in dict(request.GET).items()}
-
-        if filtros:
-            pessoas = pessoas.filter(**filtros)
-
-        pessoas_serializer = PessoaSerializer(pessoas, many=True)
-        return JsonResponse(pessoas_serializer.data, safe=False)
+        consulta = filtros_de_pessoa.aplica(request, Pessoa.objects.all())
+        if usa_renderizacao_rapida(request):
+            return resposta_paginada_rapida(
+                request, consulta.queryset, representacao_de_pessoa, consulta.ordenacao,
+                consulta.campos,
+            )
+
+        pessoas = consulta.queryset
+        if consulta.campos is None or 'endereco' in consulta.campos:
+            pessoas = pessoas.prefetch_related('endereco')
+
+        return resposta_paginada(
+            request, pessoas, PessoaSerializer, consulta.ordenacao, consulta.campos,
+        )
 
     elif request.method == 'POST':
         pessoa_data = JSONParser().parse(request)
@@ -58,37 +79,109 @@ def pessoa_list(request: Request) -> JsonResponse:
         return JsonResponse(pessoa_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     elif request.method == 'DELETE':
-        count = Pessoa.objects.all().delete()
-        return JsonResponse(
-            {'message': f'{count[0]} Pessoa(s) deletada(s) com sucesso!'},
-            status=status.HTTP_204_NO_CONTENT,
+        consulta = filtros_de_pessoa.aplica(request, Pessoa.objects.all())
+        return resposta_de_exclusao(
+            request, ExclusaoEmLotes(consulta.queryset), '{} Pessoa(s) deletada(s) com sucesso!',
         )
 
 
-@api_view(['GET', 'PUT', 'DELETE'])
+@api_view(['POST'])
+def importa_pessoas_em_lote(request: Request) -> JsonResponse:
+    """Cria varias pessoas em uma unica requisicao.
+
+    Recebe um array JSON ou, com ``Content-Type: application/x-ndjson``, uma pessoa por linha,
+    lida em streaming. Com ``?upsert=true``, as pessoas com email ja existente sao atualizadas
+    em vez de recusadas. Ver ``importa_pessoas``.
+
+    :param request: Objeto de request.
+
+    :return: Quantidade de pessoas criadas e atualizadas e os erros de cada linha recusada.
+    """
+    if request.content_type.startswith('application/x-ndjson'):
+        linhas = le_ndjson(iter(request.stream.readline, b'') if request.stream else ())
+    else:
+        linhas = JSONParser().parse(request)
+        if not isinstance(linhas, list):
+            return JsonResponse(
+                {'message': 'Envie as pessoas em um array JSON ou em NDJSON.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    resultado = importa_pessoas(linhas, upsert=request.GET.get('upsert') == 'true')
+
+    return JsonResponse(resultado, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def exporta_pessoas(request: Request) -> HttpResponse:
+    """Exporta as pessoas da base em streaming (NDJSON ou array JSON).
+
+    Aceita os mesmos filtros, ordenacoes e campos da listagem.
+
+    :param request: Objeto de request.
+
+    :return: Resposta em streaming com as pessoas serializadas.
+    """
+    consulta = filtros_de_pessoa.aplica(request, Pessoa.objects.all())
+    pessoas = consulta.queryset.order_by(*consulta.ordenacao)
+    if consulta.campos is None or 'endereco' in consulta.campos:
+        pessoas = pessoas.select_related('endereco')
+
+    return resposta_de_exportacao(request, pessoas, PessoaSerializer, 'pessoas', consulta.campos)
+
+
+@api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
 def pessoa_detail(request: Request, pk: str) -> JsonResponse:
     """Procura pessoa por pk (id).
 
+    O GET responde ``304`` quando o cliente ja tem a versao atual da pessoa e do seu endereco
+    (``If-None-Match``), sem serializa-los. Na atualizacao (``PUT`` ou ``PATCH``), apenas os
+    campos enviados e alterados sao gravados. O endereco pode ser informado pelo id
+    (``endereco``) ou pelo CEP (``cep``).
+
     :param request: Objeto de request.
     :param pk: Primary Key do pessoa a ser procurado.
 
     :return: Informacoes sobre o resultado do processo chamado.
     """
+    if request.method == 'GET' and usa_renderizacao_rapida(request):
+        dados_pessoa = representacao_de_pessoa.obtem(pk=pk)
+        if dados_pessoa is not None:
+            return resposta_de_pessoa_condicional(
+                request,
+                dados_pessoa['id'],
+                como_data(dados_pessoa['atualizado_em']),
+                como_data((dados_pessoa['endereco'] or {}).get('atualizado_em')),
+                lambda: resposta_json(dados_pessoa),
+            )
+
     pessoa = get_pessoa(pk)
 
     if not isinstance(pessoa, Pessoa):
         return pessoa
 
     if request.method == 'GET':
-        pessoa_serializer = PessoaSerializer(pessoa)
-        return JsonResponse(pessoa_serializer.data)
+        return resposta_de_pessoa_condicional(
+            request,
+            pessoa.pk,
+            pessoa.atualizado_em,
+            pessoa.endereco.atualizado_em if pessoa.endereco else None,
+            lambda: JsonResponse(PessoaSerializer(pessoa).data),
+        )
 
-    elif request.method == 'PUT':
+    elif request.method in ('PUT', 'PATCH'):
         pessoa_data = JSONParser().parse(request)
-        pessoa_serializer = PessoaUpdateSerializer(pessoa, data=pessoa_data)
-        if pessoa_serializer.is_valid():
+        pessoa_serializer = PessoaUpdateSerializer(
+            pessoa, data=pessoa_data, partial=request.method == 'PATCH',
+        )
+        try:
+            valido = pessoa_serializer.is_valid()
+        except ErroDeCep as erro:
+            return resposta_de_erro_de_cep(erro)
+
+        if valido:
             pessoa_serializer.save()
-            return JsonResponse(pessoa_serializer.data)
+            return JsonResponse(PessoaSerializer(pessoa).data)
 
         return JsonResponse(pessoa_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -99,6 +192,31 @@ def pessoa_detail(request: Request, pk: str) -> JsonResponse:
             status=status.HTTP_204_NO_CONTENT,
         )
 
+def resposta_de_pessoa_condicional(
+    request: Request,
+    pk: int,
+    atualizado_em: Optional[datetime],
+    endereco_atualizado_em: Optional[datetime],
+    gera_resposta,
+) -> HttpResponse:
+    """Retorna a resposta de detalhe da pessoa ou ``304`` caso o cliente ja tenha essa versao.
+
+    :param request: Objeto de request.
+    :param pk: Pk da pessoa.
+    :param atualizado_em: Data da ultima alteracao da pessoa.
+    :param endereco_atualizado_em: Data da ultima alteracao do endereco da pessoa, se houver.
+    :param gera_resposta: Funcao que serializa a pessoa.
+
+    :return: Resposta com ETag, Last-Modified e Cache-Control.
+    """
+    ultima_modificacao = max(filter(None, (atualizado_em, endereco_atualizado_em)))
+
+    return resposta_condicional(
+        request, etag_de(pk, atualizado_em, endereco_atualizado_em), ultima_modificacao,
+        gera_resposta, obtem_configuracao()['MAX_AGE'],
+    )
+
+
 def resposta_de_pessoa_unico(pessoa: Pessoa) -> JsonResponse:
     """Retorna o Json Response para casos de Pessoa unico.
 